@@ -0,0 +1,71 @@
+"""add_restaurant_daily_stats
+
+Revision ID: 3d8e51a0c6f2
+Revises: 7a1f3c9e2b40
+Create Date: 2026-10-17 11:03:27.184920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d8e51a0c6f2'
+down_revision: Union[str, Sequence[str], None] = '7a1f3c9e2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATUS_COUNTS = [
+    'new', 'accepted', 'preparing', 'ready', 'picked_up',
+    'delivered', 'released', 'rejected', 'cancelled'
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'restaurant_daily_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('restaurant_id', sa.Integer(), nullable=False),
+        sa.Column('stat_date', sa.Date(), nullable=False),
+        sa.Column('orders_count', sa.Integer(), nullable=False, server_default='0'),
+        *[
+            sa.Column(f'{status}_count', sa.Integer(), nullable=False, server_default='0')
+            for status in STATUS_COUNTS
+        ],
+        sa.Column('delivered_revenue', sa.DECIMAL(precision=12, scale=2), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['restaurant_id'], ['restaurants.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('restaurant_id', 'stat_date', name='uq_restaurant_daily_stats_day')
+    )
+    op.create_index(op.f('ix_restaurant_daily_stats_id'), 'restaurant_daily_stats', ['id'], unique=False)
+    op.create_index(op.f('ix_restaurant_daily_stats_restaurant_id'), 'restaurant_daily_stats', ['restaurant_id'], unique=False)
+
+    # Backfill from existing orders in one aggregate pass. The ORM stores enum
+    # names (NEW) while database_schema.sql uses values (new), so match either.
+    status_sums = ",\n            ".join(
+        f"SUM(CASE WHEN LOWER(status) = '{status}' THEN 1 ELSE 0 END)" for status in STATUS_COUNTS
+    )
+    op.execute(f"""
+        INSERT INTO restaurant_daily_stats
+            (restaurant_id, stat_date, orders_count, {", ".join(f"{s}_count" for s in STATUS_COUNTS)}, delivered_revenue)
+        SELECT
+            restaurant_id,
+            DATE(created_at),
+            COUNT(id),
+            {status_sums},
+            COALESCE(SUM(CASE WHEN LOWER(status) = 'delivered' THEN total_amount ELSE 0 END), 0)
+        FROM orders
+        WHERE created_at IS NOT NULL
+        GROUP BY restaurant_id, DATE(created_at)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_restaurant_daily_stats_restaurant_id'), table_name='restaurant_daily_stats')
+    op.drop_index(op.f('ix_restaurant_daily_stats_id'), table_name='restaurant_daily_stats')
+    op.drop_table('restaurant_daily_stats')
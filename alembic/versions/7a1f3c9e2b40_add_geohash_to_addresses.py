@@ -0,0 +1,43 @@
+"""add_geohash_to_addresses
+
+Revision ID: 7a1f3c9e2b40
+Revises: 2c49743f3d84
+Create Date: 2026-10-17 09:12:41.503112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.geo_service import geohash_encode
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1f3c9e2b40'
+down_revision: Union[str, Sequence[str], None] = '2c49743f3d84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('addresses', sa.Column('geohash', sa.String(length=12), nullable=True))
+    op.create_index('ix_addresses_geohash', 'addresses', ['geohash'])
+
+    # Backfill geohash for existing restaurant addresses
+    connection = op.get_bind()
+    rows = connection.execute(sa.text("SELECT id, latitude, longitude FROM addresses")).fetchall()
+    for address_id, latitude, longitude in rows:
+        if latitude is None or longitude is None:
+            continue
+        connection.execute(
+            sa.text("UPDATE addresses SET geohash = :geohash WHERE id = :id"),
+            {"geohash": geohash_encode(float(latitude), float(longitude)), "id": address_id}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_addresses_geohash', table_name='addresses')
+    op.drop_column('addresses', 'geohash')
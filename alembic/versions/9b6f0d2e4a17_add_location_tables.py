@@ -0,0 +1,74 @@
+"""add_location_tables
+
+Revision ID: 9b6f0d2e4a17
+Revises: 3d8e51a0c6f2
+Create Date: 2026-10-17 14:21:06.731552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b6f0d2e4a17'
+down_revision: Union[str, Sequence[str], None] = '3d8e51a0c6f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'delivery_partner_locations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('delivery_partner_id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('accuracy', sa.Float(), nullable=True),
+        sa.Column('bearing', sa.Float(), nullable=True),
+        sa.Column('speed', sa.Float(), nullable=True),
+        sa.Column('address', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['delivery_partner_id'], ['delivery_partners.id'], ),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_delivery_partner_locations_id'), 'delivery_partner_locations', ['id'], unique=False)
+    op.create_index(op.f('ix_delivery_partner_locations_delivery_partner_id'), 'delivery_partner_locations', ['delivery_partner_id'], unique=False)
+    op.create_index(op.f('ix_delivery_partner_locations_order_id'), 'delivery_partner_locations', ['order_id'], unique=False)
+    op.create_index(op.f('ix_delivery_partner_locations_created_at'), 'delivery_partner_locations', ['created_at'], unique=False)
+
+    op.create_table(
+        'customer_locations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('address', sa.Text(), nullable=False),
+        sa.Column('landmark', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_customer_locations_id'), 'customer_locations', ['id'], unique=False)
+    op.create_index(op.f('ix_customer_locations_customer_id'), 'customer_locations', ['customer_id'], unique=False)
+    op.create_index(op.f('ix_customer_locations_order_id'), 'customer_locations', ['order_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_customer_locations_order_id'), table_name='customer_locations')
+    op.drop_index(op.f('ix_customer_locations_customer_id'), table_name='customer_locations')
+    op.drop_index(op.f('ix_customer_locations_id'), table_name='customer_locations')
+    op.drop_table('customer_locations')
+    op.drop_index(op.f('ix_delivery_partner_locations_created_at'), table_name='delivery_partner_locations')
+    op.drop_index(op.f('ix_delivery_partner_locations_order_id'), table_name='delivery_partner_locations')
+    op.drop_index(op.f('ix_delivery_partner_locations_delivery_partner_id'), table_name='delivery_partner_locations')
+    op.drop_index(op.f('ix_delivery_partner_locations_id'), table_name='delivery_partner_locations')
+    op.drop_table('delivery_partner_locations')
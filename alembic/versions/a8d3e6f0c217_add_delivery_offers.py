@@ -0,0 +1,47 @@
+"""add_delivery_offers
+
+Revision ID: a8d3e6f0c217
+Revises: f2a6c1d7b345
+Create Date: 2026-10-17 19:41:36.208915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d3e6f0c217'
+down_revision: Union[str, Sequence[str], None] = 'f2a6c1d7b345'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'delivery_offers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('delivery_partner_id', sa.Integer(), nullable=False),
+        sa.Column('distance_km', sa.Float(), nullable=True),
+        sa.Column('status', sa.Enum('PENDING', 'ACCEPTED', 'DECLINED', 'EXPIRED', name='deliveryofferstatusenum'), nullable=False),
+        sa.Column('offered_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('responded_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['delivery_partner_id'], ['delivery_partners.id'], ),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_delivery_offers_id'), 'delivery_offers', ['id'], unique=False)
+    op.create_index(op.f('ix_delivery_offers_order_id'), 'delivery_offers', ['order_id'], unique=False)
+    op.create_index('ix_delivery_offers_partner_status', 'delivery_offers', ['delivery_partner_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_delivery_offers_partner_status', table_name='delivery_offers')
+    op.drop_index(op.f('ix_delivery_offers_order_id'), table_name='delivery_offers')
+    op.drop_index(op.f('ix_delivery_offers_id'), table_name='delivery_offers')
+    op.drop_table('delivery_offers')
@@ -0,0 +1,39 @@
+"""add_eta_inputs
+
+Revision ID: b5e2f8a4d671
+Revises: a8d3e6f0c217
+Create Date: 2026-10-17 20:26:03.771942
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e2f8a4d671'
+down_revision: Union[str, Sequence[str], None] = 'a8d3e6f0c217'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('delivery_latitude', sa.DECIMAL(precision=10, scale=8), nullable=True))
+    op.add_column('orders', sa.Column('delivery_longitude', sa.DECIMAL(precision=11, scale=8), nullable=True))
+    op.add_column('delivery_partner_current_location', sa.Column('avg_speed', sa.Float(), nullable=True))
+    op.add_column(
+        'delivery_partner_current_location',
+        sa.Column('speed_samples', sa.Integer(), nullable=False, server_default='0')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('delivery_partner_current_location') as batch_op:
+        batch_op.drop_column('speed_samples')
+        batch_op.drop_column('avg_speed')
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('delivery_longitude')
+        batch_op.drop_column('delivery_latitude')
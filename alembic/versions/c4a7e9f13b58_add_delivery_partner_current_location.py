@@ -0,0 +1,55 @@
+"""add_delivery_partner_current_location
+
+Revision ID: c4a7e9f13b58
+Revises: 9b6f0d2e4a17
+Create Date: 2026-10-17 16:47:52.208341
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a7e9f13b58'
+down_revision: Union[str, Sequence[str], None] = '9b6f0d2e4a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'delivery_partner_current_location',
+        sa.Column('delivery_partner_id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=True),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('accuracy', sa.Float(), nullable=True),
+        sa.Column('bearing', sa.Float(), nullable=True),
+        sa.Column('speed', sa.Float(), nullable=True),
+        sa.Column('recorded_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['delivery_partner_id'], ['delivery_partners.id'], ),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+        sa.PrimaryKeyConstraint('delivery_partner_id')
+    )
+
+    # Seed from history: the newest point per partner
+    op.execute("""
+        INSERT INTO delivery_partner_current_location
+            (delivery_partner_id, order_id, latitude, longitude, accuracy, bearing, speed, recorded_at)
+        SELECT l.delivery_partner_id, l.order_id, l.latitude, l.longitude, l.accuracy, l.bearing, l.speed, l.created_at
+        FROM delivery_partner_locations l
+        JOIN (
+            SELECT delivery_partner_id, MAX(id) AS max_id
+            FROM delivery_partner_locations
+            GROUP BY delivery_partner_id
+        ) newest ON newest.max_id = l.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('delivery_partner_current_location')
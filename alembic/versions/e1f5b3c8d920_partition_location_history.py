@@ -0,0 +1,119 @@
+"""partition_location_history
+
+Revision ID: e1f5b3c8d920
+Revises: c4a7e9f13b58
+Create Date: 2026-10-17 18:05:33.419276
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1f5b3c8d920'
+down_revision: Union[str, Sequence[str], None] = 'c4a7e9f13b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OLD_INDEXES = [
+    'ix_delivery_partner_locations_id',
+    'ix_delivery_partner_locations_delivery_partner_id',
+    'ix_delivery_partner_locations_order_id',
+    'ix_delivery_partner_locations_created_at',
+]
+
+DAYS_AHEAD = 7
+
+
+def _foreign_keys(connection):
+    return [row[0] for row in connection.execute(sa.text("""
+        SELECT CONSTRAINT_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+        WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = 'delivery_partner_locations'
+    """)).fetchall()]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'delivery_routes',
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('delivery_partner_id', sa.Integer(), nullable=True),
+        sa.Column('polyline', sa.Text(), nullable=False),
+        sa.Column('point_count', sa.Integer(), nullable=False),
+        sa.Column('raw_point_count', sa.Integer(), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('ended_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['delivery_partner_id'], ['delivery_partners.id'], ),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+        sa.PrimaryKeyConstraint('order_id')
+    )
+    op.create_index(op.f('ix_delivery_routes_delivery_partner_id'), 'delivery_routes', ['delivery_partner_id'], unique=False)
+
+    connection = op.get_bind()
+    is_mysql = connection.dialect.name == 'mysql'
+
+    # Partitioned MySQL tables cannot carry foreign keys
+    if is_mysql:
+        for name in _foreign_keys(connection):
+            op.drop_constraint(name, 'delivery_partner_locations', type_='foreignkey')
+
+    # Four single-column indexes become two composites that serve replay
+    for name in OLD_INDEXES:
+        op.drop_index(name, table_name='delivery_partner_locations')
+    op.create_index('ix_dpl_order_created', 'delivery_partner_locations', ['order_id', 'created_at'], unique=False)
+    op.create_index('ix_dpl_partner_created', 'delivery_partner_locations', ['delivery_partner_id', 'created_at'], unique=False)
+
+    if is_mysql:
+        # The partitioning column must be part of every unique key
+        op.execute("UPDATE delivery_partner_locations SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+        op.execute("""
+            ALTER TABLE delivery_partner_locations
+            MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (id, created_at)
+        """)
+        today = datetime.utcnow().date()
+        # Existing history lands in the partition for yesterday and ages out with it
+        partitions = [f"PARTITION p{today - timedelta(days=1):%Y%m%d} VALUES LESS THAN (TO_DAYS('{today}'))"]
+        for offset in range(DAYS_AHEAD + 1):
+            day = today + timedelta(days=offset)
+            partitions.append(f"PARTITION p{day:%Y%m%d} VALUES LESS THAN (TO_DAYS('{day + timedelta(days=1)}'))")
+        partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+        op.execute(
+            "ALTER TABLE delivery_partner_locations PARTITION BY RANGE (TO_DAYS(created_at)) ("
+            + ", ".join(partitions) + ")"
+        )
+    else:
+        with op.batch_alter_table('delivery_partner_locations') as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(timezone=True), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    connection = op.get_bind()
+    if connection.dialect.name == 'mysql':
+        op.execute("ALTER TABLE delivery_partner_locations REMOVE PARTITIONING")
+        op.execute("""
+            ALTER TABLE delivery_partner_locations
+            DROP PRIMARY KEY,
+            ADD PRIMARY KEY (id),
+            MODIFY created_at DATETIME NULL DEFAULT CURRENT_TIMESTAMP
+        """)
+
+    op.drop_index('ix_dpl_partner_created', table_name='delivery_partner_locations')
+    op.drop_index('ix_dpl_order_created', table_name='delivery_partner_locations')
+    op.create_index('ix_delivery_partner_locations_id', 'delivery_partner_locations', ['id'], unique=False)
+    op.create_index('ix_delivery_partner_locations_delivery_partner_id', 'delivery_partner_locations', ['delivery_partner_id'], unique=False)
+    op.create_index('ix_delivery_partner_locations_order_id', 'delivery_partner_locations', ['order_id'], unique=False)
+    op.create_index('ix_delivery_partner_locations_created_at', 'delivery_partner_locations', ['created_at'], unique=False)
+
+    if connection.dialect.name == 'mysql':
+        op.create_foreign_key(None, 'delivery_partner_locations', 'delivery_partners', ['delivery_partner_id'], ['id'])
+        op.create_foreign_key(None, 'delivery_partner_locations', 'orders', ['order_id'], ['id'])
+
+    op.drop_index(op.f('ix_delivery_routes_delivery_partner_id'), table_name='delivery_routes')
+    op.drop_table('delivery_routes')
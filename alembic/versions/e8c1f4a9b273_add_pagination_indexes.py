@@ -0,0 +1,59 @@
+"""add_pagination_indexes
+
+Revision ID: e8c1f4a9b273
+Revises: d7b2e4f1a935
+Create Date: 2026-10-17 14:12:48.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c1f4a9b273'
+down_revision: Union[str, Sequence[str], None] = 'd7b2e4f1a935'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables listed newest-first by keyset pagination
+TABLES = ('restaurants', 'delivery_partners', 'orders')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.execute(f"UPDATE {table} SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL")
+        if op.get_bind().dialect.name == 'sqlite':
+            # Whole seconds, as CURRENT_TIMESTAMP and the models store them on SQLite
+            op.execute(f"UPDATE {table} SET created_at = substr(created_at, 1, 19) WHERE length(created_at) > 19")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(
+                'created_at',
+                existing_type=sa.DateTime(timezone=True),
+                existing_server_default=sa.text('(CURRENT_TIMESTAMP)'),
+                nullable=False
+            )
+    op.create_index('ix_restaurants_created_id', 'restaurants', ['created_at', 'id'], unique=False)
+    op.create_index('ix_delivery_partners_created_id', 'delivery_partners', ['created_at', 'id'], unique=False)
+    op.create_index('ix_orders_customer_created_id', 'orders', ['customer_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_orders_restaurant_created_id', 'orders', ['restaurant_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_orders_status_created_id', 'orders', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_status_created_id', table_name='orders')
+    op.drop_index('ix_orders_restaurant_created_id', table_name='orders')
+    op.drop_index('ix_orders_customer_created_id', table_name='orders')
+    op.drop_index('ix_delivery_partners_created_id', table_name='delivery_partners')
+    op.drop_index('ix_restaurants_created_id', table_name='restaurants')
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(
+                'created_at',
+                existing_type=sa.DateTime(timezone=True),
+                existing_server_default=sa.text('(CURRENT_TIMESTAMP)'),
+                nullable=True
+            )
@@ -0,0 +1,28 @@
+"""add_delivery_route_track
+
+Revision ID: f2a6c1d7b345
+Revises: e1f5b3c8d920
+Create Date: 2026-10-17 19:02:11.514083
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6c1d7b345'
+down_revision: Union[str, Sequence[str], None] = 'e1f5b3c8d920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('delivery_routes', sa.Column('track', sa.LargeBinary(length=16777215), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('delivery_routes', 'track')
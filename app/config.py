@@ -1,10 +1,13 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    # Used by async def routes; derived from DATABASE_URL (aiomysql / aiosqlite) when unset
+    ASYNC_DATABASE_URL: Optional[str] = None
     
     # JWT
     SECRET_KEY: str
@@ -20,10 +23,104 @@ class Settings(BaseSettings):
     # OTP
     OTP_EXPIRY_MINUTES: int = 5
     OTP_LENGTH: int = 6
+    # Pending codes live in Redis ("redis") or, for tests and single-process
+    # runs, in memory ("memory"); a code is voided after this many wrong guesses
+    OTP_STORE: str = "redis"
+    OTP_MAX_ATTEMPTS: int = 5
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     
+    # Live order fan-out across workers: "redis" or "memory" (single process only)
+    BROADCAST_BACKEND: str = "redis"
+    
+    # Rider GPS ping ingestion: flush when this many points are buffered or this often
+    LOCATION_FLUSH_MAX_BATCH: int = 500
+    LOCATION_FLUSH_INTERVAL_SECONDS: float = 1.0
+    LOCATION_BUFFER_MAX_POINTS: int = 50000
+    
+    # Raw GPS history older than this is archived into per-order routes and purged
+    LOCATION_RETENTION_DAYS: int = 30
+    # Route simplification tolerance in metres
+    ROUTE_SIMPLIFY_TOLERANCE_M: float = 10.0
+    
+    # Rider dispatch: each READY order is offered to the nearest riders within
+    # DISPATCH_MAX_RADIUS_KM; an unanswered offer expires and goes to the next riders
+    DISPATCH_ENABLED: bool = True
+    DISPATCH_INTERVAL_SECONDS: float = 2.0
+    DISPATCH_OFFERS_PER_ORDER: int = 3
+    DISPATCH_OFFER_TIMEOUT_SECONDS: int = 30
+    # A rider whose offer expired may be offered the same order again after this
+    DISPATCH_REOFFER_COOLDOWN_SECONDS: int = 120
+    DISPATCH_MAX_RADIUS_KM: float = 8.0
+    DISPATCH_MAX_OPEN_OFFERS_PER_PARTNER: int = 3
+    # Riders whose last fix is older than this are not offered orders
+    DISPATCH_LOCATION_MAX_AGE_SECONDS: int = 300
+    # Orders still unclaimed this long after becoming ready, or whose restaurant
+    # has no coordinates, are open to every rider without an offer
+    DISPATCH_OPEN_TO_ALL_AFTER_SECONDS: int = 180
+    
+    # Delivery ETAs: riders' average speed is blended with the city's average,
+    # trusting the rider more as ETA_CITY_PRIOR_SAMPLES speed samples accumulate
+    ETA_DEFAULT_SPEED_KMH: float = 20.0
+    ETA_CITY_SPEEDS_KMH: Dict[str, float] = {}  # e.g. {"bangalore": 17, "pune": 22}
+    ETA_CITY_PRIOR_SAMPLES: int = 30
+    # Road distance over straight-line distance
+    ETA_ROUTE_FACTOR: float = 1.3
+    # Kitchen time assumed when an order is placed
+    ETA_PREPARATION_MINUTES: int = 20
+    
+    # Live rider tracking: customers get at most one position per this many
+    # seconds; a subscriber may ask for a slower rate but never a faster one
+    TRACKING_PUSH_INTERVAL_SECONDS: float = 2.0
+    
+    # Push notifications are queued in notification_outbox and sent by a
+    # background worker; a failed send is retried after
+    # NOTIFICATION_RETRY_BASE_SECONDS * 2^(attempt - 1), capped at NOTIFICATION_RETRY_MAX_SECONDS
+    NOTIFICATION_WORKER_ENABLED: bool = True
+    NOTIFICATION_POLL_INTERVAL_SECONDS: float = 1.0
+    NOTIFICATION_BATCH_SIZE: int = 100
+    NOTIFICATION_MAX_ATTEMPTS: int = 6
+    NOTIFICATION_RETRY_BASE_SECONDS: float = 5.0
+    NOTIFICATION_RETRY_MAX_SECONDS: float = 600.0
+    # A row claimed by a worker that died becomes due again after this
+    NOTIFICATION_CLAIM_TIMEOUT_SECONDS: int = 120
+    # Multicast calls a worker batch keeps in flight at once
+    NOTIFICATION_SEND_CONCURRENCY: int = 16
+    # Each worker caches recipients' device tokens; registrations and dead-token
+    # cleanup invalidate it locally, other workers pick changes up within the TTL
+    DEVICE_TOKEN_CACHE_TTL_SECONDS: float = 300.0
+    DEVICE_TOKEN_CACHE_MAX_ENTRIES: int = 50000
+    # "firebase", or "fake" to load-test without FCM: every multicast takes
+    # PUSH_FAKE_LATENCY_MS and tokens fail at the given rates
+    PUSH_TRANSPORT: str = "firebase"
+    PUSH_FAKE_LATENCY_MS: float = 50.0
+    PUSH_FAKE_FAILURE_RATE: float = 0.0
+    PUSH_FAKE_NOT_FOUND_RATE: float = 0.0
+    
+    # Authenticated owners, customers and delivery partners are cached per
+    # worker; their own profile and status changes invalidate it locally,
+    # other workers pick changes up within the TTL
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 100000
+    # Verified JWTs are cached per worker until they expire, for at most
+    # TOKEN_CACHE_TTL_SECONDS. Logged-out tokens are stored in revoked_tokens;
+    # each worker re-reads it at most every TOKEN_REVOCATION_SYNC_SECONDS
+    TOKEN_CACHE_TTL_SECONDS: float = 3600.0
+    TOKEN_CACHE_MAX_ENTRIES: int = 100000
+    TOKEN_REVOCATION_SYNC_SECONDS: float = 5.0
+    
+    # Token-bucket rate limits: BURST requests at once, refilled at PER_MINUTE.
+    # Buckets are shared through Redis ("redis") or kept per process
+    # ("memory"). Behind nginx, uvicorn's proxy headers give the client address
+    RATE_LIMIT_BACKEND: str = "redis"
+    OTP_RATE_LIMIT_PHONE_BURST: int = 3
+    OTP_RATE_LIMIT_PHONE_PER_MINUTE: float = 1.0
+    OTP_RATE_LIMIT_IP_BURST: int = 20
+    OTP_RATE_LIMIT_IP_PER_MINUTE: float = 10.0
+    LOCATION_RATE_LIMIT_BURST: int = 10
+    LOCATION_RATE_LIMIT_PER_MINUTE: float = 60.0
+    
     # Environment
     ENVIRONMENT: str = "development"
     
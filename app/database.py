@@ -1,6 +1,9 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.config import get_settings
 
 settings = get_settings()
@@ -16,6 +19,37 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# asyncio driver for each backend DATABASE_URL may name
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with its driver swapped for the asyncio one (mysql+pymysql -> mysql+aiomysql)"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+
+# Same database as engine, for async def routes: queries are awaited instead
+# of blocking the event loop. SQLite connections are only file handles, so
+# each session opens its own rather than pooling them.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=settings.ENVIRONMENT == "development",
+    **({"poolclass": NullPool} if make_url(ASYNC_DATABASE_URL).get_backend_name() == "sqlite" else {
+        "pool_pre_ping": True,
+        "pool_recycle": 3600
+    })
+)
+
+# Committed objects keep their loaded values: reloading an expired attribute
+# would need IO outside an await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db():
     """Dependency for getting database session"""
@@ -24,3 +58,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for getting an AsyncSession in async def routes"""
+    async with AsyncSessionLocal() as db:
+        yield db
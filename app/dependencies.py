@@ -1,37 +1,104 @@
-from fastapi import Depends, HTTPException, status
+import math
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.services.jwt_service import verify_token
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.cache import TTLCache
+from app.config import get_settings
+from app.database import get_async_db, get_db
+from app.services.jwt_service import revoked_tokens, verify_token
+from app.services.rate_limit_service import bucket, rate_limiter
 from app.models import Owner, Restaurant, Customer, DeliveryPartner
 
+settings = get_settings()
 security = HTTPBearer()
+# For endpoints that also work without a token, such as logout
+optional_security = HTTPBearer(auto_error=False)
 
+# Authenticated principals by ("owner" | "customer" | "delivery_partner", id):
+# the row's columns, so routers can use the principal without a SELECT, and
+# ("owner_restaurant", owner_id): the id of the owner's active restaurant
+principal_cache = TTLCache(ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS, max_size=settings.PRINCIPAL_CACHE_MAX_ENTRIES)
 
-def get_current_owner(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> Owner:
-    """Get current authenticated owner from JWT token"""
-    token = credentials.credentials
-    payload = verify_token(token)
-    
+
+def invalidate_principal(kind: str, principal_id: int) -> None:
+    """Drop a principal's cached row after its profile, activation or verification changed"""
+    keys = [(kind, principal_id)]
+    if kind == "owner":
+        keys.append(("owner_restaurant", principal_id))
+    principal_cache.invalidate(*keys)
+
+
+def _attach(db: Session, model, fields: dict):
+    """
+    Put a row known from the cache into the session without loading it.
+    Columns missing from fields are loaded from the database on first access;
+    changes made by the router are flushed as usual.
+    """
+    instance = model(**fields)
+    make_transient_to_detached(instance)
+    return db.merge(instance, load=False)
+
+
+def _load_principal(db: Session, model, kind: str, principal_id: int):
+    """The principal's row from the cache, or from the database (None if there is no such row)"""
+    key = (kind, principal_id)
+    fields = principal_cache.get(key)
+    if fields is not None:
+        return _attach(db, model, fields)
+
+    generation = principal_cache.generation
+    principal = db.query(model).filter(model.id == principal_id).first()
+    if principal is not None:
+        principal_cache.set(
+            key,
+            {column.key: getattr(principal, column.key) for column in inspect(model).column_attrs},
+            generation=generation
+        )
+    return principal
+
+
+def _require_payload(payload):
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    owner_id = payload.get("owner_id")
-    if owner_id is None:
+    return payload
+
+
+def _token_payload(credentials: HTTPAuthorizationCredentials) -> dict:
+    return _require_payload(verify_token(credentials.credentials))
+
+
+async def verify_token_async(token: str):
+    """verify_token for async code such as websockets"""
+    # Every few seconds verify_token reads new revocations; do that off the event loop
+    if revoked_tokens.sync_due:
+        await run_in_threadpool(revoked_tokens.sync)
+    return verify_token(token)
+
+
+async def _token_payload_async(credentials: HTTPAuthorizationCredentials) -> dict:
+    return _require_payload(await verify_token_async(credentials.credentials))
+
+
+def _claim(payload: dict, name: str) -> int:
+    value = payload.get(name)
+    if value is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    owner = db.query(Owner).filter(Owner.id == owner_id).first()
+    return value
+
+
+def _owner_from_payload(db: Session, payload: dict) -> Owner:
+    owner = _load_principal(db, Owner, "owner", _claim(payload, "owner_id"))
     if owner is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -48,11 +115,13 @@ def get_current_owner(
     return owner
 
 
-def get_current_restaurant(
-    owner: Owner = Depends(get_current_owner),
-    db: Session = Depends(get_db)
-) -> Restaurant:
-    """Get current owner's restaurant"""
+def _restaurant_for_owner(db: Session, owner: Owner) -> Restaurant:
+    key = ("owner_restaurant", owner.id)
+    restaurant_id = principal_cache.get(key)
+    if restaurant_id is not None:
+        return _attach(db, Restaurant, {"id": restaurant_id, "owner_id": owner.id})
+
+    generation = principal_cache.generation
     restaurant = db.query(Restaurant).filter(
         Restaurant.owner_id == owner.id,
         Restaurant.is_active == True
@@ -64,24 +133,11 @@ def get_current_restaurant(
             detail="Restaurant not found. Please complete restaurant setup."
         )
     
+    principal_cache.set(key, restaurant.id, generation=generation)
     return restaurant
 
 
-def get_current_customer(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> Customer:
-    """Get current authenticated customer from JWT token"""
-    token = credentials.credentials
-    payload = verify_token(token)
-    
-    if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
+def _customer_from_payload(db: Session, payload: dict) -> Customer:
     customer_id = payload.get("customer_id")
     
     # If customer_id is missing, check if it's an owner token and try to find customer by phone
@@ -107,7 +163,7 @@ def get_current_customer(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    customer = _load_principal(db, Customer, "customer", customer_id)
     if customer is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -124,30 +180,10 @@ def get_current_customer(
     return customer
 
 
-def get_current_delivery_partner(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> DeliveryPartner:
-    """Get current authenticated delivery partner from JWT token"""
-    token = credentials.credentials
-    payload = verify_token(token)
-    
-    if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    delivery_partner_id = payload.get("delivery_partner_id")
-    if delivery_partner_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    delivery_partner = db.query(DeliveryPartner).filter(DeliveryPartner.id == delivery_partner_id).first()
+def _delivery_partner_from_payload(db: Session, payload: dict) -> DeliveryPartner:
+    delivery_partner = _load_principal(
+        db, DeliveryPartner, "delivery_partner", _claim(payload, "delivery_partner_id")
+    )
     if delivery_partner is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -163,3 +199,117 @@ def get_current_delivery_partner(
     
     return delivery_partner
 
+
+def get_current_owner(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Owner:
+    """Get current authenticated owner from JWT token"""
+    return _owner_from_payload(db, _token_payload(credentials))
+
+
+def get_current_restaurant(
+    owner: Owner = Depends(get_current_owner),
+    db: Session = Depends(get_db)
+) -> Restaurant:
+    """Get current owner's restaurant"""
+    return _restaurant_for_owner(db, owner)
+
+
+def get_current_customer(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Customer:
+    """Get current authenticated customer from JWT token"""
+    return _customer_from_payload(db, _token_payload(credentials))
+
+
+def get_current_delivery_partner(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> DeliveryPartner:
+    """Get current authenticated delivery partner from JWT token"""
+    return _delivery_partner_from_payload(db, _token_payload(credentials))
+
+
+# The same dependencies for async def routes. The principal is loaded into the
+# route's AsyncSession, so the route can change and commit it; a cache hit
+# still costs no query. On a restaurant cache hit only id and owner_id are
+# loaded, and other attributes need an explicit refresh.
+async def get_current_owner_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Owner:
+    """get_current_owner on the request's AsyncSession"""
+    return await db.run_sync(_owner_from_payload, await _token_payload_async(credentials))
+
+
+async def get_current_restaurant_async(
+    owner: Owner = Depends(get_current_owner_async),
+    db: AsyncSession = Depends(get_async_db)
+) -> Restaurant:
+    """get_current_restaurant on the request's AsyncSession"""
+    return await db.run_sync(_restaurant_for_owner, owner)
+
+
+async def get_current_customer_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Customer:
+    """get_current_customer on the request's AsyncSession"""
+    return await db.run_sync(_customer_from_payload, await _token_payload_async(credentials))
+
+
+async def get_current_delivery_partner_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> DeliveryPartner:
+    """get_current_delivery_partner on the request's AsyncSession"""
+    return await db.run_sync(_delivery_partner_from_payload, await _token_payload_async(credentials))
+
+
+def _enforce(buckets) -> None:
+    wait = rate_limiter.acquire(buckets)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests. Please try again later.",
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
+
+
+async def rate_limit_otp(request: Request) -> None:
+    """
+    Throttle OTP sends per phone number and per client address. Used as a
+    route dependency, so it runs before the endpoint opens a database session.
+    """
+    # FastAPI has already read the body; this parses the cached copy. An empty
+    # or non-JSON body is still throttled per address, then rejected with 422
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    address = request.client.host if request.client else "unknown"
+    buckets = [bucket(f"otp:ip:{address}", settings.OTP_RATE_LIMIT_IP_BURST, settings.OTP_RATE_LIMIT_IP_PER_MINUTE)]
+    phone_number = body.get("phone_number") if isinstance(body, dict) else None
+    if isinstance(phone_number, str):
+        buckets.append(bucket(
+            f"otp:phone:{phone_number.lstrip('+')}",
+            settings.OTP_RATE_LIMIT_PHONE_BURST,
+            settings.OTP_RATE_LIMIT_PHONE_PER_MINUTE
+        ))
+    await run_in_threadpool(_enforce, buckets)
+
+
+def rate_limit_location(credentials: HTTPAuthorizationCredentials = Depends(security)) -> None:
+    """Throttle location pings per delivery partner, identified from the token alone"""
+    payload = verify_token(credentials.credentials)
+    delivery_partner_id = payload.get("delivery_partner_id") if payload else None
+    if delivery_partner_id is None:
+        # get_current_delivery_partner rejects the request
+        return
+    _enforce([bucket(
+        f"location:delivery_partner:{delivery_partner_id}",
+        settings.LOCATION_RATE_LIMIT_BURST,
+        settings.LOCATION_RATE_LIMIT_PER_MINUTE
+    )])
@@ -2,6 +2,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, owner, restaurant, dashboard, menu, orders, admin, customer_auth, customer, notifications, delivery_partner
 from app.database import engine, Base
+from app.services.location_ingest_service import location_buffer
+from app.services.dispatch_service import dispatcher
+from app.services.tracking_service import tracking_manager
+from app.services.notification_service import notification_worker
+from app.config import get_settings
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -35,6 +40,51 @@ app.include_router(notifications.router)
 app.include_router(delivery_partner.router)
 
 
+@app.on_event("startup")
+async def start_live_order_broadcast():
+    await orders.manager.start()
+
+
+@app.on_event("shutdown")
+async def stop_live_order_broadcast():
+    await orders.manager.stop()
+
+
+@app.on_event("startup")
+async def start_live_tracking():
+    await tracking_manager.start()
+
+
+@app.on_event("shutdown")
+async def stop_live_tracking():
+    await tracking_manager.stop()
+
+
+@app.on_event("shutdown")
+def flush_location_pings():
+    location_buffer.stop()
+
+
+@app.on_event("startup")
+def start_dispatcher():
+    if get_settings().DISPATCH_ENABLED:
+        dispatcher.start()
+
+
+@app.on_event("shutdown")
+def stop_dispatcher():
+    dispatcher.stop()
+
+
+@app.on_event("startup")
+def start_notification_worker():
+    if get_settings().NOTIFICATION_WORKER_ENABLED:
+        notification_worker.start()
+
+
+@app.on_event("shutdown")
+def stop_notification_worker():
+    notification_worker.stop()
 
 
 @app.get("/")
@@ -1,10 +1,21 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Enum, Float, DECIMAL, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, Text, ForeignKey, Enum, Float, DECIMAL, JSON, UniqueConstraint, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
 
 
+# Creation time of rows listed by keyset pagination (see app.pagination).
+# SQLite stores server-side CURRENT_TIMESTAMP as text without fractional
+# seconds, so values written by the app are stored the same way there and the
+# raw column compares correctly against a cursor.
+PageTimestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite"
+)
+
+
 class VerificationStatusEnum(str, enum.Enum):
     PENDING = "pending"
     SUBMITTED = "submitted"
@@ -34,6 +45,18 @@ class OrderStatusEnum(str, enum.Enum):
     CANCELLED = "cancelled"
 
 
+class DeliveryOfferStatusEnum(str, enum.Enum):
+    PENDING = "pending"
+    ACCEPTED = "accepted"
+    DECLINED = "declined"
+    EXPIRED = "expired"
+
+
+class NotificationOutboxStatusEnum(str, enum.Enum):
+    PENDING = "pending"
+    FAILED = "failed"
+
+
 class Owner(Base):
     __tablename__ = "owners"
     
@@ -94,9 +117,14 @@ class Restaurant(Base):
     total_reviews = Column(Integer, default=0)
     verification_status = Column(Enum(VerificationStatusEnum), default=VerificationStatusEnum.PENDING)
     verification_notes = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(PageTimestamp, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        # Newest-first restaurant lists (home, admin)
+        Index("ix_restaurants_created_id", "created_at", "id"),
+    )
+    
     # Relationships
     owner = relationship("Owner", back_populates="restaurants")
     cuisines = relationship("RestaurantCuisine", back_populates="restaurant")
@@ -155,6 +183,7 @@ class Address(Base):
     restaurant_id = Column(Integer, ForeignKey("restaurants.id"), unique=True, nullable=False)
     latitude = Column(DECIMAL(10, 8), nullable=False)
     longitude = Column(DECIMAL(11, 8), nullable=False)
+    geohash = Column(String(12), nullable=True, index=True)  # Spatial index key for nearby search
     address_line_1 = Column(String(255), nullable=False)
     address_line_2 = Column(String(255), nullable=True)
     city = Column(String(100), nullable=False)
@@ -225,6 +254,20 @@ class OTP(Base):
     delivery_partner = relationship("DeliveryPartner", back_populates="otps")
 
 
+class RevokedToken(Base):
+    """
+    A logged-out access token, kept until it would have expired anyway.
+    Only a SHA-256 digest of the token is stored.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    token_digest = Column(String(64), unique=True, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    # Workers read revocations newer than their last sync
+    revoked_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
 
 
 class DeviceToken(Base):
@@ -269,6 +312,38 @@ class Notification(Base):
     order = relationship("Order")
 
 
+class NotificationOutbox(Base):
+    """
+    A push waiting for the notification worker, written in the same commit as
+    its Notification. Rows are deleted once sent; FAILED rows ran out of retries.
+    """
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # Worker's due-row scan
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    notification_id = Column(Integer, ForeignKey("notifications.id"), nullable=True)
+    owner_id = Column(Integer, ForeignKey("owners.id"), nullable=True)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=True)
+    delivery_partner_id = Column(Integer, ForeignKey("delivery_partners.id"), nullable=True)
+
+    title = Column(String(255), nullable=False)
+    message = Column(Text, nullable=False)
+    data = Column(JSON, nullable=True)  # FCM data payload
+
+    status = Column(Enum(NotificationOutboxStatusEnum), nullable=False, default=NotificationOutboxStatusEnum.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Due time; pushed forward while a worker holds the row and after each failure
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    claim_token = Column(String(32), nullable=True)
+    last_error = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    notification = relationship("Notification")
+
+
 class MenuItem(Base):
     __tablename__ = "menu_items"
     
@@ -314,9 +389,14 @@ class DeliveryPartner(Base):
     verification_notes = Column(Text, nullable=True)  # Admin notes for approval/rejection
     last_online_at = Column(DateTime(timezone=True), nullable=True)
     last_offline_at = Column(DateTime(timezone=True), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(PageTimestamp, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        # Newest-first partner list (admin)
+        Index("ix_delivery_partners_created_id", "created_at", "id"),
+    )
+    
     # Relationships
     orders = relationship("Order", back_populates="delivery_partner")
     device_tokens = relationship("DeviceToken", back_populates="delivery_partner")
@@ -339,6 +419,9 @@ class Order(Base):
     customer_name = Column(String(255), nullable=False)
     customer_phone = Column(String(15), nullable=False)
     delivery_address = Column(Text, nullable=False)
+    # Drop-off coordinates copied from the customer's address when the order is placed
+    delivery_latitude = Column(DECIMAL(10, 8), nullable=True)
+    delivery_longitude = Column(DECIMAL(11, 8), nullable=True)
     status = Column(Enum(OrderStatusEnum), default=OrderStatusEnum.NEW)
     total_amount = Column(DECIMAL(10, 2), nullable=False)
     delivery_fee = Column(DECIMAL(10, 2), default=0.0)
@@ -357,9 +440,17 @@ class Order(Base):
     rejected_at = Column(DateTime(timezone=True), nullable=True)
     rejection_reason = Column(Text, nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(PageTimestamp, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        # Newest-first order lists: a customer's history, a restaurant's
+        # orders and the riders' READY list
+        Index("ix_orders_customer_created_id", "customer_id", "created_at", "id"),
+        Index("ix_orders_restaurant_created_id", "restaurant_id", "created_at", "id"),
+        Index("ix_orders_status_created_id", "status", "created_at", "id"),
+    )
+    
     # Relationships
     restaurant = relationship("Restaurant", back_populates="orders")
     customer = relationship("Customer", back_populates="orders")
@@ -367,6 +458,51 @@ class Order(Base):
     items = relationship("OrderItem", back_populates="order")
 
 
+class DeliveryOffer(Base):
+    """An order offered to one delivery partner by the dispatcher, open until expires_at"""
+    __tablename__ = "delivery_offers"
+    __table_args__ = (
+        # Rider's open offers (available orders, accept check)
+        Index("ix_delivery_offers_partner_status", "delivery_partner_id", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
+    delivery_partner_id = Column(Integer, ForeignKey("delivery_partners.id"), nullable=False)
+    distance_km = Column(Float, nullable=True)  # Rider to restaurant when offered
+    status = Column(Enum(DeliveryOfferStatusEnum), nullable=False, default=DeliveryOfferStatusEnum.PENDING)
+    offered_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    responded_at = Column(DateTime(timezone=True), nullable=True)
+
+
+
+
+class RestaurantDailyStats(Base):
+    """Per-restaurant, per-day order rollup maintained alongside order writes"""
+    __tablename__ = "restaurant_daily_stats"
+    __table_args__ = (
+        UniqueConstraint("restaurant_id", "stat_date", name="uq_restaurant_daily_stats_day"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    restaurant_id = Column(Integer, ForeignKey("restaurants.id"), nullable=False, index=True)
+    stat_date = Column(Date, nullable=False)  # Day the orders were created (UTC)
+    
+    # Orders created that day, and how many of them currently sit in each status
+    orders_count = Column(Integer, nullable=False, default=0)
+    new_count = Column(Integer, nullable=False, default=0)
+    accepted_count = Column(Integer, nullable=False, default=0)
+    preparing_count = Column(Integer, nullable=False, default=0)
+    ready_count = Column(Integer, nullable=False, default=0)
+    picked_up_count = Column(Integer, nullable=False, default=0)
+    delivered_count = Column(Integer, nullable=False, default=0)
+    released_count = Column(Integer, nullable=False, default=0)
+    rejected_count = Column(Integer, nullable=False, default=0)
+    cancelled_count = Column(Integer, nullable=False, default=0)
+    delivered_revenue = Column(DECIMAL(12, 2), nullable=False, default=0)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class OrderItem(Base):
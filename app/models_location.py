@@ -1,16 +1,26 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
 
 class DeliveryPartnerLocation(Base):
-    """Track real-time location of delivery partners"""
+    """
+    Raw GPS history of delivery partners, written in batches by the ingest buffer.
+    On MySQL the table is range-partitioned by day (which rules out its foreign
+    keys there); the retention job archives old trails into DeliveryRoute and
+    then drops whole partitions.
+    """
     __tablename__ = "delivery_partner_locations"
+    __table_args__ = (
+        # Only replay reads history now: one order's trail or one partner's recent points
+        Index("ix_dpl_order_created", "order_id", "created_at"),
+        Index("ix_dpl_partner_created", "delivery_partner_id", "created_at"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    delivery_partner_id = Column(Integer, ForeignKey("delivery_partners.id"), nullable=False, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True, index=True)  # Active order being delivered
+    id = Column(Integer, primary_key=True)
+    delivery_partner_id = Column(Integer, ForeignKey("delivery_partners.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)  # Active order being delivered
     
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
@@ -21,7 +31,7 @@ class DeliveryPartnerLocation(Base):
     # Address details (reverse geocoded)
     address = Column(Text, nullable=True)
     
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
@@ -29,6 +39,47 @@ class DeliveryPartnerLocation(Base):
     order = relationship("Order", backref="delivery_tracking")
 
 
+class DeliveryPartnerCurrentLocation(Base):
+    """Latest known position per delivery partner, upserted from GPS pings"""
+    __tablename__ = "delivery_partner_current_location"
+    
+    delivery_partner_id = Column(Integer, ForeignKey("delivery_partners.id"), primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)  # Active order being delivered
+    
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    accuracy = Column(Float, nullable=True)
+    bearing = Column(Float, nullable=True)
+    speed = Column(Float, nullable=True)
+    # Rider's typical speed: moving average of reported speeds (m/s), for ETAs
+    avg_speed = Column(Float, nullable=True)
+    speed_samples = Column(Integer, nullable=False, default=0)
+    
+    recorded_at = Column(DateTime(timezone=True), nullable=False)  # When the ping was received
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class DeliveryRoute(Base):
+    """Compact path of one delivery, kept after its raw location points are purged"""
+    __tablename__ = "delivery_routes"
+    
+    order_id = Column(Integer, ForeignKey("orders.id"), primary_key=True)
+    delivery_partner_id = Column(Integer, ForeignKey("delivery_partners.id"), nullable=True, index=True)
+    
+    polyline = Column(Text, nullable=False)  # Google encoded polyline, precision 5
+    point_count = Column(Integer, nullable=False)  # Points kept after simplification
+    raw_point_count = Column(Integer, nullable=False)
+    # Every point with its timestamp, delta/varint encoded (geo_service.encode_track)
+    track = Column(LargeBinary(length=16777215), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    ended_at = Column(DateTime(timezone=True), nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    order = relationship("Order")
+
+
 class CustomerLocation(Base):
     """Track customer's delivery address location"""
     __tablename__ = "customer_locations"
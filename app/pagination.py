@@ -0,0 +1,91 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple, List
+from fastapi import HTTPException, Query, status
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query as SAQuery
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class PageParams:
+    """Dependency for keyset-paginated list endpoints"""
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def _encode(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid pagination cursor"
+    )
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) position into an opaque URL-safe cursor"""
+    return _encode({"c": created_at.isoformat(), "i": row_id})
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        payload = _decode(cursor)
+        return datetime.fromisoformat(payload["c"]), int(payload["i"])
+    except Exception:
+        raise _invalid_cursor()
+
+
+def encode_distance_cursor(distance_km: float, row_id: int) -> str:
+    """Encode a (distance, id) position of a nearest-first list"""
+    return _encode({"d": distance_km, "i": row_id})
+
+
+def decode_distance_cursor(cursor: str) -> Tuple[float, int]:
+    """Decode a cursor produced by encode_distance_cursor"""
+    try:
+        payload = _decode(cursor)
+        return float(payload["d"]), int(payload["i"])
+    except Exception:
+        raise _invalid_cursor()
+
+
+def paginate(query: SAQuery, model, params: PageParams) -> Tuple[List, Optional[str]]:
+    """
+    Apply newest-first keyset pagination on (created_at, id) to a query.
+    Returns the page of rows and the cursor for the next page (None on the last page).
+    Cost stays constant however deep the client pages, unlike OFFSET: each
+    list filters on an index ending in (created_at, id), see app.models.
+    """
+    if params.cursor:
+        created_at, row_id = decode_cursor(params.cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(params.limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    return rows, next_cursor
@@ -2,9 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
+from app.dependencies import invalidate_principal
 from app.schemas import APIResponse
 from app.models import Restaurant, VerificationStatusEnum
 from app.services.verification_service import VerificationService
+from app.pagination import PageParams, paginate
+from app.routers import orders
+from app.services.dispatch_service import dispatcher
+from app.services.tracking_service import tracking_manager
+from app.services.notification_service import notification_worker
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -178,6 +184,7 @@ def update_verification_status(
 @router.get("/restaurants/all", response_model=APIResponse)
 def get_all_restaurants(
     status_filter: str = None,
+    page_params: PageParams = Depends(),
     db: Session = Depends(get_db)
 ):
     """Get all restaurants with optional status filter (Admin only)"""
@@ -193,7 +200,7 @@ def get_all_restaurants(
                 detail=f"Invalid status filter: {status_filter}"
             )
     
-    restaurants = query.all()
+    restaurants, next_cursor = paginate(query, Restaurant, page_params)
     
     restaurant_list = []
     for restaurant in restaurants:
@@ -210,7 +217,8 @@ def get_all_restaurants(
     return APIResponse(
         success=True,
         message=f"Found {len(restaurant_list)} restaurants",
-        data={"restaurants": restaurant_list}
+        data={"restaurants": restaurant_list},
+        next_cursor=next_cursor
     )
 
 
@@ -305,7 +313,7 @@ def get_delivery_partner_verification_details(
 
 
 @router.put("/delivery-partners/{partner_id}/verify", response_model=APIResponse)
-async def update_delivery_partner_verification_status(
+def update_delivery_partner_verification_status(
     partner_id: int,
     verification_data: UpdateVerificationRequest,
     db: Session = Depends(get_db)
@@ -341,6 +349,7 @@ async def update_delivery_partner_verification_status(
         
         db.commit()
         db.refresh(partner)
+        invalidate_principal("delivery_partner", partner.id)
         
         # Send notification to delivery partner
         notification_title = ""
@@ -357,7 +366,7 @@ async def update_delivery_partner_verification_status(
             notification_message = "Your registration is currently under review by our team. We'll notify you once it's completed."
         
         # Create notification
-        await NotificationService.create_notification(
+        NotificationService.create_notification_sync(
             db=db,
             delivery_partner_id=partner_id,
             title=notification_title,
@@ -390,6 +399,7 @@ async def update_delivery_partner_verification_status(
 @router.get("/delivery-partners/all", response_model=APIResponse)
 def get_all_delivery_partners(
     status_filter: str = None,
+    page_params: PageParams = Depends(),
     db: Session = Depends(get_db)
 ):
     """Get all delivery partners with optional status filter (Admin only)"""
@@ -407,7 +417,7 @@ def get_all_delivery_partners(
                 detail=f"Invalid status filter: {status_filter}"
             )
     
-    partners = query.all()
+    partners, next_cursor = paginate(query, DeliveryPartner, page_params)
     
     partner_list = []
     for partner in partners:
@@ -427,5 +437,54 @@ def get_all_delivery_partners(
     return APIResponse(
         success=True,
         message=f"Found {len(partner_list)} delivery partners",
-        data={"delivery_partners": partner_list}
+        data={"delivery_partners": partner_list},
+        next_cursor=next_cursor
+    )
+
+
+# ============= Live Orders Monitoring =============
+
+@router.get("/live-orders/metrics", response_model=APIResponse)
+def get_live_order_metrics():
+    """Outbound queue depth, coalescing and eviction counters for this worker's live order sockets (Admin only)"""
+    return APIResponse(
+        success=True,
+        message="Live order metrics retrieved successfully",
+        data=orders.manager.metrics()
+    )
+
+
+# ============= Dispatch Monitoring =============
+
+@router.get("/dispatch/metrics", response_model=APIResponse)
+def get_dispatch_metrics():
+    """Pass count, failures and the last pass summary of this worker's dispatcher (Admin only)"""
+    return APIResponse(
+        success=True,
+        message="Dispatch metrics retrieved successfully",
+        data=dispatcher.stats()
+    )
+
+
+# ============= Live Tracking Monitoring =============
+
+@router.get("/live-tracking/metrics", response_model=APIResponse)
+def get_live_tracking_metrics():
+    """Subscriber count and sent/throttled positions for this worker's customer tracking sockets (Admin only)"""
+    return APIResponse(
+        success=True,
+        message="Live tracking metrics retrieved successfully",
+        data=tracking_manager.metrics()
+    )
+
+
+# ============= Notification Outbox Monitoring =============
+
+@router.get("/notifications/metrics", response_model=APIResponse)
+def get_notification_metrics():
+    """Batches, sent pushes, retries and give-ups of this worker's notification outbox worker (Admin only)"""
+    return APIResponse(
+        success=True,
+        message="Notification metrics retrieved successfully",
+        data=notification_worker.stats()
     )
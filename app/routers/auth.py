@@ -1,28 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from typing import Optional
 from app.database import get_db
+from app.dependencies import optional_security, rate_limit_otp
 from app.schemas import SendOTPRequest, VerifyOTPRequest, TokenResponse, APIResponse, OwnerResponse
 from app.services.otp_service import create_otp, verify_otp, send_otp_sms
-from app.services.jwt_service import create_access_token
+from app.services.otp_store import OTPStoreUnavailable
+from app.services.jwt_service import create_access_token, revoke_token
 from app.models import Owner
 from datetime import timedelta
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
-@router.post("/send-otp", response_model=APIResponse)
-def send_otp(request: SendOTPRequest, db: Session = Depends(get_db)):
+@router.post("/send-otp", response_model=APIResponse, dependencies=[Depends(rate_limit_otp)])
+def send_otp(request: SendOTPRequest):
     """Send OTP to phone number"""
     try:
-        # Check if owner exists
-        owner = db.query(Owner).filter(Owner.phone_number == request.phone_number).first()
-        owner_id = owner.id if owner else None
-        
         # Create OTP
-        otp = create_otp(db, request.phone_number, owner_id)
+        otp_code = create_otp(request.phone_number)
         
         # Send OTP via SMS
-        send_otp_sms(request.phone_number, otp.otp_code)
+        send_otp_sms(request.phone_number, otp_code)
         
         # In development, include OTP in response
         import os
@@ -33,7 +33,7 @@ def send_otp(request: SendOTPRequest, db: Session = Depends(get_db)):
         
         # Add OTP to response in development mode
         if os.getenv('ENVIRONMENT', 'development') == 'development':
-            response_data["otp"] = otp.otp_code
+            response_data["otp"] = otp_code
             response_data["note"] = "OTP included in response for development only"
         
         return APIResponse(
@@ -41,6 +41,14 @@ def send_otp(request: SendOTPRequest, db: Session = Depends(get_db)):
             message="OTP sent successfully",
             data=response_data
         )
+    except HTTPException:
+        raise
+    except OTPStoreUnavailable as e:
+        print(f"✗ OTP store unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="OTP service is temporarily unavailable. Please try again shortly."
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -52,7 +60,14 @@ def send_otp(request: SendOTPRequest, db: Session = Depends(get_db)):
 def verify_otp_endpoint(request: VerifyOTPRequest, db: Session = Depends(get_db)):
     """Verify OTP and return JWT token"""
     # Verify OTP
-    is_valid = verify_otp(db, request.phone_number, request.otp_code)
+    try:
+        is_valid = verify_otp(request.phone_number, request.otp_code)
+    except OTPStoreUnavailable as e:
+        print(f"✗ OTP store unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="OTP service is temporarily unavailable. Please try again shortly."
+        )
     
     if not is_valid:
         raise HTTPException(
@@ -86,20 +101,25 @@ def verify_otp_endpoint(request: VerifyOTPRequest, db: Session = Depends(get_db)
     )
 
 
-@router.post("/resend-otp", response_model=APIResponse)
-def resend_otp(request: SendOTPRequest, db: Session = Depends(get_db)):
+@router.post("/resend-otp", response_model=APIResponse, dependencies=[Depends(rate_limit_otp)])
+def resend_otp(request: SendOTPRequest):
     """Resend OTP to phone number"""
-    return send_otp(request, db)
+    return send_otp(request)
 
 
 @router.post("/logout", response_model=APIResponse)
-def logout():
+def logout(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
     """
     Logout user.
     
-    Since we use stateless JWTs, the client should discard the token.
-    This endpoint is provided for API completeness and future token blacklisting.
+    The bearer token is revoked: it stops working on every server within
+    TOKEN_REVOCATION_SYNC_SECONDS. The client should still discard it.
     """
+    if credentials:
+        revoke_token(db, credentials.credentials)
     return APIResponse(
         success=True,
         message="Logged out successfully",
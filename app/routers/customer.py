@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query, WebSocket, WebSocketDisconnect
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from app.database import get_async_db, get_db
 from app.schemas import (
     CustomerUpdate, CustomerResponse, APIResponse, RestaurantResponse, 
     CategoryResponse, AddressResponse, CuisineResponse, MenuItemResponse, 
@@ -8,12 +10,21 @@ from app.schemas import (
     OrderCreateRequest, OrderResponse, OrderItemResponse, CustomerAddressCreate, CustomerAddressResponse,
     OrderTrackingResponse, OrderTrackingTimelineStep, DeliveryPartnerResponse
 )
-from app.models import Customer, Restaurant, Category, MenuItem, Review, Cart, CartItem, Order, OrderItem, Address, CustomerAddress, DeliveryPartner
-from app.dependencies import get_current_customer
-from typing import List
+from app.models import Customer, Restaurant, Category, MenuItem, Review, Cart, CartItem, Order, OrderItem, Address, CustomerAddress, DeliveryPartner, OrderStatusEnum
+from app.dependencies import get_current_customer, get_current_customer_async, invalidate_principal, verify_token_async
+from app.pagination import PageParams, paginate, encode_distance_cursor, decode_distance_cursor
+from typing import List, Optional
+import json
 from decimal import Decimal
 from datetime import datetime
 from app.services.notification_service import NotificationService
+from app.services.restaurant_search_service import RestaurantSearchService
+from app.services.order_stats_service import OrderStatsService
+from app.services.location_service import LocationService, _naive
+from app.services.route_service import RouteService
+from app.services.eta_service import eta_estimator
+from app.services.tracking_service import tracking_manager, position_event
+from app.models_location import DeliveryRoute
 
 
 router = APIRouter(prefix="/customer", tags=["Customer"])
@@ -35,6 +46,7 @@ def update_profile(
     
     db.commit()
     db.refresh(current_customer)
+    invalidate_principal("customer", current_customer.id)
     return current_customer
 
 
@@ -46,20 +58,63 @@ def get_profile(current_customer: Customer = Depends(get_current_customer)):
 
 @router.get("/home", response_model=APIResponse)
 def get_home_data(
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(5.0, gt=0, le=50),
+    page_params: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_customer: Customer = Depends(get_current_customer)
 ):
-    """Get home screen data"""
+    """
+    Get home screen data.
+    When latitude and longitude are given, only restaurants within radius_km are
+    returned nearest first. Otherwise restaurants are returned newest first.
+    Both lists are paginated by cursor.
+    """
     # Get categories
     categories = db.query(Category).filter(Category.is_active == True).order_by(Category.display_order).all()
     
-    # Get restaurants (simplified logic for now)
-    restaurants = db.query(Restaurant).filter(Restaurant.is_active == True, Restaurant.is_open == True).all()
+    limit = page_params.limit
+    nearby = None
+    next_cursor = None
+    if latitude is not None and longitude is not None:
+        # Nearby search through the geohash index
+        matches, total = RestaurantSearchService.find_nearby(
+            db, latitude, longitude, radius_km,
+            after=decode_distance_cursor(page_params.cursor) if page_params.cursor else None,
+            limit=limit + 1
+        )
+        if len(matches) > limit:
+            matches = matches[:limit]
+            last_restaurant, last_distance = matches[-1]
+            next_cursor = encode_distance_cursor(last_distance, last_restaurant.id)
+        restaurants_data = []
+        for restaurant, distance in matches:
+            restaurant_dict = RestaurantResponse.from_orm(restaurant).dict()
+            restaurant_dict["distance_km"] = round(distance, 2)
+            restaurants_data.append(restaurant_dict)
+        nearby = {
+            "latitude": latitude,
+            "longitude": longitude,
+            "radius_km": radius_km,
+            "limit": limit,
+            "total": total,
+            "has_more": next_cursor is not None
+        }
+    else:
+        # Get restaurants (simplified logic for now)
+        restaurants, next_cursor = paginate(
+            db.query(Restaurant).filter(Restaurant.is_active == True, Restaurant.is_open == True),
+            Restaurant,
+            page_params
+        )
+        restaurants_data = [RestaurantResponse.from_orm(r).dict() for r in restaurants]
     
     # Construct response
     data = {
         "categories": [CategoryResponse.from_orm(c).dict() for c in categories],
-        "restaurants": [RestaurantResponse.from_orm(r).dict() for r in restaurants],
+        "restaurants": restaurants_data,
+        "nearby": nearby,
         "offers": [
             {
                 "id": 1,
@@ -74,7 +129,8 @@ def get_home_data(
     return APIResponse(
         success=True,
         message="Home data fetched successfully",
-        data=data
+        data=data,
+        next_cursor=next_cursor
     )
 
 
@@ -325,87 +381,105 @@ import string
 def generate_order_number():
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
 
+def _place_order(db: Session, request: OrderCreateRequest, customer: Customer) -> Order:
+    """Turn the customer's cart into a committed order and empty the cart"""
+    # 1. Validate Cart/Items
+    cart = get_or_create_cart(db, customer.id)
+    if not cart.items:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+        
+    if cart.restaurant_id != request.restaurant_id:
+         raise HTTPException(status_code=400, detail="Cart restaurant mismatch")
+
+    # 2. Get Address
+    address = db.query(CustomerAddress).filter(
+        CustomerAddress.id == request.address_id,
+        CustomerAddress.customer_id == customer.id
+    ).first()
+    
+    if not address:
+        delivery_address_str = "123 MG Road, Bangalore, Karnataka 560001"
+    else:
+        delivery_address_str = f"{address.address_line_1}, {address.city}, {address.pincode}"
+
+    # 3. Calculate Totals
+    cart_totals = calculate_cart_totals(cart)
+    
+    # Delivery estimate from the restaurant and drop-off coordinates
+    estimated_delivery_time = None
+    restaurant_address = db.query(Address).filter(Address.restaurant_id == request.restaurant_id).first()
+    if address and restaurant_address:
+        estimated_delivery_time = eta_estimator.estimated_delivery_time(
+            float(restaurant_address.latitude), float(restaurant_address.longitude),
+            float(address.latitude), float(address.longitude),
+            city=restaurant_address.city
+        )
+    
+    # 4. Create Order
+    order = Order(
+        order_number=generate_order_number(),
+        restaurant_id=request.restaurant_id,
+        customer_id=customer.id,
+        customer_name=customer.full_name or "Guest",
+        customer_phone=customer.phone_number,
+        delivery_address=delivery_address_str,
+        delivery_latitude=address.latitude if address else None,
+        delivery_longitude=address.longitude if address else None,
+        estimated_delivery_time=estimated_delivery_time,
+        status="new",
+        total_amount=cart_totals.total_amount,
+        delivery_fee=cart_totals.delivery_fee,
+        tax_amount=cart_totals.tax_amount,
+        discount_amount=cart_totals.discount_amount,
+        payment_method=request.payment_method,
+        payment_status="success"
+    )
+    db.add(order)
+    db.flush() # Get order ID without committing yet
+    OrderStatsService.record_created(db, order)
+    
+    # 5. Create Order Items
+    for item in cart.items:
+        price = item.menu_item.discount_price if item.menu_item.discount_price and item.menu_item.discount_price > 0 else item.menu_item.price
+        order_item = OrderItem(
+            order_id=order.id,
+            menu_item_id=item.menu_item_id,
+            quantity=item.quantity,
+            price=price
+        )
+        db.add(order_item)
+        
+    # 6. Clear Cart
+    db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
+    cart.restaurant_id = None
+    
+    db.commit()
+    return order
+
+
 @router.post("/orders", response_model=APIResponse)
 async def create_order(
     request: OrderCreateRequest,
-    db: Session = Depends(get_db),
-    current_customer: Customer = Depends(get_current_customer)
+    db: AsyncSession = Depends(get_async_db),
+    current_customer: Customer = Depends(get_current_customer_async)
 ):
     """Create new order"""
     try:
-        # 1. Validate Cart/Items
-        cart = get_or_create_cart(db, current_customer.id)
-        if not cart.items:
-            raise HTTPException(status_code=400, detail="Cart is empty")
-            
-        if cart.restaurant_id != request.restaurant_id:
-             raise HTTPException(status_code=400, detail="Cart restaurant mismatch")
-
-        # 2. Get Address
-        address = db.query(CustomerAddress).filter(
-            CustomerAddress.id == request.address_id,
-            CustomerAddress.customer_id == current_customer.id
-        ).first()
-        
-        if not address:
-            delivery_address_str = "123 MG Road, Bangalore, Karnataka 560001"
-        else:
-            delivery_address_str = f"{address.address_line_1}, {address.city}, {address.pincode}"
-
-        # 3. Calculate Totals
-        cart_totals = calculate_cart_totals(cart)
-        
-        # 4. Create Order
-        order = Order(
-            order_number=generate_order_number(),
-            restaurant_id=request.restaurant_id,
-            customer_id=current_customer.id,
-            customer_name=current_customer.full_name or "Guest",
-            customer_phone=current_customer.phone_number,
-            delivery_address=delivery_address_str,
-            status="new",
-            total_amount=cart_totals.total_amount,
-            delivery_fee=cart_totals.delivery_fee,
-            tax_amount=cart_totals.tax_amount,
-            discount_amount=cart_totals.discount_amount,
-            payment_method=request.payment_method,
-            payment_status="success"
-        )
-        db.add(order)
-        db.flush() # Get order ID without committing yet
-        
-        # 5. Create Order Items
-        for item in cart.items:
-            price = item.menu_item.discount_price if item.menu_item.discount_price and item.menu_item.discount_price > 0 else item.menu_item.price
-            order_item = OrderItem(
-                order_id=order.id,
-                menu_item_id=item.menu_item_id,
-                quantity=item.quantity,
-                price=price
-            )
-            db.add(order_item)
-            
-        # 6. Clear Cart
-        db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
-        cart.restaurant_id = None
-        
-        # Save order ID and number before commit to avoid expiration issues
-        res_order_id = order.id
-        res_order_number = order.order_number
-        
-        db.commit()
+        # The cart, its items and their menu items load lazily; run_sync
+        # allows that while the queries themselves are awaited
+        order = await db.run_sync(_place_order, request, current_customer)
         
         # Notify owner about new order (best effort, don't fail order if notification fails)
         try:
-            restaurant = db.query(Restaurant).filter(Restaurant.id == request.restaurant_id).first()
-            if restaurant:
-                await NotificationService.create_notification(
-                    db=db,
-                    owner_id=restaurant.owner_id,
+            owner_id = await db.scalar(select(Restaurant.owner_id).where(Restaurant.id == request.restaurant_id))
+            if owner_id:
+                await db.run_sync(
+                    NotificationService.create_notification_sync,
+                    owner_id=owner_id,
                     title="New Order Received!",
-                    message=f"You have a new order #{res_order_number} from {order.customer_name}.",
+                    message=f"You have a new order #{order.order_number} from {order.customer_name}.",
                     notification_type="new_order",
-                    order_id=res_order_id
+                    order_id=order.id
                 )
         except Exception as ne:
             print(f"Notification error: {ne}")
@@ -413,12 +487,12 @@ async def create_order(
         return APIResponse(
             success=True,
             message="Order placed successfully",
-            data={"order_id": res_order_id, "order_number": res_order_number}
+            data={"order_id": order.id, "order_number": order.order_number}
         )
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"Error creating order: {e}")
         raise HTTPException(
             status_code=500,
@@ -532,13 +606,16 @@ def delete_address(
 
 @router.get("/orders", response_model=APIResponse)
 def get_order_history(
+    page_params: PageParams = Depends(),
     db: Session = Depends(get_db),
     current_customer: Customer = Depends(get_current_customer)
 ):
-    """Get customer order history"""
-    orders = db.query(Order).filter(
-        Order.customer_id == current_customer.id
-    ).order_by(Order.created_at.desc()).all()
+    """Get customer order history, newest first, paginated by cursor"""
+    orders, next_cursor = paginate(
+        db.query(Order).filter(Order.customer_id == current_customer.id),
+        Order,
+        page_params
+    )
     
     # Manually construct response to ensure restaurant details are included
     # Pydantic's from_orm should handle the relationship if loaded, but let's be explicit
@@ -553,7 +630,8 @@ def get_order_history(
     return APIResponse(
         success=True,
         message="Order history fetched successfully",
-        data=orders_data
+        data=orders_data,
+        next_cursor=next_cursor
     )
 
 @router.get("/orders/{order_id}", response_model=APIResponse)
@@ -765,6 +843,32 @@ def track_order(
 
 #============= Delivery Partner Location Tracking =============
 
+@router.get("/orders/{order_id}/route", response_model=APIResponse)
+def get_order_route(
+    order_id: int,
+    db: Session = Depends(get_db),
+    current_customer: Customer = Depends(get_current_customer)
+):
+    """Path the delivery partner took for a delivered order, decoded from its compressed track"""
+    order = db.query(Order).filter(
+        Order.id == order_id,
+        Order.customer_id == current_customer.id
+    ).first()
+
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    route = db.get(DeliveryRoute, order_id)
+    if not route:
+        raise HTTPException(status_code=404, detail="Route not available for this order")
+
+    return APIResponse(
+        success=True,
+        message="Order route fetched",
+        data=RouteService.decode(route)
+    )
+
+
 @router.get("/orders/{order_id}/track-location", response_model=APIResponse)
 def track_delivery_partner_location(
     order_id: int,
@@ -775,9 +879,6 @@ def track_delivery_partner_location(
     Track delivery partner's real-time location for an active order.
     Returns the current GPS location of the delivery partner assigned to this order.
     """
-    from sqlalchemy import text
-    from math import radians, sin, cos, sqrt, atan2
-    
     # Get order
     order = db.query(Order).filter(
         Order.id == order_id,
@@ -798,33 +899,37 @@ def track_delivery_partner_location(
             }
         )
     
-    # Get delivery partner's latest location
+    # Get delivery partner's latest location (point lookup, not a history scan)
     try:
-        query = text("""
-            SELECT latitude, longitude, accuracy, bearing, speed, created_at
-            FROM delivery_partner_locations
-            WHERE delivery_partner_id = :partner_id
-            AND (order_id = :order_id OR order_id IS NULL)
-            ORDER BY created_at DESC
-            LIMIT 1
-        """)
+        location = LocationService.get_current_location(db, order.delivery_partner_id)
         
-        result = db.execute(query, {
-            "partner_id": order.delivery_partner_id,
-            "order_id": order_id
-        }).fetchone()
+        # A fix tagged with another order belongs to a different delivery
+        if location and location["order_id"] not in (None, order_id):
+            location = None
         
-        if result:
-            partner_lat, partner_lng, accuracy, bearing, speed, updated_at = result
-            
-            # Calculate distance if customer address has coordinates
-            # For now, return basic location data
-            # In production, you'd geocode the delivery address
+        if location:
+            partner_lat, partner_lng = location["latitude"], location["longitude"]
+            accuracy, bearing, speed = location["accuracy"], location["bearing"], location["speed"]
+            updated_at = location["recorded_at"]
             
-            # Simple ETA estimation (very basic)
-            avg_speed_kmh = (speed * 3.6) if speed and speed > 0 else 20  # Convert m/s to km/h, default 20 km/h
-            estimated_distance_km = 2.0  # Mock distance, should calculate from addresses
-            eta_minutes = int((estimated_distance_km / avg_speed_kmh) * 60)
+            # Remaining ride to the drop-off at the rider's blended speed
+            distance_km = eta_minutes = None
+            if order.delivery_latitude is not None and order.delivery_longitude is not None:
+                city = None
+                if order.restaurant and order.restaurant.address:
+                    city = order.restaurant.address.city
+                trip = eta_estimator.travel_minutes(
+                    partner_lat, partner_lng,
+                    float(order.delivery_latitude), float(order.delivery_longitude),
+                    city=city,
+                    rider_avg_speed=location["avg_speed"],
+                    speed_samples=location["speed_samples"]
+                )
+                distance_km = trip["distance_km"]
+                eta_minutes = max(1, round(trip["minutes"]))
+            elif order.estimated_delivery_time:
+                remaining = _naive(order.estimated_delivery_time) - datetime.utcnow()
+                eta_minutes = max(1, round(remaining.total_seconds() / 60))
             
             return APIResponse(
                 success=True,
@@ -848,6 +953,7 @@ def track_delivery_partner_location(
                         "speed_kmh": round(speed * 3.6, 2) if speed else None,
                         "last_updated": updated_at.isoformat() if updated_at else None
                     },
+                    "distance_km": distance_km,
                     "eta_minutes": eta_minutes,
                     "order_status": order.status
                 }
@@ -881,3 +987,82 @@ def track_delivery_partner_location(
                 "note": "Location tracking feature coming soon"
             }
         )
+
+
+@router.websocket("/orders/{order_id}/live-location")
+async def live_delivery_partner_location(
+    websocket: WebSocket,
+    order_id: int,
+    token: str,
+    interval: Optional[float] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Rider positions for an active order, pushed as the rider reports them.
+    The first message is a snapshot of the order; after that the socket gets
+    "location" messages (at most one per TRACKING_PUSH_INTERVAL_SECONDS, or per
+    `interval` seconds if slower), "assigned" and "delivered". Send "ping" to
+    get "pong".
+    """
+    payload = await verify_token_async(token)
+    customer_id = payload.get("customer_id") if payload else None
+    order = await db.scalar(select(Order).options(
+        joinedload(Order.restaurant).joinedload(Restaurant.address)
+    ).where(
+        Order.id == order_id,
+        Order.customer_id == customer_id
+    )) if customer_id else None
+
+    if not order:
+        await websocket.close(code=1008)
+        return
+
+    trip = {"delivery_partner_id": order.delivery_partner_id}
+    if order.delivery_latitude is not None and order.delivery_longitude is not None:
+        trip["destination"] = (float(order.delivery_latitude), float(order.delivery_longitude))
+        if order.restaurant and order.restaurant.address:
+            trip["city"] = order.restaurant.address.city
+
+    location = None
+    if order.delivery_partner_id:
+        location = await db.run_sync(LocationService.get_current_location, order.delivery_partner_id)
+        if location and location["order_id"] not in (None, order_id):
+            location = None
+        if location:
+            trip["rider_avg_speed"] = location["avg_speed"]
+            trip["speed_samples"] = location["speed_samples"]
+    finished = order.status in (OrderStatusEnum.DELIVERED, OrderStatusEnum.CANCELLED, OrderStatusEnum.REJECTED)
+    snapshot = {
+        "type": "snapshot",
+        "order_id": order.id,
+        "order_status": order.status.value,
+        "delivery_partner_id": order.delivery_partner_id
+    }
+    # Nothing below touches the database; don't hold a connection for the life of the socket
+    await db.close()
+
+    await websocket.accept()
+    subscriber = None
+    try:
+        if finished:
+            await websocket.send_text(json.dumps(snapshot))
+            await websocket.close()
+            return
+
+        subscriber = await tracking_manager.subscribe(websocket, order_id, interval, **trip)
+        subscriber.offer(snapshot)
+        if location:
+            subscriber.offer(position_event(
+                order_id, order.delivery_partner_id, location["latitude"], location["longitude"],
+                location["accuracy"], location["bearing"], location["speed"], location["recorded_at"]
+            ))
+
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                await websocket.send_text("pong")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if subscriber:
+            tracking_manager.unsubscribe(subscriber)
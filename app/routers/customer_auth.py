@@ -1,28 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from typing import Optional
 from app.database import get_db
+from app.dependencies import optional_security, rate_limit_otp
 from app.schemas import SendOTPRequest, VerifyOTPRequest, CustomerTokenResponse, APIResponse, CustomerResponse
 from app.services.otp_service import create_otp, verify_otp, send_otp_sms
-from app.services.jwt_service import create_access_token
+from app.services.otp_store import OTPStoreUnavailable
+from app.services.jwt_service import create_access_token, revoke_token
 from app.models import Customer
 import os
 
 router = APIRouter(prefix="/customer/auth", tags=["Customer Authentication"])
 
 
-@router.post("/send-otp", response_model=APIResponse)
-def send_otp(request: SendOTPRequest, db: Session = Depends(get_db)):
+@router.post("/send-otp", response_model=APIResponse, dependencies=[Depends(rate_limit_otp)])
+def send_otp(request: SendOTPRequest):
     """Send OTP to customer phone number"""
     try:
-        # Check if customer exists
-        customer = db.query(Customer).filter(Customer.phone_number == request.phone_number).first()
-        customer_id = customer.id if customer else None
-        
         # Create OTP
-        otp = create_otp(db, request.phone_number, customer_id=customer_id)
+        otp_code = create_otp(request.phone_number)
         
         # Send OTP via SMS
-        send_otp_sms(request.phone_number, otp.otp_code)
+        send_otp_sms(request.phone_number, otp_code)
         
         response_data = {
             "phone_number": request.phone_number,
@@ -31,7 +31,7 @@ def send_otp(request: SendOTPRequest, db: Session = Depends(get_db)):
         
         # Add OTP to response in development mode
         if os.getenv('ENVIRONMENT', 'development') == 'development':
-            response_data["otp"] = otp.otp_code
+            response_data["otp"] = otp_code
             response_data["note"] = "OTP included in response for development only"
         
         return APIResponse(
@@ -39,6 +39,14 @@ def send_otp(request: SendOTPRequest, db: Session = Depends(get_db)):
             message="OTP sent successfully",
             data=response_data
         )
+    except HTTPException:
+        raise
+    except OTPStoreUnavailable as e:
+        print(f"✗ OTP store unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="OTP service is temporarily unavailable. Please try again shortly."
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -50,7 +58,14 @@ def send_otp(request: SendOTPRequest, db: Session = Depends(get_db)):
 def verify_otp_endpoint(request: VerifyOTPRequest, db: Session = Depends(get_db)):
     """Verify OTP and return JWT token for customer"""
     # Verify OTP
-    is_valid = verify_otp(db, request.phone_number, request.otp_code)
+    try:
+        is_valid = verify_otp(request.phone_number, request.otp_code)
+    except OTPStoreUnavailable as e:
+        print(f"✗ OTP store unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="OTP service is temporarily unavailable. Please try again shortly."
+        )
     
     if not is_valid:
         raise HTTPException(
@@ -139,8 +154,13 @@ def verify_firebase_token_endpoint(request: dict, db: Session = Depends(get_db))
 
 
 @router.post("/logout", response_model=APIResponse)
-def logout():
-    """Logout customer"""
+def logout(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
+    """Logout customer and revoke the bearer token"""
+    if credentials:
+        revoke_token(db, credentials.credentials)
     return APIResponse(
         success=True,
         message="Logged out successfully",
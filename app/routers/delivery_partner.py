@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, desc
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, and_, or_, desc, select
 from typing import List, Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
 import os
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models import (
     DeliveryPartner, Order, OrderStatusEnum, Customer, Restaurant,
-    OrderItem, MenuItem, OTP, DeviceToken, Notification
+    OrderItem, MenuItem, OTP, DeviceToken, Notification,
+    DeliveryOffer, DeliveryOfferStatusEnum
 )
 from app.schemas import (
     CustomerCreate, APIResponse, DeliveryPartnerResponse,
@@ -17,15 +20,28 @@ from app.schemas import (
     DeviceTokenCreate, NotificationResponse, SendOTPRequest, VerifyOTPRequest
 )
 from app.services.otp_service import create_otp, verify_otp, send_otp_sms
-from app.services.jwt_service import create_access_token
-from app.services.notification_service import NotificationService
-from app.dependencies import get_current_delivery_partner
+from app.services.otp_store import OTPStoreUnavailable
+from app.services.jwt_service import create_access_token, revoke_token
+from app.services.notification_service import NotificationService, device_token_recipients
+from app.services.order_stats_service import OrderStatsService
+from app.services.location_ingest_service import location_buffer
+from app.services.location_service import LocationService
+from app.services.route_service import RouteService
+from app.services.dispatch_service import DispatchService
+from app.services.tracking_service import tracking_manager
+from app.dependencies import (
+    get_current_delivery_partner, get_current_delivery_partner_async, invalidate_principal,
+    optional_security, rate_limit_otp, rate_limit_location
+)
+from app.config import get_settings
+from app.pagination import PageParams, paginate
 from pydantic import BaseModel, Field
 
 
 
 
 router = APIRouter(prefix="/delivery-partner", tags=["Delivery Partner"])
+settings = get_settings()
 
 
 # ============= Schemas =============
@@ -118,7 +134,7 @@ class LocationResponse(BaseModel):
 
 
 # ============= Authentication APIs =============
-@router.post("/auth/send-otp", response_model=APIResponse)
+@router.post("/auth/send-otp", response_model=APIResponse, dependencies=[Depends(rate_limit_otp)])
 def send_otp_to_delivery_partner(
     request: SendOTPRequest,
     db: Session = Depends(get_db)
@@ -152,10 +168,10 @@ def send_otp_to_delivery_partner(
             )
         
         # Create OTP
-        otp = create_otp(db, request.phone_number, delivery_partner_id=delivery_partner.id)
+        otp_code = create_otp(request.phone_number)
         
         # Send OTP via SMS
-        send_otp_sms(request.phone_number, otp.otp_code)
+        send_otp_sms(request.phone_number, otp_code)
         
         response_data = {
             "phone_number": request.phone_number,
@@ -164,7 +180,7 @@ def send_otp_to_delivery_partner(
         
         # Add OTP to response in development mode
         if os.getenv('ENVIRONMENT', 'development') == 'development':
-            response_data["otp"] = otp.otp_code
+            response_data["otp"] = otp_code
             response_data["note"] = "OTP included in response for development only"
         
         return APIResponse(
@@ -172,6 +188,14 @@ def send_otp_to_delivery_partner(
             message="OTP sent successfully",
             data=response_data
         )
+    except HTTPException:
+        raise
+    except OTPStoreUnavailable as e:
+        print(f"✗ OTP store unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="OTP service is temporarily unavailable. Please try again shortly."
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -200,7 +224,14 @@ def verify_otp_and_login(
         )
     
     # Verify OTP
-    is_valid = verify_otp(db, request.phone_number, request.otp_code)
+    try:
+        is_valid = verify_otp(request.phone_number, request.otp_code)
+    except OTPStoreUnavailable as e:
+        print(f"✗ OTP store unavailable: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="OTP service is temporarily unavailable. Please try again shortly."
+        )
     
     if not is_valid:
         raise HTTPException(
@@ -220,11 +251,26 @@ def verify_otp_and_login(
     )
 
 
+@router.post("/auth/logout", response_model=APIResponse)
+def logout(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
+    """Logout delivery partner and revoke the bearer token"""
+    if credentials:
+        revoke_token(db, credentials.credentials)
+    return APIResponse(
+        success=True,
+        message="Logged out successfully",
+        data=None
+    )
+
+
 
 # ============= Profile APIs =============
 @router.get("/profile", response_model=DeliveryPartnerResponse)
 async def get_delivery_partner_profile(
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async)
 ):
     """Get current delivery partner's profile."""
     return DeliveryPartnerResponse.from_orm(current_delivery_partner)
@@ -233,8 +279,8 @@ async def get_delivery_partner_profile(
 @router.post("/register", response_model=APIResponse)
 async def register_delivery_partner(
     registration_data: DeliveryPartnerRegisterRequest,
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Complete registration for delivery partner.
@@ -253,8 +299,9 @@ async def register_delivery_partner(
     current_delivery_partner.is_registered = True  # Mark as registered
     current_delivery_partner.verification_status = VerificationStatusEnum.SUBMITTED  # Pending admin approval
     
-    db.commit()
-    db.refresh(current_delivery_partner)
+    await db.commit()
+    await db.refresh(current_delivery_partner)
+    invalidate_principal("delivery_partner", current_delivery_partner.id)
     
     return APIResponse(
         success=True,
@@ -266,8 +313,8 @@ async def register_delivery_partner(
 @router.put("/profile", response_model=APIResponse)
 async def update_delivery_partner_profile(
     update_data: DeliveryPartnerUpdateProfile,
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update delivery partner's profile."""
     if update_data.full_name is not None:
@@ -283,8 +330,9 @@ async def update_delivery_partner_profile(
     if update_data.profile_photo is not None:
         current_delivery_partner.profile_photo = update_data.profile_photo
     
-    db.commit()
-    db.refresh(current_delivery_partner)
+    await db.commit()
+    await db.refresh(current_delivery_partner)
+    invalidate_principal("delivery_partner", current_delivery_partner.id)
     
     return APIResponse(
         success=True,
@@ -297,8 +345,8 @@ async def update_delivery_partner_profile(
 @router.post("/status/toggle", response_model=APIResponse)
 async def toggle_online_status(
     status_data: OnlineStatusRequest,
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Toggle delivery partner's online/offline status.
@@ -340,8 +388,9 @@ async def toggle_online_status(
     else:
         current_delivery_partner.last_offline_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(current_delivery_partner)
+    await db.commit()
+    await db.refresh(current_delivery_partner)
+    invalidate_principal("delivery_partner", current_delivery_partner.id)
     
     status_message = "You are now online and can receive orders" if status_data.is_online else "You are now offline"
     
@@ -358,7 +407,7 @@ async def toggle_online_status(
 
 @router.get("/status", response_model=APIResponse)
 async def get_online_status(
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async)
 ):
     """Get current online/offline status."""
     return APIResponse(
@@ -377,21 +426,23 @@ async def get_online_status(
 @router.post("/device-token", response_model=APIResponse)
 async def register_delivery_partner_device_token(
     token_data: DeviceTokenCreate,
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Register device token for push notifications."""
     # Check if token already exists
-    existing_token = db.query(DeviceToken).filter(
+    existing_token = await db.scalar(select(DeviceToken).where(
         DeviceToken.token == token_data.token
-    ).first()
+    ))
     
     if existing_token:
-        # Update existing token
+        # Update existing token; it may be moving from another account
+        changed = device_token_recipients(existing_token)
         existing_token.delivery_partner_id = current_delivery_partner.id
         existing_token.device_type = token_data.device_type
         existing_token.is_active = True
-        db.commit()
+        await db.commit()
+        NotificationService.invalidate_device_tokens(("delivery_partner", current_delivery_partner.id), *changed)
         return APIResponse(
             success=True,
             message="Device token updated successfully"
@@ -405,7 +456,8 @@ async def register_delivery_partner_device_token(
         is_active=True
     )
     db.add(new_token)
-    db.commit()
+    await db.commit()
+    NotificationService.invalidate_device_tokens(("delivery_partner", current_delivery_partner.id))
     
     return APIResponse(
         success=True,
@@ -414,113 +466,127 @@ async def register_delivery_partner_device_token(
 
 
 # ============= Orders APIs =============
+def _order_list_query(db: Session):
+    """
+    Orders joined with their restaurant name in a single statement,
+    projecting only the columns OrderListResponse needs.
+    """
+    return db.query(
+        Order.id,
+        Order.order_number,
+        Restaurant.restaurant_name,
+        Order.customer_name,
+        Order.customer_phone,
+        Order.delivery_address,
+        Order.total_amount,
+        Order.status,
+        Order.created_at,
+        Order.estimated_delivery_time
+    ).outerjoin(Restaurant, Restaurant.id == Order.restaurant_id)
+
+
+def _to_order_list_response(row) -> OrderListResponse:
+    return OrderListResponse(
+        id=row.id,
+        order_number=row.order_number,
+        restaurant_name=row.restaurant_name or "Unknown",
+        customer_name=row.customer_name,
+        customer_phone=row.customer_phone,
+        delivery_address=row.delivery_address,
+        total_amount=row.total_amount,
+        status=row.status.value,
+        created_at=row.created_at,
+        estimated_delivery_time=row.estimated_delivery_time
+    )
+
+
 @router.get("/orders/available", response_model=List[OrderListResponse])
 async def get_available_orders(
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    response: Response,
+    page_params: PageParams = Depends(),
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Get all orders that are READY for pickup.
-    These are orders the delivery partner can accept.
+    Get orders that are READY for pickup, newest first.
+    With dispatch enabled these are the orders currently offered to this
+    delivery partner plus those open to every rider (no restaurant
+    coordinates, or unclaimed for too long); otherwise every unassigned READY order.
+    The body stays a plain list; the cursor for the next page is returned
+    in the X-Next-Cursor header.
     """
-    orders = db.query(Order).filter(
-        Order.status == OrderStatusEnum.READY,
-        Order.delivery_partner_id == None
-    ).order_by(desc(Order.created_at)).all()
-    
-    result = []
-    for order in orders:
-        restaurant = db.query(Restaurant).filter(Restaurant.id == order.restaurant_id).first()
-        result.append(OrderListResponse(
-            id=order.id,
-            order_number=order.order_number,
-            restaurant_name=restaurant.restaurant_name if restaurant else "Unknown",
-            customer_name=order.customer_name,
-            customer_phone=order.customer_phone,
-            delivery_address=order.delivery_address,
-            total_amount=order.total_amount,
-            status=order.status.value,
-            created_at=order.created_at,
-            estimated_delivery_time=order.estimated_delivery_time
-        ))
+    delivery_partner_id = current_delivery_partner.id
+
+    def _page(session: Session):
+        query = _order_list_query(session).filter(
+            Order.status == OrderStatusEnum.READY,
+            Order.delivery_partner_id == None
+        )
+        if settings.DISPATCH_ENABLED:
+            now = datetime.utcnow()
+            query = query.filter(or_(
+                Order.id.in_(
+                    session.query(DeliveryOffer.order_id).filter(
+                        DeliveryOffer.delivery_partner_id == delivery_partner_id,
+                        DeliveryOffer.status == DeliveryOfferStatusEnum.PENDING,
+                        DeliveryOffer.expires_at > now
+                    )
+                ),
+                DispatchService.open_to_all(now)
+            ))
+        return paginate(query, Order, page_params)
+
+    rows, next_cursor = await db.run_sync(_page)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    return result
+    return [_to_order_list_response(row) for row in rows]
 
 
 @router.get("/orders/active", response_model=List[OrderListResponse])
 async def get_active_orders(
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all active orders assigned to this delivery partner.
     Status: PICKED_UP (out for delivery)
     """
-    orders = db.query(Order).filter(
-        Order.delivery_partner_id == current_delivery_partner.id,
+    delivery_partner_id = current_delivery_partner.id
+    rows = await db.run_sync(lambda session: _order_list_query(session).filter(
+        Order.delivery_partner_id == delivery_partner_id,
         Order.status == OrderStatusEnum.PICKED_UP
-    ).order_by(desc(Order.created_at)).all()
-    
-    result = []
-    for order in orders:
-        restaurant = db.query(Restaurant).filter(Restaurant.id == order.restaurant_id).first()
-        result.append(OrderListResponse(
-            id=order.id,
-            order_number=order.order_number,
-            restaurant_name=restaurant.restaurant_name if restaurant else "Unknown",
-            customer_name=order.customer_name,
-            customer_phone=order.customer_phone,
-            delivery_address=order.delivery_address,
-            total_amount=order.total_amount,
-            status=order.status.value,
-            created_at=order.created_at,
-            estimated_delivery_time=order.estimated_delivery_time
-        ))
+    ).order_by(desc(Order.created_at)).all())
     
-    return result
+    return [_to_order_list_response(row) for row in rows]
 
 
 @router.get("/orders/completed", response_model=List[OrderListResponse])
 async def get_completed_orders(
     limit: int = 50,
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get delivery history - all completed deliveries.
     """
-    orders = db.query(Order).filter(
-        Order.delivery_partner_id == current_delivery_partner.id,
+    delivery_partner_id = current_delivery_partner.id
+    rows = await db.run_sync(lambda session: _order_list_query(session).filter(
+        Order.delivery_partner_id == delivery_partner_id,
         Order.status == OrderStatusEnum.DELIVERED
-    ).order_by(desc(Order.delivered_at)).limit(limit).all()
-    
-    result = []
-    for order in orders:
-        restaurant = db.query(Restaurant).filter(Restaurant.id == order.restaurant_id).first()
-        result.append(OrderListResponse(
-            id=order.id,
-            order_number=order.order_number,
-            restaurant_name=restaurant.restaurant_name if restaurant else "Unknown",
-            customer_name=order.customer_name,
-            customer_phone=order.customer_phone,
-            delivery_address=order.delivery_address,
-            total_amount=order.total_amount,
-            status=order.status.value,
-            created_at=order.created_at,
-            estimated_delivery_time=order.estimated_delivery_time
-        ))
+    ).order_by(desc(Order.delivered_at)).limit(limit).all())
     
-    return result
+    return [_to_order_list_response(row) for row in rows]
 
 
 @router.get("/orders/{order_id}", response_model=OrderDetailForDeliveryResponse)
 async def get_order_details(
     order_id: int,
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get detailed information about a specific order."""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.scalar(select(Order).where(Order.id == order_id))
     
     if not order:
         raise HTTPException(
@@ -538,7 +604,10 @@ async def get_order_details(
         )
     
     # Get restaurant info
-    restaurant = db.query(Restaurant).filter(Restaurant.id == order.restaurant_id).first()
+    restaurant = await db.scalar(select(Restaurant).options(
+        joinedload(Restaurant.address),
+        joinedload(Restaurant.owner)
+    ).where(Restaurant.id == order.restaurant_id))
     restaurant_address = ""
     restaurant_phone = ""
     if restaurant:
@@ -548,7 +617,7 @@ async def get_order_details(
             restaurant_phone = restaurant.owner.phone_number
     
     # Get order items
-    order_items = db.query(OrderItem).filter(OrderItem.order_id == order_id).all()
+    order_items = (await db.scalars(select(OrderItem).where(OrderItem.order_id == order_id))).all()
     items_response = []
     for item in order_items:
         items_response.append(OrderItemResponse(
@@ -580,17 +649,9 @@ async def get_order_details(
     )
 
 
-@router.post("/orders/{order_id}/accept", response_model=APIResponse)
-async def accept_order_for_delivery(
-    order_id: int,
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
-):
-    """
-    Accept an order for delivery.
-    Order must be in READY status.
-    """
-    order = db.query(Order).filter(Order.id == order_id).first()
+async def _raise_claim_error(db: AsyncSession, order_id: int) -> None:
+    """Explain why an order can't be claimed: missing, not READY or already taken"""
+    order = await db.scalar(select(Order).where(Order.id == order_id))
     
     if not order:
         raise HTTPException(
@@ -609,38 +670,79 @@ async def accept_order_for_delivery(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Order has already been accepted by another delivery partner"
         )
+
+
+async def _publish_tracking_event(order_id: int, event_type: str, **fields):
+    """Tell customers following the order; the status change is already committed, so failures are only logged"""
+    try:
+        await tracking_manager.publish(order_id, {"type": event_type, "order_id": order_id, **fields})
+    except Exception as e:
+        print(f"⚠ Failed to publish {event_type} event for order {order_id}: {e}")
+
+
+@router.post("/orders/{order_id}/accept", response_model=APIResponse)
+async def accept_order_for_delivery(
+    order_id: int,
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Accept an order for delivery.
+    Order must be in READY status and not yet taken; when several delivery
+    partners accept at once exactly one claim succeeds. With dispatch enabled
+    it must also be offered to this partner or open to every rider.
+    """
+    offer = None
+    if settings.DISPATCH_ENABLED:
+        offer = await db.run_sync(DispatchService.open_offer, order_id, current_delivery_partner.id)
+        if not offer and not await db.run_sync(DispatchService.is_open_to_all, order_id):
+            await _raise_claim_error(db, order_id)
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="This order is not currently offered to you"
+            )
     
     # Assign delivery partner and update status to PICKED_UP
-    order.delivery_partner_id = current_delivery_partner.id
-    order.status = OrderStatusEnum.PICKED_UP
-    order.pickedup_at = datetime.utcnow()
+    if not await db.run_sync(DispatchService.claim_order, order_id, current_delivery_partner.id):
+        await db.rollback()
+        await _raise_claim_error(db, order_id)
+        # The order changed between the claim and the re-read; report it as taken
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Order has already been accepted by another delivery partner"
+        )
     
-    db.commit()
-    db.refresh(order)
+    order = (await db.execute(
+        select(Order).where(Order.id == order_id).execution_options(populate_existing=True)
+    )).scalar_one()
+    await db.run_sync(OrderStatsService.record_status_change, order, OrderStatusEnum.READY, OrderStatusEnum.PICKED_UP)
+    if offer:
+        offer.status = DeliveryOfferStatusEnum.ACCEPTED
+        offer.responded_at = datetime.utcnow()
     
-    # Send notifications
-    # To Customer
-    if order.customer_id:
-        await NotificationService.create_notification(
-            db=db,
-            customer_id=order.customer_id,
-            title=f"Order #{order.order_number} Picked Up",
-            message=f"{current_delivery_partner.full_name} is on the way with your order!",
-            notification_type="order_update",
-            order_id=order.id
-        )
+    await db.commit()
+    await db.refresh(order)
     
-    # To Restaurant Owner
-    restaurant = db.query(Restaurant).filter(Restaurant.id == order.restaurant_id).first()
-    if restaurant and restaurant.owner_id:
-        await NotificationService.create_notification(
-            db=db,
-            owner_id=restaurant.owner_id,
-            title=f"Order #{order.order_number} Picked Up",
-            message=f"Delivery partner {current_delivery_partner.full_name} has picked up the order",
-            notification_type="order_update",
-            order_id=order.id
-        )
+    await _publish_tracking_event(order.id, "assigned", delivery_partner_id=current_delivery_partner.id)
+    
+    # Send notifications to the customer and the restaurant owner
+    notifications = []
+    if order.customer_id:
+        notifications.append((
+            ("customer", order.customer_id),
+            f"Order #{order.order_number} Picked Up",
+            f"{current_delivery_partner.full_name} is on the way with your order!"
+        ))
+    owner_id = await db.scalar(select(Restaurant.owner_id).where(Restaurant.id == order.restaurant_id))
+    if owner_id:
+        notifications.append((
+            ("owner", owner_id),
+            f"Order #{order.order_number} Picked Up",
+            f"Delivery partner {current_delivery_partner.full_name} has picked up the order"
+        ))
+    await db.run_sync(
+        NotificationService.create_notifications, notifications, notification_type="order_update", order_id=order.id
+    )
     
     return APIResponse(
         success=True,
@@ -649,17 +751,42 @@ async def accept_order_for_delivery(
     )
 
 
-@router.post("/orders/{order_id}/complete", response_model=APIResponse)
-async def mark_order_as_delivered(
+@router.post("/orders/{order_id}/decline", response_model=APIResponse)
+def decline_order_offer(
     order_id: int,
     current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
     db: Session = Depends(get_db)
+):
+    """Decline an order offered to this delivery partner so the dispatcher moves it to the next rider"""
+    offer = DispatchService.open_offer(db, order_id, current_delivery_partner.id)
+    if not offer:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No open offer for this order"
+        )
+    
+    offer.status = DeliveryOfferStatusEnum.DECLINED
+    offer.responded_at = datetime.utcnow()
+    db.commit()
+    
+    return APIResponse(
+        success=True,
+        message="Order offer declined",
+        data={"order_id": order_id}
+    )
+
+
+@router.post("/orders/{order_id}/complete", response_model=APIResponse)
+async def mark_order_as_delivered(
+    order_id: int,
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Mark order as delivered.
     Order must be in PICKED_UP status and assigned to this delivery partner.
     """
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.scalar(select(Order).where(Order.id == order_id))
     
     if not order:
         raise HTTPException(
@@ -683,33 +810,42 @@ async def mark_order_as_delivered(
     order.status = OrderStatusEnum.DELIVERED
     order.delivered_at = datetime.utcnow()
     order.completed_at = datetime.utcnow()
+    await db.run_sync(OrderStatsService.record_status_change, order, OrderStatusEnum.PICKED_UP, OrderStatusEnum.DELIVERED)
     
-    db.commit()
-    db.refresh(order)
+    await db.commit()
+    await db.refresh(order)
+
+    # Compress the trip's GPS trail into its route record; the order is already
+    # delivered, so a failure here only leaves the raw points for the retention job
+    try:
+        await db.run_sync(RouteService.build_route, order.id, purge_raw=True)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        print(f"⚠ Failed to build route for order {order_id}: {e}")
+        # The rollback expired the order; reload it here rather than on attribute access
+        await db.refresh(order)
     
-    # Send notifications
-    # To Customer
-    if order.customer_id:
-        await NotificationService.create_notification(
-            db=db,
-            customer_id=order.customer_id,
-            title=f"Order #{order.order_number} Delivered",
-            message="Your order has been delivered. Enjoy your meal! 🎉",
-            notification_type="order_update",
-            order_id=order.id
-        )
+    await _publish_tracking_event(order.id, "delivered", delivered_at=order.delivered_at.isoformat())
     
-    # To Restaurant Owner
-    restaurant = db.query(Restaurant).filter(Restaurant.id == order.restaurant_id).first()
-    if restaurant and restaurant.owner_id:
-        await NotificationService.create_notification(
-            db=db,
-            owner_id=restaurant.owner_id,
-            title=f"Order #{order.order_number} Delivered",
-            message="Order has been successfully delivered to the customer",
-            notification_type="order_update",
-            order_id=order.id
-        )
+    # Send notifications to the customer and the restaurant owner
+    notifications = []
+    if order.customer_id:
+        notifications.append((
+            ("customer", order.customer_id),
+            f"Order #{order.order_number} Delivered",
+            "Your order has been delivered. Enjoy your meal! 🎉"
+        ))
+    owner_id = await db.scalar(select(Restaurant.owner_id).where(Restaurant.id == order.restaurant_id))
+    if owner_id:
+        notifications.append((
+            ("owner", owner_id),
+            f"Order #{order.order_number} Delivered",
+            "Order has been successfully delivered to the customer"
+        ))
+    await db.run_sync(
+        NotificationService.create_notifications, notifications, notification_type="order_update", order_id=order.id
+    )
     
     return APIResponse(
         success=True,
@@ -721,8 +857,8 @@ async def mark_order_as_delivered(
 # ============= Earnings & Stats =============
 @router.get("/earnings", response_model=EarningsResponse)
 async def get_delivery_partner_earnings(
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get earnings statistics for the delivery partner."""
     now = datetime.utcnow()
@@ -731,31 +867,31 @@ async def get_delivery_partner_earnings(
     month_start = today_start.replace(day=1)
     
     # Today's earnings
-    today_orders = db.query(func.sum(Order.delivery_fee)).filter(
+    today_orders = await db.scalar(select(func.sum(Order.delivery_fee)).where(
         Order.delivery_partner_id == current_delivery_partner.id,
         Order.status == OrderStatusEnum.DELIVERED,
         Order.delivered_at >= today_start
-    ).scalar() or Decimal("0.00")
+    )) or Decimal("0.00")
     
     # Week's earnings
-    week_orders = db.query(func.sum(Order.delivery_fee)).filter(
+    week_orders = await db.scalar(select(func.sum(Order.delivery_fee)).where(
         Order.delivery_partner_id == current_delivery_partner.id,
         Order.status == OrderStatusEnum.DELIVERED,
         Order.delivered_at >= week_start
-    ).scalar() or Decimal("0.00")
+    )) or Decimal("0.00")
     
     # Month's earnings
-    month_orders = db.query(func.sum(Order.delivery_fee)).filter(
+    month_orders = await db.scalar(select(func.sum(Order.delivery_fee)).where(
         Order.delivery_partner_id == current_delivery_partner.id,
         Order.status == OrderStatusEnum.DELIVERED,
         Order.delivered_at >= month_start
-    ).scalar() or Decimal("0.00")
+    )) or Decimal("0.00")
     
     # Total deliveries
-    total_deliveries = db.query(func.count(Order.id)).filter(
+    total_deliveries = await db.scalar(select(func.count(Order.id)).where(
         Order.delivery_partner_id == current_delivery_partner.id,
         Order.status == OrderStatusEnum.DELIVERED
-    ).scalar() or 0
+    )) or 0
     
     return EarningsResponse(
         today_earnings=today_orders,
@@ -770,13 +906,13 @@ async def get_delivery_partner_earnings(
 @router.get("/notifications", response_model=List[NotificationResponse])
 async def get_delivery_partner_notifications(
     limit: int = 50,
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get notification history for delivery partner."""
-    notifications = db.query(Notification).filter(
+    notifications = (await db.scalars(select(Notification).where(
         Notification.delivery_partner_id == current_delivery_partner.id
-    ).order_by(desc(Notification.created_at)).limit(limit).all()
+    ).order_by(desc(Notification.created_at)).limit(limit))).all()
     
     return [NotificationResponse.from_orm(notif) for notif in notifications]
 
@@ -784,14 +920,14 @@ async def get_delivery_partner_notifications(
 @router.put("/notifications/{notification_id}/read", response_model=APIResponse)
 async def mark_notification_as_read(
     notification_id: int,
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark a notification as read."""
-    notification = db.query(Notification).filter(
+    notification = await db.scalar(select(Notification).where(
         Notification.id == notification_id,
         Notification.delivery_partner_id == current_delivery_partner.id
-    ).first()
+    ))
     
     if not notification:
         raise HTTPException(
@@ -800,7 +936,7 @@ async def mark_notification_as_read(
         )
     
     notification.is_read = True
-    db.commit()
+    await db.commit()
     
     return APIResponse(
         success=True,
@@ -810,109 +946,96 @@ async def mark_notification_as_read(
 
 # ============= Location Tracking =============
 
-@router.post("/location/update", response_model=APIResponse)
+@router.post("/location/update", response_model=APIResponse, dependencies=[Depends(rate_limit_location)])
 async def update_delivery_partner_location(
     location_data: UpdateLocationRequest,
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update delivery partner's current location.
     Should be called periodically (every 5-10 seconds) when partner is delivering an order.
+    The ping is acknowledged immediately and written to history in batches.
+    order_id must be an order assigned to this partner; once it is no longer
+    out for delivery the ping is recorded without it.
     """
-    # Import here to avoid circular dependencies
-    import sys
-    import os
-    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    order_id = location_data.order_id
+    if order_id:
+        order = (await db.execute(
+            select(Order.delivery_partner_id, Order.status).where(Order.id == order_id)
+        )).one_or_none()
+        if not order or order.delivery_partner_id != current_delivery_partner.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="This order is not assigned to you"
+            )
+        if order.status != OrderStatusEnum.PICKED_UP:
+            # Its route is already archived; keep the fix for the partner only
+            order_id = None
     
-    # Create a simple location tracking record in-memory or use a separate table
-    # For now, we'll store it in a simple way
-    from sqlalchemy import text
+    received_at = datetime.utcnow()
+    location_buffer.add(
+        delivery_partner_id=current_delivery_partner.id,
+        order_id=order_id,
+        latitude=location_data.latitude,
+        longitude=location_data.longitude,
+        accuracy=location_data.accuracy,
+        bearing=location_data.bearing,
+        speed=location_data.speed,
+        recorded_at=received_at
+    )
     
-    try:
-        # Store location in database
-        query = text("""
-            INSERT INTO delivery_partner_locations 
-            (delivery_partner_id, order_id, latitude, longitude, accuracy, bearing, speed, created_at, updated_at)
-            VALUES (:partner_id, :order_id, :lat, :lng, :accuracy, :bearing, :speed, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-        """)
-        
-        db.execute(query, {
-            "partner_id": current_delivery_partner.id,
-            "order_id": location_data.order_id,
-            "lat": location_data.latitude,
-            "lng": location_data.longitude,
-            "accuracy": location_data.accuracy,
-            "bearing": location_data.bearing,
-            "speed": location_data.speed
-        })
-        db.commit()
-        
-        return APIResponse(
-            success=True,
-            message="Location updated successfully",
-            data={
-                "latitude": location_data.latitude,
-                "longitude": location_data.longitude,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        )
-    except Exception as e:
-        # If table doesn't exist yet, return success anyway
-        # Location tracking is optional
-        return APIResponse(
-            success=True,
-            message="Location update received",
-            data={
-                "latitude": location_data.latitude,
-                "longitude": location_data.longitude,
-                "timestamp": datetime.utcnow().isoformat(),
-                "note": "Location tracking table will be created in next migration"
-            }
-        )
+    # Customers following the order get the ping straight from here, not from the DB
+    if order_id:
+        try:
+            await tracking_manager.publish_position(
+                order_id=order_id,
+                delivery_partner_id=current_delivery_partner.id,
+                latitude=location_data.latitude,
+                longitude=location_data.longitude,
+                accuracy=location_data.accuracy,
+                bearing=location_data.bearing,
+                speed=location_data.speed,
+                recorded_at=received_at
+            )
+        except Exception as e:
+            print(f"⚠ Failed to publish location for order {order_id}: {e}")
+    
+    return APIResponse(
+        success=True,
+        message="Location updated successfully",
+        data={
+            "latitude": location_data.latitude,
+            "longitude": location_data.longitude,
+            "timestamp": received_at.isoformat()
+        }
+    )
 
 
 @router.get("/location/current", response_model=APIResponse)
 async def get_current_location(
-    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
-    db: Session = Depends(get_db)
+    current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get delivery partner's most recent location."""
-    from sqlalchemy import text
+    location = await db.run_sync(LocationService.get_current_location, current_delivery_partner.id)
     
-    try:
-        query = text("""
-            SELECT latitude, longitude, accuracy, bearing, speed, updated_at
-            FROM delivery_partner_locations
-            WHERE delivery_partner_id = :partner_id
-            ORDER BY created_at DESC
-            LIMIT 1
-        """)
-        
-        result = db.execute(query, {"partner_id": current_delivery_partner.id}).fetchone()
-        
-        if result:
-            return APIResponse(
-                success=True,
-                message="Location retrieved successfully",
-                data={
-                    "latitude": result[0],
-                    "longitude": result[1],
-                    "accuracy": result[2],
-                    "bearing": result[3],
-                    "speed": result[4],
-                    "updated_at": result[5].isoformat() if result[5] else None
-                }
-            )
-        else:
-            return APIResponse(
-                success=True,
-                message="No location data available",
-                data=None
-            )
-    except:
+    if not location:
         return APIResponse(
             success=True,
-            message="Location tracking not yet initialized",
+            message="No location data available",
             data=None
         )
+    
+    return APIResponse(
+        success=True,
+        message="Location retrieved successfully",
+        data={
+            "latitude": location["latitude"],
+            "longitude": location["longitude"],
+            "accuracy": location["accuracy"],
+            "bearing": location["bearing"],
+            "speed": location["speed"],
+            "updated_at": location["recorded_at"].isoformat() if location["recorded_at"] else None
+        }
+    )
@@ -5,6 +5,7 @@ from app.database import get_db
 from app.dependencies import get_current_owner, get_current_customer
 from app.models import Notification, DeviceToken, Owner, Customer
 from app.schemas import NotificationResponse, DeviceTokenCreate, DeviceTokenResponse, APIResponse
+from app.services.notification_service import NotificationService, device_token_recipients
 
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
@@ -70,7 +71,10 @@ def register_device_token(
 ):
     """Register or update device token for owner"""
     token = db.query(DeviceToken).filter(DeviceToken.token == request.token).first()
+    changed = [("owner", owner.id)]
     if token:
+        # The token may be moving from another account
+        changed += device_token_recipients(token)
         token.owner_id = owner.id
         token.device_type = request.device_type
         token.is_active = True
@@ -83,6 +87,7 @@ def register_device_token(
         db.add(token)
     
     db.commit()
+    NotificationService.invalidate_device_tokens(*changed)
     return APIResponse(
         success=True,
         message="Device token registered successfully"
@@ -97,7 +102,10 @@ def register_customer_device_token(
 ):
     """Register or update device token for customer"""
     token = db.query(DeviceToken).filter(DeviceToken.token == request.token).first()
+    changed = [("customer", customer.id)]
     if token:
+        # The token may be moving from another account
+        changed += device_token_recipients(token)
         token.customer_id = customer.id
         token.device_type = request.device_type
         token.is_active = True
@@ -110,6 +118,7 @@ def register_customer_device_token(
         db.add(token)
     
     db.commit()
+    NotificationService.invalidate_device_tokens(*changed)
     return APIResponse(
         success=True,
         message="Device token registered successfully"
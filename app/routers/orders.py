@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect, Response
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Tuple
 from datetime import datetime
-from app.database import get_db
-from app.dependencies import get_current_restaurant
+from collections import OrderedDict
+from app.database import get_async_db, get_db
+from app.dependencies import get_current_restaurant, get_current_restaurant_async, verify_token_async
 from app.schemas import OrderResponse, OrderStatusUpdate, APIResponse, OrderSummaryResponse
 from app.models import Restaurant, Order, OrderStatusEnum
+from app.services.broadcast_service import BroadcastBackend, InMemoryBroadcastBackend, create_broadcast_backend
+from app.services.order_event_service import EncodedOrderEvent, encode_order_event
+import asyncio
 import json
 
 
@@ -13,27 +20,188 @@ router = APIRouter(prefix="/orders", tags=["Orders"])
 
 
 # WebSocket connection manager
+class LiveConnection:
+    """
+    One tablet's socket with its own bounded outbound queue and writer task.
+    Queued updates for the same order are coalesced so a slow tablet only
+    receives the latest state, and a send that exceeds the timeout evicts it.
+    """
+    def __init__(self, websocket: WebSocket, restaurant_id: int, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.restaurant_id = restaurant_id
+        self.manager = manager
+        self.pending: "OrderedDict[object, str]" = OrderedDict()
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.writer = asyncio.create_task(self._write_loop())
+    
+    def enqueue(self, key, payload: str):
+        """Queue a payload; safe to call from any event loop or thread"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._enqueue(key, payload)
+        else:
+            self.loop.call_soon_threadsafe(self._enqueue, key, payload)
+    
+    def _enqueue(self, key, payload: str):
+        if self.closed:
+            return
+        if key in self.pending:
+            # Newer state for an order that hasn't gone out yet replaces the stale one
+            self.pending[key] = payload
+            self.manager.coalesced += 1
+        else:
+            if len(self.pending) >= self.manager.max_queue:
+                self.pending.popitem(last=False)
+                self.manager.dropped += 1
+            self.pending[key] = payload
+        self.wakeup.set()
+    
+    async def _write_loop(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.pending:
+                _, payload = self.pending.popitem(last=False)
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(payload), self.manager.send_timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    await self.manager.evict(self)
+                    return
+                self.manager.sent += 1
+    
+    def close(self):
+        self.closed = True
+        self.pending.clear()
+        if not self.writer.done() and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: dict[int, List[WebSocket]] = {}
+    """
+    Holds this worker's sockets and fans order events out through a broadcast
+    backend, so an event published by any worker reaches every connected tablet.
+    Each socket is written by its own task, so one slow tablet never holds up the rest.
+    """
+    SEND_TIMEOUT_SECONDS = 5.0
+    MAX_QUEUE_PER_CONNECTION = 100
+    
+    def __init__(self, backend: BroadcastBackend = None, send_timeout: float = None, max_queue: int = None):
+        self.active_connections: dict[int, List[LiveConnection]] = {}
+        self.backend = backend or create_broadcast_backend()
+        self.send_timeout = send_timeout or self.SEND_TIMEOUT_SECONDS
+        self.max_queue = max_queue or self.MAX_QUEUE_PER_CONNECTION
+        self._started = False
+        # Counters reported by metrics()
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.evictions = 0
+    
+    async def start(self):
+        if self._started:
+            return
+        self._started = True
+        try:
+            await self.backend.start(self.deliver_local)
+        except Exception as e:
+            print(f"⚠ Broadcast backend unavailable ({e}); live orders limited to this process")
+            try:
+                await self.backend.stop()
+            except Exception:
+                pass
+            self.backend = InMemoryBroadcastBackend()
+            await self.backend.start(self.deliver_local)
+    
+    async def stop(self):
+        if self._started:
+            await self.backend.stop()
+            self._started = False
     
     async def connect(self, websocket: WebSocket, restaurant_id: int):
+        await self.start()
         await websocket.accept()
         if restaurant_id not in self.active_connections:
             self.active_connections[restaurant_id] = []
-        self.active_connections[restaurant_id].append(websocket)
+        self.active_connections[restaurant_id].append(LiveConnection(websocket, restaurant_id, self))
     
     def disconnect(self, websocket: WebSocket, restaurant_id: int):
-        if restaurant_id in self.active_connections:
-            self.active_connections[restaurant_id].remove(websocket)
+        connections = self.active_connections.get(restaurant_id, [])
+        for connection in list(connections):
+            if connection.websocket is websocket:
+                self._remove(connection)
+    
+    def _remove(self, connection: LiveConnection):
+        connection.close()
+        connections = self.active_connections.get(connection.restaurant_id)
+        if connections and connection in connections:
+            connections.remove(connection)
+            if not connections:
+                del self.active_connections[connection.restaurant_id]
+    
+    async def evict(self, connection: LiveConnection):
+        """Drop a connection whose send failed or timed out"""
+        self.evictions += 1
+        self._remove(connection)
+        try:
+            await asyncio.wait_for(connection.websocket.close(code=1011), self.send_timeout)
+        except Exception:
+            pass
     
     async def send_to_restaurant(self, restaurant_id: int, message: dict):
-        if restaurant_id in self.active_connections:
-            for connection in self.active_connections[restaurant_id]:
-                try:
-                    await connection.send_json(message)
-                except:
-                    pass
+        order_id = (message.get("order") or {}).get("id")
+        await self.publish(restaurant_id, to_json(message), order_id=order_id)
+    
+    async def publish(self, restaurant_id: int, payload: bytes, order_id: Optional[int] = None):
+        """
+        Publish pre-encoded JSON to every worker; each one delivers to its own sockets.
+        The order id travels in front of the payload so receivers can coalesce without decoding it.
+        """
+        await self.start()
+        await self.backend.publish(restaurant_id, _envelope(order_id, payload))
+    
+    async def deliver_local(self, restaurant_id: int, message: bytes):
+        connections = self.active_connections.get(restaurant_id)
+        if not connections:
+            return
+        order_id, payload = _open_envelope(message)
+        # Decoded once per worker; every socket shares the same text
+        text = payload.decode()
+        key = ("order", order_id) if order_id is not None else object()
+        for connection in list(connections):
+            connection.enqueue(key, text)
+    
+    def metrics(self) -> dict:
+        depths = [len(c.pending) for conns in self.active_connections.values() for c in conns]
+        return {
+            "connections": len(depths),
+            "queue_depth": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "evictions": self.evictions
+        }
+
+
+def _envelope(order_id: Optional[int], payload: bytes) -> bytes:
+    """Prefix a live payload with its order id ("" for other events) and a newline"""
+    return (b"%d" % order_id if order_id is not None else b"") + b"\n" + payload
+
+
+def _open_envelope(message: bytes) -> Tuple[Optional[int], bytes]:
+    """Split a message from _envelope into (order id or None, payload)"""
+    header, separator, payload = message.partition(b"\n")
+    if not separator or not (header.isdigit() or header == b""):
+        # Bare JSON from a worker that predates the envelope
+        return None, message
+    return (int(header) if header else None), payload
 
 
 manager = ConnectionManager()
@@ -125,19 +293,20 @@ def get_completed_orders(
 
 
 from app.services.notification_service import NotificationService
+from app.services.order_stats_service import OrderStatsService
 
 # Helper to handle status updates
 async def update_order_status_helper(
     order_id: int,
     new_status: OrderStatusEnum,
     restaurant_id: int,
-    db: Session,
+    db: AsyncSession,
     timestamp_field: str = None
 ):
-    order = db.query(Order).filter(
+    order = await db.scalar(select(Order).where(
         Order.id == order_id,
         Order.restaurant_id == restaurant_id
-    ).first()
+    ))
     
     if not order:
         raise HTTPException(
@@ -146,6 +315,7 @@ async def update_order_status_helper(
         )
     
     # Update status
+    old_status = order.status
     order.status = new_status
     
     # Update timestamp if specified
@@ -156,33 +326,34 @@ async def update_order_status_helper(
     if new_status == OrderStatusEnum.DELIVERED:
         order.completed_at = datetime.utcnow()
         
-    db.commit()
-    db.refresh(order)
+    await db.run_sync(OrderStatsService.record_status_change, order, old_status, new_status)
+    await db.commit()
+    await db.refresh(order)
     
-    # Broadcast to restaurant WebSocket
-    await broadcast_new_order(restaurant_id, order)
+    # Broadcast to restaurant WebSocket; the encoded order is reused for the reply
+    event = await broadcast_new_order(restaurant_id, order, db=db)
     
     # Send FCM notification and save to DB
-    await NotificationService.send_order_update(
-        db=db,
+    owner_id = await db.scalar(select(Restaurant.owner_id).where(Restaurant.id == order.restaurant_id))
+    await db.run_sync(
+        NotificationService.send_order_update,
         order_id=order.id,
         status=new_status.value,
         customer_id=order.customer_id,
-        owner_id=order.restaurant.owner_id if order.restaurant else None
+        owner_id=owner_id
     )
     
-    return APIResponse(
-        success=True,
-        message=f"Order marked as {new_status.value}",
-        data=OrderResponse.from_orm(order).dict()
+    return Response(
+        content=event.api_response(f"Order marked as {new_status.value}"),
+        media_type="application/json"
     )
 
 
 @router.put("/{order_id}/accept", response_model=APIResponse)
 async def accept_order(
     order_id: int,
-    restaurant: Restaurant = Depends(get_current_restaurant),
-    db: Session = Depends(get_db)
+    restaurant: Restaurant = Depends(get_current_restaurant_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Accept an order"""
     return await update_order_status_helper(
@@ -197,8 +368,8 @@ async def accept_order(
 @router.put("/{order_id}/preparing", response_model=APIResponse)
 async def preparing_order(
     order_id: int,
-    restaurant: Restaurant = Depends(get_current_restaurant),
-    db: Session = Depends(get_db)
+    restaurant: Restaurant = Depends(get_current_restaurant_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark order as preparing"""
     return await update_order_status_helper(
@@ -213,8 +384,8 @@ async def preparing_order(
 @router.put("/{order_id}/ready", response_model=APIResponse)
 async def ready_order(
     order_id: int,
-    restaurant: Restaurant = Depends(get_current_restaurant),
-    db: Session = Depends(get_db)
+    restaurant: Restaurant = Depends(get_current_restaurant_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark order as ready"""
     return await update_order_status_helper(
@@ -229,8 +400,8 @@ async def ready_order(
 @router.put("/{order_id}/pickedup", response_model=APIResponse)
 async def pickedup_order(
     order_id: int,
-    restaurant: Restaurant = Depends(get_current_restaurant),
-    db: Session = Depends(get_db)
+    restaurant: Restaurant = Depends(get_current_restaurant_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark order as picked up"""
     return await update_order_status_helper(
@@ -245,8 +416,8 @@ async def pickedup_order(
 @router.put("/{order_id}/delivered", response_model=APIResponse)
 async def delivered_order(
     order_id: int,
-    restaurant: Restaurant = Depends(get_current_restaurant),
-    db: Session = Depends(get_db)
+    restaurant: Restaurant = Depends(get_current_restaurant_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark order as delivered"""
     return await update_order_status_helper(
@@ -261,8 +432,8 @@ async def delivered_order(
 @router.put("/{order_id}/release", response_model=APIResponse)
 async def release_order(
     order_id: int,
-    restaurant: Restaurant = Depends(get_current_restaurant),
-    db: Session = Depends(get_db)
+    restaurant: Restaurant = Depends(get_current_restaurant_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mark order as released from restaurant"""
     return await update_order_status_helper(
@@ -278,15 +449,15 @@ async def release_order(
 async def reject_order(
     order_id: int,
     status_update: OrderStatusUpdate,
-    restaurant: Restaurant = Depends(get_current_restaurant),
-    db: Session = Depends(get_db)
+    restaurant: Restaurant = Depends(get_current_restaurant_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reject an order"""
     try:
-        order = db.query(Order).filter(
+        order = await db.scalar(select(Order).where(
             Order.id == order_id,
             Order.restaurant_id == restaurant.id
-        ).first()
+        ))
         
         if not order:
             raise HTTPException(
@@ -294,32 +465,33 @@ async def reject_order(
                 detail="Order not found"
             )
         
+        old_status = order.status
         order.status = OrderStatusEnum.REJECTED
         order.rejected_at = datetime.utcnow()
         order.rejection_reason = status_update.rejection_reason
-        db.commit()
-        db.refresh(order)
+        await db.run_sync(OrderStatsService.record_status_change, order, old_status, OrderStatusEnum.REJECTED)
+        await db.commit()
+        await db.refresh(order)
         
         # Send notification to customer
-        await NotificationService.send_order_update(
-            db=db,
+        await db.run_sync(
+            NotificationService.send_order_update,
             order_id=order.id,
             status="rejected",
             customer_id=order.customer_id
         )
         
         # Broadcast update
-        await broadcast_new_order(restaurant.id, order)
+        event = await broadcast_new_order(restaurant.id, order, db=db)
         
-        return APIResponse(
-            success=True,
-            message="Order rejected successfully",
-            data=OrderResponse.from_orm(order).dict()
+        return Response(
+            content=event.api_response("Order rejected successfully"),
+            media_type="application/json"
         )
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to reject order: {str(e)}"
@@ -399,13 +571,12 @@ def get_order_details(
 async def websocket_live_orders(
     websocket: WebSocket,
     token: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """WebSocket endpoint for live order updates"""
     try:
         # Verify token and get restaurant
-        from app.services.jwt_service import verify_token
-        payload = verify_token(token)
+        payload = await verify_token_async(token)
         
         if not payload:
             await websocket.close(code=1008)
@@ -418,19 +589,22 @@ async def websocket_live_orders(
         
         # Get restaurant
         from app.models import Owner
-        owner = db.query(Owner).filter(Owner.id == owner_id).first()
+        owner = await db.scalar(select(Owner).where(Owner.id == owner_id))
         if not owner:
             await websocket.close(code=1008)
             return
         
-        restaurant = db.query(Restaurant).filter(
+        restaurant = await db.scalar(select(Restaurant).where(
             Restaurant.owner_id == owner.id
-        ).first()
+        ))
         
         if not restaurant:
             await websocket.close(code=1008)
             return
         
+        # Return the connection to the pool instead of holding it while the socket is open
+        await db.close()
+        
         # Connect to WebSocket
         await manager.connect(websocket, restaurant.id)
         
@@ -444,6 +618,8 @@ async def websocket_live_orders(
                     await websocket.send_text("pong")
         
         except WebSocketDisconnect:
+            pass
+        finally:
             manager.disconnect(websocket, restaurant.id)
     
     except Exception as e:
@@ -456,27 +632,26 @@ async def websocket_live_orders(
 
 # Helper function to broadcast new orders (to be called when new order is created)
 # Helper function to broadcast order updates
-async def broadcast_new_order(restaurant_id: int, order: Order, event_type: str = None):
+async def broadcast_new_order(
+    restaurant_id: int,
+    order: Order,
+    event_type: str = None,
+    db: Optional[AsyncSession] = None
+) -> EncodedOrderEvent:
     """
     Broadcast order update to restaurant's WebSocket connections.
     If event_type is not provided, it is inferred from the order status.
+    The order is serialized once; the returned event can be reused for the HTTP reply.
+    Pass db when the order belongs to an AsyncSession, so its items and
+    restaurant can be lazy loaded while serializing.
+    The order change is already committed, so publish failures are only logged.
     """
-    if not event_type:
-        status_to_event = {
-            OrderStatusEnum.NEW: "new_order",
-            OrderStatusEnum.ACCEPTED: "order_accepted",
-            OrderStatusEnum.PREPARING: "preparing",
-            OrderStatusEnum.READY: "ready",
-            OrderStatusEnum.PICKED_UP: "pickedup",
-            OrderStatusEnum.DELIVERED: "delivered",
-            OrderStatusEnum.RELEASED: "order_released",
-            OrderStatusEnum.REJECTED: "order_rejected",
-            OrderStatusEnum.CANCELLED: "order_cancelled"
-        }
-        event_type = status_to_event.get(order.status, "order_update")
-
-    message = {
-        "type": event_type,
-        "order": OrderResponse.from_orm(order).dict()
-    }
-    await manager.send_to_restaurant(restaurant_id, message)
+    if db is not None:
+        event = await db.run_sync(lambda _: encode_order_event(order, event_type))
+    else:
+        event = encode_order_event(order, event_type)
+    try:
+        await manager.publish(restaurant_id, event.payload, order_id=event.order_id)
+    except Exception as e:
+        print(f"⚠ Failed to publish {event.event_type} event for order {order.id}: {e}")
+    return event
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.dependencies import get_current_owner
+from app.dependencies import get_current_owner, invalidate_principal
 from app.schemas import OwnerCreate, OwnerUpdate, OwnerResponse, APIResponse
 from app.models import Owner
 
@@ -34,6 +34,7 @@ def create_or_update_owner_details(
         
         db.commit()
         db.refresh(current_owner)
+        invalidate_principal("owner", current_owner.id)
         
         return APIResponse(
             success=True,
@@ -78,6 +79,7 @@ def update_owner_details(
         
         db.commit()
         db.refresh(current_owner)
+        invalidate_principal("owner", current_owner.id)
         
         return APIResponse(
             success=True,
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
-from app.dependencies import get_current_owner, get_current_restaurant
+from app.dependencies import get_current_owner, get_current_restaurant, invalidate_principal
 from app.schemas import (
     RestaurantCreate, RestaurantUpdate, RestaurantResponse, APIResponse,
     CuisineResponse, RestaurantCuisineCreate, AddressCreate, AddressUpdate,
@@ -16,6 +16,7 @@ from app.models import (
 )
 from app.services.s3_service import s3_service
 from app.services.verification_service import VerificationService
+from app.services.restaurant_search_service import RestaurantSearchService
 import uuid
 
 router = APIRouter(prefix="/restaurant", tags=["Restaurant"])
@@ -147,6 +148,7 @@ def create_restaurant_details(
         db.add(restaurant)
         db.commit()
         db.refresh(restaurant)
+        invalidate_principal("owner", restaurant.owner_id)
         
         return APIResponse(
             success=True,
@@ -363,6 +365,7 @@ def create_restaurant_address(
             pincode=address_data.pincode,
             landmark=address_data.landmark
         )
+        RestaurantSearchService.index_address(address)
         
         db.add(address)
         db.commit()
@@ -401,9 +404,9 @@ def update_restaurant_address(
                 detail="Address not found. Use POST to create."
             )
         
-        if address_data.latitude:
+        if address_data.latitude is not None:
             address.latitude = address_data.latitude
-        if address_data.longitude:
+        if address_data.longitude is not None:
             address.longitude = address_data.longitude
         if address_data.address_line_1:
             address.address_line_1 = address_data.address_line_1
@@ -418,6 +421,10 @@ def update_restaurant_address(
         if address_data.landmark is not None:
             address.landmark = address_data.landmark
         
+        # Keep the nearby-search index in step with the coordinates
+        if address_data.latitude is not None or address_data.longitude is not None:
+            RestaurantSearchService.index_address(address)
+        
         db.commit()
         db.refresh(address)
         
@@ -10,6 +10,7 @@ class APIResponse(BaseModel):
     success: bool
     message: str
     data: Optional[Union[dict, list, Any]] = None
+    next_cursor: Optional[str] = None  # Set by keyset-paginated list endpoints
 
 
 # ============= Owner Schemas =============
@@ -0,0 +1,135 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Order events for restaurant N are published on "orders:live:N"
+CHANNEL_PREFIX = "orders:live:"
+
+# Called with (id from the channel name, JSON payload bytes) for every event published by any worker
+MessageHandler = Callable[[int, bytes], Awaitable[None]]
+
+
+def channel_for(restaurant_id: int, prefix: str = CHANNEL_PREFIX) -> str:
+    return f"{prefix}{restaurant_id}"
+
+
+def restaurant_id_from_channel(channel, prefix: str = CHANNEL_PREFIX) -> Optional[int]:
+    if isinstance(channel, bytes):
+        channel = channel.decode()
+    if not channel.startswith(prefix):
+        return None
+    try:
+        return int(channel[len(prefix):])
+    except ValueError:
+        return None
+
+
+class BroadcastBackend:
+    """
+    Fan-out transport for live events keyed by an integer id (a restaurant for
+    order events, an order for rider positions). Every worker publishes
+    through it and receives every event, then delivers to the sockets it
+    holds locally.
+    """
+    async def start(self, handler: MessageHandler) -> None:
+        raise NotImplementedError
+
+    async def stop(self) -> None:
+        raise NotImplementedError
+
+    async def publish(self, restaurant_id: int, message: bytes) -> None:
+        raise NotImplementedError
+
+
+class InMemoryBroadcastBackend(BroadcastBackend):
+    """Single-process backend; share one instance between managers to simulate several workers"""
+    def __init__(self):
+        self.handlers: List[MessageHandler] = []
+
+    async def start(self, handler: MessageHandler) -> None:
+        self.handlers.append(handler)
+
+    async def stop(self) -> None:
+        self.handlers.clear()
+
+    async def publish(self, restaurant_id: int, message: bytes) -> None:
+        for handler in list(self.handlers):
+            await handler(restaurant_id, message)
+
+
+class RedisBroadcastBackend(BroadcastBackend):
+    """Redis pub/sub backend so events reach sockets held by any worker or node"""
+    RECONNECT_DELAY_SECONDS = 1.0
+    MAX_RECONNECT_DELAY_SECONDS = 30.0
+
+    def __init__(self, url: str, prefix: str = CHANNEL_PREFIX):
+        self.url = url
+        self.prefix = prefix
+        self.redis = None
+        self.listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: MessageHandler) -> None:
+        import redis.asyncio as aioredis
+
+        self.redis = aioredis.from_url(self.url)
+        # Fail fast so the caller can fall back when Redis is unreachable
+        await self.redis.ping()
+        self.listener = asyncio.create_task(self._listen(handler))
+
+    async def stop(self) -> None:
+        if self.listener:
+            self.listener.cancel()
+            try:
+                await self.listener
+            except asyncio.CancelledError:
+                pass
+            self.listener = None
+        if self.redis:
+            await self.redis.close()
+            self.redis = None
+
+    async def publish(self, restaurant_id: int, message: bytes) -> None:
+        await self.redis.publish(channel_for(restaurant_id, self.prefix), message)
+
+    async def _listen(self, handler: MessageHandler) -> None:
+        delay = self.RECONNECT_DELAY_SECONDS
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.psubscribe(f"{self.prefix}*")
+                delay = self.RECONNECT_DELAY_SECONDS
+                async for event in pubsub.listen():
+                    if event["type"] != "pmessage":
+                        continue
+                    restaurant_id = restaurant_id_from_channel(event["channel"], self.prefix)
+                    if restaurant_id is None:
+                        continue
+                    data = event["data"]
+                    try:
+                        await handler(restaurant_id, data if isinstance(data, bytes) else data.encode())
+                    except Exception as e:
+                        print(f"⚠ Live delivery failed for {channel_for(restaurant_id, self.prefix)}: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠ Redis pub/sub listener error: {e}; reconnecting in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.MAX_RECONNECT_DELAY_SECONDS)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+
+def create_broadcast_backend(name: Optional[str] = None, prefix: str = CHANNEL_PREFIX) -> BroadcastBackend:
+    """Build the backend named by BROADCAST_BACKEND ("redis" or "memory") for one channel family"""
+    name = (name or settings.BROADCAST_BACKEND).lower()
+    if name == "memory":
+        return InMemoryBroadcastBackend()
+    if name == "redis":
+        return RedisBroadcastBackend(settings.REDIS_URL, prefix)
+    raise ValueError(f"Unknown broadcast backend: {name}")
@@ -1,69 +1,44 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, case
 from datetime import datetime, timedelta
 from decimal import Decimal
-from app.models import Order, OrderStatusEnum, Restaurant
+from app.models import Restaurant, RestaurantDailyStats as Stats
+
+# Orders currently being worked on, summed from the rollup's status buckets
+ONGOING_COUNT = Stats.accepted_count + Stats.preparing_count + Stats.ready_count + Stats.picked_up_count
 
 
 class DashboardService:
+    @staticmethod
+    def _rating_subquery(db: Session, restaurant_id: int):
+        """Restaurant rating folded into the aggregate statement as a scalar subquery"""
+        return db.query(Restaurant.average_rating).filter(
+            Restaurant.id == restaurant_id
+        ).scalar_subquery()
+
     @staticmethod
     def get_today_summary(db: Session, restaurant_id: int) -> dict:
         """Get today's dashboard summary"""
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = today_start + timedelta(days=1)
-        
-        # Get restaurant
-        restaurant = db.query(Restaurant).filter(Restaurant.id == restaurant_id).first()
-        
-        # Total orders today
-        total_orders = db.query(func.count(Order.id)).filter(
-            and_(
-                Order.restaurant_id == restaurant_id,
-                Order.created_at >= today_start,
-                Order.created_at < today_end
-            )
-        ).scalar() or 0
-        
-        # Total earnings today (only from delivered orders)
-        total_earnings = db.query(func.sum(Order.total_amount)).filter(
-            and_(
-                Order.restaurant_id == restaurant_id,
-                Order.created_at >= today_start,
-                Order.created_at < today_end,
-                Order.status == OrderStatusEnum.DELIVERED
-            )
-        ).scalar() or Decimal('0.00')
-        
-        # New orders count
-        new_orders_count = db.query(func.count(Order.id)).filter(
-            and_(
-                Order.restaurant_id == restaurant_id,
-                Order.status == OrderStatusEnum.NEW
-            )
-        ).scalar() or 0
-        
-        # Ongoing orders count
-        ongoing_orders_count = db.query(func.count(Order.id)).filter(
-            and_(
-                Order.restaurant_id == restaurant_id,
-                Order.status.in_([
-                    OrderStatusEnum.ACCEPTED,
-                    OrderStatusEnum.PREPARING,
-                    OrderStatusEnum.READY,
-                    OrderStatusEnum.PICKED_UP
-                ])
-            )
-        ).scalar() or 0
-        
-        # Yesterday's orders for growth calculation
-        yesterday_start = today_start - timedelta(days=1)
-        yesterday_orders = db.query(func.count(Order.id)).filter(
-            and_(
-                Order.restaurant_id == restaurant_id,
-                Order.created_at >= yesterday_start,
-                Order.created_at < today_start
-            )
-        ).scalar() or 0
+        today = datetime.utcnow().date()
+        yesterday = today - timedelta(days=1)
+        
+        # Single pass over the restaurant's daily rollup rows (O(days), not O(orders))
+        row = db.query(
+            # Total orders today
+            func.sum(case((Stats.stat_date == today, Stats.orders_count), else_=0)).label("total_orders"),
+            # Total earnings today (only from delivered orders)
+            func.sum(case((Stats.stat_date == today, Stats.delivered_revenue))).label("total_earnings"),
+            # New orders count
+            func.sum(Stats.new_count).label("new_orders_count"),
+            # Ongoing orders count
+            func.sum(ONGOING_COUNT).label("ongoing_orders_count"),
+            # Yesterday's orders for growth calculation
+            func.sum(case((Stats.stat_date == yesterday, Stats.orders_count), else_=0)).label("yesterday_orders"),
+            DashboardService._rating_subquery(db, restaurant_id).label("avg_rating")
+        ).filter(Stats.restaurant_id == restaurant_id).one()
+        
+        total_orders = row.total_orders or 0
+        yesterday_orders = row.yesterday_orders or 0
         
         today_growth = 0.0
         if yesterday_orders > 0:
@@ -73,12 +48,12 @@ class DashboardService:
             
         return {
             "total_orders": total_orders,
-            "total_earnings": total_earnings,
-            "avg_rating": restaurant.average_rating if restaurant else Decimal('0.00'),
+            "total_earnings": row.total_earnings or Decimal('0.00'),
+            "avg_rating": row.avg_rating if row.avg_rating is not None else Decimal('0.00'),
             "today_growth": round(today_growth, 2),
             "quick_action": DashboardService.get_quick_actions(),
-            "new_orders_count": new_orders_count,
-            "ongoing_orders_count": ongoing_orders_count
+            "new_orders_count": row.new_orders_count or 0,
+            "ongoing_orders_count": row.ongoing_orders_count or 0
         }
     
     @staticmethod
@@ -114,66 +89,24 @@ class DashboardService:
     @staticmethod
     def get_total_summary(db: Session, restaurant_id: int) -> dict:
         """Get all-time (total) dashboard summary"""
-        # Get restaurant
-        restaurant = db.query(Restaurant).filter(Restaurant.id == restaurant_id).first()
-        
-        # Total orders (all time)
-        total_orders = db.query(func.count(Order.id)).filter(
-            Order.restaurant_id == restaurant_id
-        ).scalar() or 0
-        
-        # Total earnings (all time - only delivered orders)
-        total_earnings = db.query(func.sum(Order.total_amount)).filter(
-            and_(
-                Order.restaurant_id == restaurant_id,
-                Order.status == OrderStatusEnum.DELIVERED
-            )
-        ).scalar() or Decimal('0.00')
-        
-        # Total delivered orders
-        delivered_orders = db.query(func.count(Order.id)).filter(
-            and_(
-                Order.restaurant_id == restaurant_id,
-                Order.status == OrderStatusEnum.DELIVERED
-            )
-        ).scalar() or 0
-        
-        # Total rejected orders
-        rejected_orders = db.query(func.count(Order.id)).filter(
-            and_(
-                Order.restaurant_id == restaurant_id,
-                Order.status == OrderStatusEnum.REJECTED
-            )
-        ).scalar() or 0
-        
-        # Total cancelled orders
-        cancelled_orders = db.query(func.count(Order.id)).filter(
-            and_(
-                Order.restaurant_id == restaurant_id,
-                Order.status == OrderStatusEnum.CANCELLED
-            )
-        ).scalar() or 0
-        
-        # New orders count (current)
-        new_orders_count = db.query(func.count(Order.id)).filter(
-            and_(
-                Order.restaurant_id == restaurant_id,
-                Order.status == OrderStatusEnum.NEW
-            )
-        ).scalar() or 0
-        
-        # Ongoing orders count (current)
-        ongoing_orders_count = db.query(func.count(Order.id)).filter(
-            and_(
-                Order.restaurant_id == restaurant_id,
-                Order.status.in_([
-                    OrderStatusEnum.ACCEPTED,
-                    OrderStatusEnum.PREPARING,
-                    OrderStatusEnum.READY,
-                    OrderStatusEnum.PICKED_UP
-                ])
-            )
-        ).scalar() or 0
+        # Single pass over the restaurant's daily rollup rows (O(days), not O(orders))
+        row = db.query(
+            # Total orders (all time)
+            func.sum(Stats.orders_count).label("total_orders"),
+            # Total earnings (all time - only delivered orders)
+            func.sum(Stats.delivered_revenue).label("total_earnings"),
+            func.sum(Stats.delivered_count).label("delivered_orders"),
+            func.sum(Stats.rejected_count).label("rejected_orders"),
+            func.sum(Stats.cancelled_count).label("cancelled_orders"),
+            # New and ongoing orders count (current)
+            func.sum(Stats.new_count).label("new_orders_count"),
+            func.sum(ONGOING_COUNT).label("ongoing_orders_count"),
+            DashboardService._rating_subquery(db, restaurant_id).label("avg_rating")
+        ).filter(Stats.restaurant_id == restaurant_id).one()
+        
+        total_orders = row.total_orders or 0
+        total_earnings = row.total_earnings or Decimal('0.00')
+        delivered_orders = row.delivered_orders or 0
         
         # Average order value
         avg_order_value = Decimal('0.00')
@@ -189,11 +122,11 @@ class DashboardService:
             "total_orders": total_orders,
             "total_earnings": total_earnings,
             "delivered_orders": delivered_orders,
-            "rejected_orders": rejected_orders,
-            "cancelled_orders": cancelled_orders,
+            "rejected_orders": row.rejected_orders or 0,
+            "cancelled_orders": row.cancelled_orders or 0,
             "avg_order_value": round(avg_order_value, 2),
             "success_rate": round(success_rate, 2),
-            "avg_rating": restaurant.average_rating if restaurant else Decimal('0.00'),
-            "new_orders_count": new_orders_count,
-            "ongoing_orders_count": ongoing_orders_count
+            "avg_rating": row.avg_rating if row.avg_rating is not None else Decimal('0.00'),
+            "new_orders_count": row.new_orders_count or 0,
+            "ongoing_orders_count": row.ongoing_orders_count or 0
         }
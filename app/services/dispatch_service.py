@@ -0,0 +1,422 @@
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from math import cos, radians, floor, ceil
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, text, or_, exists, func
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Order, OrderStatusEnum, Address, DeliveryPartner, DeliveryOffer, DeliveryOfferStatusEnum
+from app.models_location import DeliveryPartnerCurrentLocation
+from app.services.geo_service import haversine_km, KM_PER_DEGREE
+from app.services.location_ingest_service import location_buffer
+from app.services.location_service import _naive
+
+settings = get_settings()
+
+# MySQL named lock so only one worker runs a dispatch pass at a time
+DISPATCH_LOCK_NAME = "fastfoodie_dispatch"
+
+
+class PartnerIndex:
+    """
+    Uniform lat/lng grid of rider positions for k-nearest lookups.
+    Cells are cell_deg on a side (~550 m at the default); a query scans
+    rings of cells outward from the target until the k-th best distance is
+    closer than anything an unscanned ring could hold.
+    """
+    def __init__(self, cell_deg: float = 0.005):
+        self.cell_deg = cell_deg
+        self.cells: Dict[Tuple[int, int], List[Tuple[int, float, float]]] = {}
+        self.size = 0
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return floor(latitude / self.cell_deg), floor(longitude / self.cell_deg)
+
+    def add(self, delivery_partner_id: int, latitude: float, longitude: float) -> None:
+        self.cells.setdefault(self._cell(latitude, longitude), []).append((delivery_partner_id, latitude, longitude))
+        self.size += 1
+
+    def _ring(self, row: int, col: int, radius: int) -> Iterable[Tuple[int, int]]:
+        if radius == 0:
+            yield row, col
+            return
+        for dc in range(-radius, radius + 1):
+            yield row - radius, col + dc
+            yield row + radius, col + dc
+        for dr in range(-radius + 1, radius):
+            yield row + dr, col - radius
+            yield row + dr, col + radius
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        max_radius_km: float,
+        skip: Optional[Callable[[int], bool]] = None
+    ) -> List[Tuple[int, float]]:
+        """Up to k (delivery_partner_id, distance_km) within max_radius_km, nearest first, ignoring skipped ids"""
+        if k <= 0 or not self.size:
+            return []
+        # The narrower side of a cell bounds how far each ring reaches
+        cell_km = self.cell_deg * KM_PER_DEGREE * max(cos(radians(min(abs(latitude) + self.cell_deg, 89.0))), 0.01)
+        max_ring = ceil(max_radius_km / cell_km) + 1
+        row, col = self._cell(latitude, longitude)
+
+        # Rank by equirectangular distance (exact enough across a city, no trig per rider)
+        # and only compute haversine for the winners
+        km_per_lng = KM_PER_DEGREE * cos(radians(latitude))
+        max_sq = max_radius_km * max_radius_km
+        best: List[Tuple[float, int, float, float]] = []  # max-heap of the k nearest as (-squared km, id, lat, lng)
+        for ring in range(max_ring + 1):
+            for cell in self._ring(row, col, ring):
+                for partner_id, lat, lng in self.cells.get(cell, ()):
+                    dy = (lat - latitude) * KM_PER_DEGREE
+                    dx = (lng - longitude) * km_per_lng
+                    distance_sq = dx * dx + dy * dy
+                    if distance_sq > max_sq or (len(best) == k and distance_sq >= -best[0][0]):
+                        continue
+                    if skip and skip(partner_id):
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance_sq, partner_id, lat, lng))
+                    else:
+                        heapq.heapreplace(best, (-distance_sq, partner_id, lat, lng))
+            # Anything not yet scanned is at least ring * cell_km away
+            reach = ring * cell_km
+            if len(best) == k and -best[0][0] <= reach * reach:
+                break
+        best.sort(reverse=True)
+        return [(partner_id, haversine_km(latitude, longitude, lat, lng)) for _, partner_id, lat, lng in best]
+
+
+class DispatchEngine:
+    """
+    Decides which riders each open order is offered to. Pure and in-memory:
+    the caller loads orders, rider positions and offer history, and persists
+    the returned offers.
+    """
+    def __init__(
+        self,
+        offers_per_order: int = 3,
+        offer_timeout: timedelta = timedelta(seconds=30),
+        reoffer_cooldown: timedelta = timedelta(seconds=120),
+        max_radius_km: float = 8.0,
+        max_open_offers_per_partner: int = 3
+    ):
+        self.offers_per_order = offers_per_order
+        self.offer_timeout = offer_timeout
+        self.reoffer_cooldown = reoffer_cooldown
+        self.max_radius_km = max_radius_km
+        self.max_open_offers_per_partner = max_open_offers_per_partner
+
+    @classmethod
+    def from_settings(cls) -> "DispatchEngine":
+        return cls(
+            offers_per_order=settings.DISPATCH_OFFERS_PER_ORDER,
+            offer_timeout=timedelta(seconds=settings.DISPATCH_OFFER_TIMEOUT_SECONDS),
+            reoffer_cooldown=timedelta(seconds=settings.DISPATCH_REOFFER_COOLDOWN_SECONDS),
+            max_radius_km=settings.DISPATCH_MAX_RADIUS_KM,
+            max_open_offers_per_partner=settings.DISPATCH_MAX_OPEN_OFFERS_PER_PARTNER
+        )
+
+    def plan(
+        self,
+        orders: List[Tuple[int, float, float]],
+        index: PartnerIndex,
+        offers: List[Tuple[int, int, int, DeliveryOfferStatusEnum, datetime]],
+        busy: Set[int],
+        now: datetime
+    ) -> Tuple[List[dict], List[int]]:
+        """
+        orders: (order_id, latitude, longitude) of open orders, oldest first.
+        offers: (offer_id, order_id, delivery_partner_id, status, expires_at) for those orders.
+        busy: riders already carrying an order.
+        Returns (new offer rows, ids of pending offers that have expired).
+        """
+        expired: List[int] = []
+        open_count: Dict[int, int] = {}  # order_id -> live offers
+        excluded: Dict[int, Set[int]] = {}  # order_id -> riders not to offer it to now
+        load: Dict[int, int] = {}  # rider -> live offers across orders
+        reoffer_before = now - self.reoffer_cooldown
+
+        for offer_id, order_id, partner_id, offer_status, expires_at in offers:
+            if offer_status == DeliveryOfferStatusEnum.PENDING:
+                if expires_at > now:
+                    open_count[order_id] = open_count.get(order_id, 0) + 1
+                    load[partner_id] = load.get(partner_id, 0) + 1
+                    excluded.setdefault(order_id, set()).add(partner_id)
+                    continue
+                expired.append(offer_id)
+                offer_status = DeliveryOfferStatusEnum.EXPIRED
+            if offer_status == DeliveryOfferStatusEnum.DECLINED or (
+                offer_status == DeliveryOfferStatusEnum.EXPIRED and expires_at > reoffer_before
+            ):
+                excluded.setdefault(order_id, set()).add(partner_id)
+
+        new_offers: List[dict] = []
+        expires_at = now + self.offer_timeout
+        for order_id, latitude, longitude in orders:
+            need = self.offers_per_order - open_count.get(order_id, 0)
+            if need <= 0:
+                continue
+            skip_riders = excluded.get(order_id, set())
+
+            def skip(partner_id: int) -> bool:
+                return (
+                    partner_id in skip_riders
+                    or partner_id in busy
+                    or load.get(partner_id, 0) >= self.max_open_offers_per_partner
+                )
+
+            # Oldest orders are planned first, so they get first pick of nearby riders
+            for partner_id, distance in index.nearest(latitude, longitude, need, self.max_radius_km, skip):
+                load[partner_id] = load.get(partner_id, 0) + 1
+                new_offers.append({
+                    "order_id": order_id,
+                    "delivery_partner_id": partner_id,
+                    "distance_km": round(distance, 3),
+                    "status": DeliveryOfferStatusEnum.PENDING,
+                    "offered_at": now,
+                    "expires_at": expires_at
+                })
+        return new_offers, expired
+
+
+@contextmanager
+def _dispatch_lock(db: Session) -> Iterator[bool]:
+    """
+    Hold the dispatch lock for the body; yields whether it was acquired.
+    MySQL named locks belong to the connection that took them, and the
+    Session hands its connection back to the pool on commit, so the lock is
+    taken and released on a dedicated connection of its own.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "mysql":
+        yield True
+        return
+    with bind.engine.connect() as connection:
+        acquired = connection.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": DISPATCH_LOCK_NAME}).scalar() == 1
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": DISPATCH_LOCK_NAME})
+
+
+class DispatchService:
+    @staticmethod
+    def build_partner_index(db: Session, now: datetime) -> PartnerIndex:
+        """Index online riders at their latest fix, skipping fixes older than DISPATCH_LOCATION_MAX_AGE_SECONDS"""
+        fresh_after = now - timedelta(seconds=settings.DISPATCH_LOCATION_MAX_AGE_SECONDS)
+        rows = db.query(
+            DeliveryPartner.id,
+            DeliveryPartnerCurrentLocation.latitude,
+            DeliveryPartnerCurrentLocation.longitude,
+            DeliveryPartnerCurrentLocation.recorded_at
+        ).outerjoin(
+            DeliveryPartnerCurrentLocation, DeliveryPartnerCurrentLocation.delivery_partner_id == DeliveryPartner.id
+        ).filter(
+            DeliveryPartner.is_online == True,
+            DeliveryPartner.is_active == True
+        ).all()
+
+        index = PartnerIndex()
+        for partner_id, latitude, longitude, recorded_at in rows:
+            # A ping this worker hasn't flushed yet is newer than the table
+            pending = location_buffer.latest_point(partner_id)
+            if pending and (recorded_at is None or _naive(pending["created_at"]) >= _naive(recorded_at)):
+                latitude, longitude, recorded_at = pending["latitude"], pending["longitude"], pending["created_at"]
+            if recorded_at is None or _naive(recorded_at) < fresh_after:
+                continue
+            index.add(partner_id, latitude, longitude)
+        return index
+
+    @staticmethod
+    def run_pass(db: Session, now: Optional[datetime] = None, engine: Optional[DispatchEngine] = None) -> dict:
+        """
+        One batched dispatch pass over every open order: four reads, one bulk
+        expiry update and one multi-row insert of new offers, then commit.
+        """
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+        engine = engine or DispatchEngine.from_settings()
+        with _dispatch_lock(db) as acquired:
+            if not acquired:
+                return {"skipped": True}
+            try:
+                index = DispatchService.build_partner_index(db, now)
+
+                # Orders whose restaurant has no coordinates can't be ranked by
+                # distance; they are open to every rider (see open_to_all)
+                orders = [
+                    (order_id, float(latitude), float(longitude))
+                    for order_id, latitude, longitude in db.query(
+                        Order.id, Address.latitude, Address.longitude
+                    ).outerjoin(
+                        Address, Address.restaurant_id == Order.restaurant_id
+                    ).filter(
+                        Order.status == OrderStatusEnum.READY,
+                        Order.delivery_partner_id == None
+                    ).order_by(Order.id).all()
+                    if latitude is not None and longitude is not None
+                ]
+
+                offers = [
+                    (offer_id, order_id, partner_id, offer_status, _naive(expires_at))
+                    for offer_id, order_id, partner_id, offer_status, expires_at in db.query(
+                        DeliveryOffer.id,
+                        DeliveryOffer.order_id,
+                        DeliveryOffer.delivery_partner_id,
+                        DeliveryOffer.status,
+                        DeliveryOffer.expires_at
+                    ).join(Order, Order.id == DeliveryOffer.order_id).filter(
+                        Order.status == OrderStatusEnum.READY,
+                        Order.delivery_partner_id == None,
+                        DeliveryOffer.status != DeliveryOfferStatusEnum.ACCEPTED
+                    ).all()
+                ]
+
+                busy = {
+                    row[0] for row in db.query(Order.delivery_partner_id).filter(
+                        Order.status == OrderStatusEnum.PICKED_UP,
+                        Order.delivery_partner_id != None
+                    ).distinct().all()
+                }
+
+                new_offers, expired = engine.plan(orders, index, offers, busy, now)
+                if expired:
+                    db.query(DeliveryOffer).filter(DeliveryOffer.id.in_(expired)).update(
+                        {DeliveryOffer.status: DeliveryOfferStatusEnum.EXPIRED},
+                        synchronize_session=False
+                    )
+                if new_offers:
+                    db.execute(insert(DeliveryOffer.__table__), new_offers)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+        return {
+            "orders": len(orders),
+            "partners": index.size,
+            "offers_made": len(new_offers),
+            "offers_expired": len(expired),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    @staticmethod
+    def claim_order(db: Session, order_id: int, delivery_partner_id: int, now: Optional[datetime] = None) -> bool:
+        """
+        Assign a READY, unassigned order to a rider and mark it picked up in one
+        conditional UPDATE. Only the row is locked, so concurrent claims on other
+        orders never wait on each other; of several riders racing for the same
+        order exactly one sees an affected row. Does not commit.
+        """
+        now = now or datetime.utcnow()
+        claimed = db.query(Order).filter(
+            Order.id == order_id,
+            Order.status == OrderStatusEnum.READY,
+            Order.delivery_partner_id == None
+        ).update({
+            Order.delivery_partner_id: delivery_partner_id,
+            Order.status: OrderStatusEnum.PICKED_UP,
+            Order.pickedup_at: now
+        }, synchronize_session=False)
+        return claimed == 1
+
+    @staticmethod
+    def open_to_all(now: Optional[datetime] = None):
+        """
+        Filter for READY orders any rider may see and accept without an offer:
+        those whose restaurant has no coordinates to rank riders by, and those
+        still unclaimed DISPATCH_OPEN_TO_ALL_AFTER_SECONDS after becoming ready
+        (no rider in range, or every offer declined or ignored).
+        """
+        now = now or datetime.utcnow()
+        open_after = now - timedelta(seconds=settings.DISPATCH_OPEN_TO_ALL_AFTER_SECONDS)
+        return or_(
+            ~exists().where(
+                Address.restaurant_id == Order.restaurant_id,
+                Address.latitude != None,
+                Address.longitude != None
+            ),
+            func.coalesce(Order.ready_at, Order.created_at) <= open_after
+        )
+
+    @staticmethod
+    def is_open_to_all(db: Session, order_id: int, now: Optional[datetime] = None) -> bool:
+        return db.query(Order.id).filter(
+            Order.id == order_id,
+            DispatchService.open_to_all(now)
+        ).first() is not None
+
+    @staticmethod
+    def open_offer(db: Session, order_id: int, delivery_partner_id: int, now: Optional[datetime] = None) -> Optional[DeliveryOffer]:
+        """The rider's unexpired pending offer for an order, if any"""
+        now = now or datetime.utcnow()
+        return db.query(DeliveryOffer).filter(
+            DeliveryOffer.order_id == order_id,
+            DeliveryOffer.delivery_partner_id == delivery_partner_id,
+            DeliveryOffer.status == DeliveryOfferStatusEnum.PENDING,
+            DeliveryOffer.expires_at > now
+        ).first()
+
+
+class DispatchWorker:
+    """Runs a dispatch pass every interval seconds on a background thread"""
+    def __init__(self, interval: float = 2.0, session_factory: Callable = SessionLocal):
+        self.interval = interval
+        self.session_factory = session_factory
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.passes = 0
+        self.failures = 0
+        self.last_pass: Optional[dict] = None
+
+    def run_once(self) -> Optional[dict]:
+        db = self.session_factory()
+        try:
+            self.last_pass = DispatchService.run_pass(db)
+            self.passes += 1
+            return self.last_pass
+        except Exception as e:
+            self.failures += 1
+            print(f"⚠ Dispatch pass failed: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self.stopping.wait(self.interval):
+            self.run_once()
+
+    def start(self) -> None:
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="dispatch", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 5)
+            self.thread = None
+
+    def stats(self) -> dict:
+        return {
+            "running": bool(self.thread and self.thread.is_alive()),
+            "passes": self.passes,
+            "failures": self.failures,
+            "last_pass": self.last_pass
+        }
+
+
+dispatcher = DispatchWorker(interval=settings.DISPATCH_INTERVAL_SECONDS)
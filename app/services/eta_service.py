@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from app.config import get_settings
+from app.services.geo_service import Coordinates, equirectangular_km_many, haversine_km
+
+settings = get_settings()
+
+# Reported speeds outside this band are GPS noise or a rider standing still
+MIN_SPEED_KMH = 5.0
+MAX_SPEED_KMH = 60.0
+
+
+def _normalize_city(city: Optional[str]) -> str:
+    return city.strip().lower() if city else ""
+
+
+class EtaEstimator:
+    """
+    Travel-time estimates for deliveries. Straight-line distance is scaled by
+    route_factor to approximate road distance, and the rider's moving-average
+    speed is blended with the city's average: with n speed samples the rider's
+    speed gets weight n / (n + prior_samples), so new riders start at the city
+    speed and converge on their own.
+    """
+    def __init__(
+        self,
+        default_speed_kmh: float = 20.0,
+        city_speeds_kmh: Optional[Dict[str, float]] = None,
+        prior_samples: int = 30,
+        route_factor: float = 1.3
+    ):
+        self.default_speed_kmh = default_speed_kmh
+        self.city_speeds_kmh = {_normalize_city(city): speed for city, speed in (city_speeds_kmh or {}).items()}
+        self.prior_samples = prior_samples
+        self.route_factor = route_factor
+
+    @classmethod
+    def from_settings(cls) -> "EtaEstimator":
+        return cls(
+            default_speed_kmh=settings.ETA_DEFAULT_SPEED_KMH,
+            city_speeds_kmh=settings.ETA_CITY_SPEEDS_KMH,
+            prior_samples=settings.ETA_CITY_PRIOR_SAMPLES,
+            route_factor=settings.ETA_ROUTE_FACTOR
+        )
+
+    def city_speed_kmh(self, city: Optional[str] = None) -> float:
+        return self.city_speeds_kmh.get(_normalize_city(city), self.default_speed_kmh)
+
+    def speed_kmh(self, city: Optional[str] = None, rider_avg_speed: Optional[float] = None, speed_samples: int = 0) -> float:
+        """Blended travel speed; rider_avg_speed is in m/s as reported by the app"""
+        city_speed = self.city_speed_kmh(city)
+        if rider_avg_speed is None or speed_samples <= 0:
+            return city_speed
+        rider_speed = min(max(rider_avg_speed * 3.6, MIN_SPEED_KMH), MAX_SPEED_KMH)
+        weight = speed_samples / (speed_samples + self.prior_samples)
+        return weight * rider_speed + (1 - weight) * city_speed
+
+    def travel_minutes(
+        self,
+        from_lat: float,
+        from_lng: float,
+        to_lat: float,
+        to_lng: float,
+        city: Optional[str] = None,
+        rider_avg_speed: Optional[float] = None,
+        speed_samples: int = 0
+    ) -> dict:
+        """Distance and travel time for one trip"""
+        distance_km = haversine_km(from_lat, from_lng, to_lat, to_lng)
+        speed = self.speed_kmh(city, rider_avg_speed, speed_samples)
+        return {
+            "distance_km": round(distance_km, 2),
+            "route_km": round(distance_km * self.route_factor, 2),
+            "speed_kmh": round(speed, 1),
+            "minutes": distance_km * self.route_factor / speed * 60
+        }
+
+    def travel_minutes_many(
+        self,
+        from_lat: Coordinates,
+        from_lng: Coordinates,
+        to_lat: Coordinates,
+        to_lng: Coordinates,
+        city: Optional[str] = None,
+        rider_avg_speeds: Optional[Sequence[Optional[float]]] = None,
+        speed_samples: Optional[Sequence[int]] = None
+    ) -> List[float]:
+        """Travel minutes for many trips in one city, e.g. every active delivery on a tracking board"""
+        distances = equirectangular_km_many(from_lat, from_lng, to_lat, to_lng)
+        if rider_avg_speeds is None:
+            minutes_per_km = self.route_factor * 60 / self.city_speed_kmh(city)
+            return [distance * minutes_per_km for distance in distances]
+        samples = speed_samples or [0] * len(distances)
+        return [
+            distance * self.route_factor * 60 / self.speed_kmh(city, avg_speed, count)
+            for distance, avg_speed, count in zip(distances, rider_avg_speeds, samples)
+        ]
+
+    def estimated_delivery_time(
+        self,
+        restaurant_lat: float,
+        restaurant_lng: float,
+        delivery_lat: float,
+        delivery_lng: float,
+        city: Optional[str] = None,
+        placed_at: Optional[datetime] = None
+    ) -> datetime:
+        """When a newly placed order should arrive: kitchen time plus the ride at city speed"""
+        placed_at = placed_at or datetime.utcnow()
+        trip = self.travel_minutes(restaurant_lat, restaurant_lng, delivery_lat, delivery_lng, city)
+        return placed_at + timedelta(minutes=settings.ETA_PREPARATION_MINUTES + trip["minutes"])
+
+
+eta_estimator = EtaEstimator.from_settings()
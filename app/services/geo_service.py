@@ -0,0 +1,314 @@
+from math import radians, sin, cos, sqrt, atan2, asin, pi
+from typing import List, Sequence, Tuple, Union
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * pi / 180
+
+# Batch distance arguments: a sequence of coordinates, or one value applied to every row
+Coordinates = Union[float, Sequence[float]]
+
+# Precision stored on Address.geohash (~4.8m x 4.8m cells)
+GEOHASH_PRECISION = 9
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {ch: i for i, ch in enumerate(_BASE32)}
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = radians(lat1), radians(lat2)
+    d_phi = radians(lat2 - lat1)
+    d_lambda = radians(lng2 - lng1)
+    a = sin(d_phi / 2) ** 2 + cos(phi1) * cos(phi2) * sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * atan2(sqrt(a), sqrt(1 - a))
+
+
+def _columns(*columns: Coordinates) -> List[Sequence[float]]:
+    """Repeat scalar arguments so every column has the length of the longest sequence"""
+    size = max((len(c) for c in columns if not isinstance(c, (int, float))), default=1)
+    result = []
+    for column in columns:
+        if isinstance(column, (int, float)):
+            result.append([float(column)] * size)
+        elif len(column) != size:
+            raise ValueError(f"Coordinate arrays differ in length: {len(column)} != {size}")
+        else:
+            result.append(column)
+    return result
+
+
+def haversine_km_many(lat1: Coordinates, lng1: Coordinates, lat2: Coordinates, lng2: Coordinates) -> List[float]:
+    """
+    Great-circle distances for many point pairs at once. Any argument may be a
+    single value, e.g. one rider against many destinations.
+    """
+    lat1, lng1, lat2, lng2 = _columns(lat1, lng1, lat2, lng2)
+    to_rad = pi / 180
+    diameter = 2 * EARTH_RADIUS_KM
+    distances = []
+    append = distances.append
+    for a_lat, a_lng, b_lat, b_lng in zip(lat1, lng1, lat2, lng2):
+        half_d_lat = sin((b_lat - a_lat) * to_rad / 2)
+        half_d_lng = sin((b_lng - a_lng) * to_rad / 2)
+        h = half_d_lat * half_d_lat + cos(a_lat * to_rad) * cos(b_lat * to_rad) * half_d_lng * half_d_lng
+        append(diameter * asin(sqrt(min(h, 1.0))))
+    return distances
+
+
+def equirectangular_km_many(lat1: Coordinates, lng1: Coordinates, lat2: Coordinates, lng2: Coordinates) -> List[float]:
+    """
+    Flat-earth approximation of haversine_km_many: one cosine per pair and
+    within 0.1% of the great-circle distance for trips inside a city.
+    """
+    lat1, lng1, lat2, lng2 = _columns(lat1, lng1, lat2, lng2)
+    to_rad = pi / 180
+    distances = []
+    append = distances.append
+    for a_lat, a_lng, b_lat, b_lng in zip(lat1, lng1, lat2, lng2):
+        dx = (b_lng - a_lng) * cos((a_lat + b_lat) * to_rad / 2)
+        dy = b_lat - a_lat
+        append(KM_PER_DEGREE * sqrt(dx * dx + dy * dy))
+    return distances
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encode a coordinate into a base32 geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # Geohash interleaves bits starting with longitude
+
+    while len(chars) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Return (min_lat, min_lng, max_lat, max_lng) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for ch in geohash:
+        value = _BASE32_INDEX[ch]
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_cell_size_km(precision: int, latitude: float = 0.0) -> Tuple[float, float]:
+    """Approximate (height_km, width_km) of a geohash cell at the given latitude"""
+    total_bits = precision * 5
+    lat_bits = total_bits // 2
+    lng_bits = total_bits - lat_bits
+    height_deg = 180.0 / (2 ** lat_bits)
+    width_deg = 360.0 / (2 ** lng_bits)
+    km_per_deg = radians(1) * EARTH_RADIUS_KM
+    return height_deg * km_per_deg, width_deg * km_per_deg * max(cos(radians(latitude)), 0.01)
+
+
+def precision_for_radius(radius_km: float, latitude: float = 0.0) -> int:
+    """
+    Finest geohash precision whose cells are at least radius_km on each side,
+    so that a cell and its eight neighbours always cover the search circle.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height_km, width_km = geohash_cell_size_km(precision, latitude)
+        if height_km >= radius_km and width_km >= radius_km:
+            return precision
+    return 1
+
+
+def geohash_neighbors(geohash: str) -> List[str]:
+    """Return the cell itself plus its eight surrounding cells"""
+    min_lat, min_lng, max_lat, max_lng = geohash_bounds(geohash)
+    center_lat = (min_lat + max_lat) / 2
+    center_lng = (min_lng + max_lng) / 2
+    d_lat = max_lat - min_lat
+    d_lng = max_lng - min_lng
+    precision = len(geohash)
+
+    cells = []
+    for dy in (-1, 0, 1):
+        lat = center_lat + dy * d_lat
+        if lat > 90 or lat < -90:
+            continue
+        for dx in (-1, 0, 1):
+            lng = center_lng + dx * d_lng
+            # Wrap around the antimeridian
+            lng = (lng + 180.0) % 360.0 - 180.0
+            cell = geohash_encode(lat, lng, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def covering_cells(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """Geohash prefixes that together cover a circle of radius_km around a point"""
+    # Size cells at the poleward edge of the circle, where they are narrowest
+    edge_latitude = min(abs(latitude) + radius_km / 111.0, 89.9)
+    precision = precision_for_radius(radius_km, edge_latitude)
+    # Beyond ~2500km a 3x3 block of precision-1 cells is not guaranteed to cover
+    if precision == 1 and radius_km > min(geohash_cell_size_km(1, edge_latitude)):
+        return list(_BASE32)
+    return geohash_neighbors(geohash_encode(latitude, longitude, precision))
+
+
+def simplify_path(points: List[Tuple[float, float]], tolerance_m: float) -> List[int]:
+    """
+    Douglas-Peucker simplification of a lat/lng path.
+    Returns the indexes of the points to keep (always the first and last).
+    Distances use a local equirectangular projection, fine at city scale.
+    """
+    if len(points) <= 2:
+        return list(range(len(points)))
+
+    metres_per_deg = EARTH_RADIUS_KM * 1000 * pi / 180
+    lng_scale = cos(radians(points[0][0]))
+    xy = [(lng * lng_scale * metres_per_deg, lat * metres_per_deg) for lat, lng in points]
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        (x1, y1), (x2, y2) = xy[start], xy[end]
+        dx, dy = x2 - x1, y2 - y1
+        length_sq = dx * dx + dy * dy
+        max_dist, max_index = 0.0, None
+        for i in range(start + 1, end):
+            px, py = xy[i]
+            if length_sq == 0:
+                dist = sqrt((px - x1) ** 2 + (py - y1) ** 2)
+            else:
+                t = max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / length_sq))
+                dist = sqrt((px - x1 - t * dx) ** 2 + (py - y1 - t * dy) ** 2)
+            if dist > max_dist:
+                max_dist, max_index = dist, i
+        if max_index is not None and max_dist > tolerance_m:
+            keep[max_index] = True
+            stack.append((start, max_index))
+            stack.append((max_index, end))
+
+    return [i for i, kept in enumerate(keep) if kept]
+
+
+def encode_polyline(points: List[Tuple[float, float]], precision: int = 5) -> str:
+    """Encode lat/lng points in the Google encoded polyline format"""
+    factor = 10 ** precision
+    chunks = []
+    prev_lat = prev_lng = 0
+    for lat, lng in points:
+        lat_i, lng_i = int(round(lat * factor)), int(round(lng * factor))
+        for delta in (lat_i - prev_lat, lng_i - prev_lng):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        prev_lat, prev_lng = lat_i, lng_i
+    return "".join(chunks)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """Decode a Google encoded polyline into lat/lng points"""
+    factor = 10 ** precision
+    points = []
+    index = lat = lng = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append((lat / factor, lng / factor))
+    return points
+
+
+# Route track blob: version byte, coordinate precision byte, then per point
+# zigzag varint deltas of (lat, lng, unix seconds) from the previous point
+TRACK_FORMAT_VERSION = 1
+TRACK_PRECISION = 5  # 1e-5 degrees, ~1.1 m
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    value = (value << 1) ^ (value >> 63)  # zigzag: small magnitudes of either sign stay short
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, index: int) -> Tuple[int, int]:
+    shift = result = 0
+    while True:
+        byte = data[index]
+        index += 1
+        result |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            break
+    return (result >> 1) ^ -(result & 1), index
+
+
+def encode_track(points: List[Tuple[float, float, int]], precision: int = TRACK_PRECISION) -> bytes:
+    """Encode (lat, lng, unix_seconds) points, in time order, into a compact delta/varint blob"""
+    factor = 10 ** precision
+    out = bytearray([TRACK_FORMAT_VERSION, precision])
+    prev = (0, 0, 0)
+    for lat, lng, ts in points:
+        current = (int(round(lat * factor)), int(round(lng * factor)), int(ts))
+        for value, previous in zip(current, prev):
+            _write_varint(out, value - previous)
+        prev = current
+    return bytes(out)
+
+
+def decode_track(data: bytes) -> List[Tuple[float, float, int]]:
+    """Decode a blob produced by encode_track back into (lat, lng, unix_seconds) points"""
+    if not data:
+        return []
+    if data[0] != TRACK_FORMAT_VERSION:
+        raise ValueError(f"Unsupported track format version: {data[0]}")
+    factor = 10 ** data[1]
+    points = []
+    index = 2
+    lat = lng = ts = 0
+    while index < len(data):
+        d_lat, index = _read_varint(data, index)
+        d_lng, index = _read_varint(data, index)
+        d_ts, index = _read_varint(data, index)
+        lat, lng, ts = lat + d_lat, lng + d_lng, ts + d_ts
+        points.append((lat / factor, lng / factor, ts))
+    return points
@@ -1,11 +1,112 @@
+import calendar
+import hashlib
+import threading
+import time
 from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.cache import TTLCache
 from app.config import get_settings
+from app.database import SessionLocal
+from app.models import RevokedToken
 
 settings = get_settings()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Verified payloads by token digest, each kept until the token expires
+token_cache = TTLCache(ttl=settings.TOKEN_CACHE_TTL_SECONDS, max_size=settings.TOKEN_CACHE_MAX_ENTRIES)
+
+
+def token_digest(token: str) -> str:
+    """Cache and revocation key for a token, so neither holds the token itself"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _epoch(value: datetime) -> float:
+    """Seconds since the epoch for a UTC datetime, naive or aware"""
+    return calendar.timegm(value.utctimetuple())
+
+
+class TokenRevocationList:
+    """
+    Digests of logged-out tokens that have not expired yet. Revocations are
+    stored in revoked_tokens so every worker sees them: each worker keeps a
+    local copy and reads rows revoked since its last sync at most every
+    sync_interval seconds, so a token logged out on one worker stops working
+    on the others within that interval.
+    """
+    # Re-read this much before the last sync, for revocations committed late
+    SYNC_OVERLAP = timedelta(seconds=60)
+
+    def __init__(
+        self,
+        sync_interval: float,
+        session_factory: Callable[[], Session] = SessionLocal,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.sync_interval = sync_interval
+        self.session_factory = session_factory
+        self.clock = clock
+        self._revoked: Dict[str, float] = {}  # digest -> exp
+        self._lock = threading.Lock()
+        self._synced_at: Optional[float] = None
+        self._since: Optional[datetime] = None
+
+    @property
+    def sync_due(self) -> bool:
+        """Whether the next is_revoked() reads the database first"""
+        return self._synced_at is None or self.clock() - self._synced_at >= self.sync_interval
+
+    def is_revoked(self, digest: str) -> bool:
+        if self.sync_due:
+            self.sync()
+        exp = self._revoked.get(digest)
+        return exp is not None and exp > time.time()
+
+    def add(self, digest: str, exp: float) -> None:
+        with self._lock:
+            self._revoked[digest] = exp
+
+    def sync(self) -> None:
+        """Pick up revocations made by other workers"""
+        # One thread syncs; the others keep using the local copy meanwhile
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            started = datetime.utcnow()
+            db = self.session_factory()
+            try:
+                query = db.query(RevokedToken.token_digest, RevokedToken.expires_at).filter(
+                    RevokedToken.expires_at > started
+                )
+                if self._since is not None:
+                    query = query.filter(RevokedToken.revoked_at >= self._since - self.SYNC_OVERLAP)
+                rows = query.all()
+            finally:
+                db.close()
+
+            now = time.time()
+            for digest, expires_at in rows:
+                self._revoked[digest] = _epoch(expires_at)
+            for digest in [digest for digest, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[digest]
+            self._since = started
+        except Exception as e:
+            print(f"⚠ Token revocation sync failed: {e}")
+        finally:
+            # Retry after the interval rather than on every request while the database is down
+            self._synced_at = self.clock()
+            self._lock.release()
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+revoked_tokens = TokenRevocationList(settings.TOKEN_REVOCATION_SYNC_SECONDS)
+
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Create JWT access token"""
@@ -21,13 +122,51 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 
 
 def verify_token(token: str):
-    """Verify and decode JWT token"""
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except JWTError:
+    """Verify and decode JWT token; tokens seen before skip the signature check"""
+    digest = token_digest(token)
+    if revoked_tokens.is_revoked(digest):
         return None
 
+    payload = token_cache.get(digest)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return None
+        if "exp" in payload:
+            remaining = payload["exp"] - time.time()
+            if remaining > 0:
+                token_cache.set(digest, payload, ttl=min(remaining, token_cache.ttl))
+        else:
+            token_cache.set(digest, payload)
+    return dict(payload)
+
+
+def revoke_token(db: Session, token: str) -> bool:
+    """Log a token out on every worker; False if it was not a valid token"""
+    payload = verify_token(token)
+    if payload is None or "exp" not in payload:
+        return False
+
+    digest = token_digest(token)
+    now = datetime.utcnow()
+    db.add(RevokedToken(
+        token_digest=digest,
+        expires_at=datetime.utcfromtimestamp(payload["exp"]),
+        revoked_at=now
+    ))
+    # Expired tokens are rejected by the signature check anyway
+    db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Logged out concurrently by another request
+        db.rollback()
+
+    revoked_tokens.add(digest, payload["exp"])
+    token_cache.invalidate(digest)
+    return True
+
 
 def get_password_hash(password: str):
     """Hash password"""
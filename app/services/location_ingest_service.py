@@ -0,0 +1,320 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, case, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models_location import DeliveryPartnerLocation, DeliveryPartnerCurrentLocation
+
+settings = get_settings()
+
+CURRENT_LOCATION_FIELDS = ["order_id", "latitude", "longitude", "accuracy", "bearing", "speed", "recorded_at"]
+
+# Weight of each flushed batch in a partner's moving-average speed
+SPEED_EMA_ALPHA = 0.2
+
+
+def _speed_updates(table, new) -> list:
+    """Fold a batch's mean speed into the stored moving average; new is the inserted/excluded row"""
+    return [
+        ("avg_speed", case(
+            (new.avg_speed.is_(None), table.c.avg_speed),
+            (table.c.avg_speed.is_(None), new.avg_speed),
+            else_=table.c.avg_speed + SPEED_EMA_ALPHA * (new.avg_speed - table.c.avg_speed)
+        )),
+        ("speed_samples", func.coalesce(table.c.speed_samples, 0) + new.speed_samples)
+    ]
+
+
+def upsert_current_locations(db: Session, points: List[dict]) -> None:
+    """
+    Write the newest point per partner into delivery_partner_current_location
+    and fold the batch's reported speeds into the partner's average speed
+    """
+    latest: Dict[int, dict] = {}
+    speeds: Dict[int, List[float]] = {}
+    for point in points:
+        partner_id = point["delivery_partner_id"]
+        if point["speed"] is not None and point["speed"] >= 0:
+            speeds.setdefault(partner_id, []).append(point["speed"])
+        if partner_id not in latest or point["created_at"] >= latest[partner_id]["recorded_at"]:
+            latest[partner_id] = {
+                "delivery_partner_id": partner_id,
+                **{field: point[field] for field in CURRENT_LOCATION_FIELDS if field != "recorded_at"},
+                "recorded_at": point["created_at"],
+                "updated_at": datetime.utcnow()
+            }
+    if not latest:
+        return
+    for partner_id, row in latest.items():
+        samples = speeds.get(partner_id, [])
+        row["avg_speed"] = sum(samples) / len(samples) if samples else None
+        row["speed_samples"] = len(samples)
+
+    table = DeliveryPartnerCurrentLocation.__table__
+    rows = list(latest.values())
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        statement = dialect_insert(table)
+        is_newer = table.c.recorded_at <= statement.inserted.recorded_at
+        # MySQL applies assignments in order, so recorded_at must be compared before it is overwritten
+        statement = statement.on_duplicate_key_update(_speed_updates(table, statement.inserted) + [
+            (field, case((is_newer, statement.inserted[field]), else_=table.c[field]))
+            for field in CURRENT_LOCATION_FIELDS + ["updated_at"]
+        ])
+    elif dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.delivery_partner_id],
+            set_={
+                **{field: statement.excluded[field] for field in CURRENT_LOCATION_FIELDS + ["updated_at"]},
+                **dict(_speed_updates(table, statement.excluded))
+            },
+            # Never move a partner back to an older fix flushed late by another worker
+            where=table.c.recorded_at <= statement.excluded.recorded_at
+        )
+    else:
+        for row in rows:
+            existing = db.get(DeliveryPartnerCurrentLocation, row["delivery_partner_id"])
+            if existing and existing.avg_speed is not None:
+                if row["avg_speed"] is None:
+                    row["avg_speed"] = existing.avg_speed
+                else:
+                    row["avg_speed"] = existing.avg_speed + SPEED_EMA_ALPHA * (row["avg_speed"] - existing.avg_speed)
+            if existing:
+                row["speed_samples"] += existing.speed_samples or 0
+            db.merge(DeliveryPartnerCurrentLocation(**row))
+        return
+    db.execute(statement, rows)
+
+
+class LocationIngestBuffer:
+    """
+    Buffers rider GPS pings in memory and writes them with multi-row INSERTs.
+    Each flush also upserts the newest point per partner into the
+    latest-location table, and this worker's newest points are kept in
+    memory so reads can see pings that haven't been flushed yet.
+
+    A background thread flushes whenever max_batch points are waiting or
+    flush_interval seconds have passed, so the ping endpoint only appends to
+    a deque and returns. At most max_buffered points are held; beyond that
+    the oldest are dropped, as a newer fix supersedes them anyway.
+
+    A batch the database rejects is retried one point at a time, and points
+    that still fail are dropped, so one bad point never holds up the rest.
+    Only when the database itself is unavailable are points re-queued.
+    """
+    def __init__(
+        self,
+        max_batch: int = 500,
+        flush_interval: float = 1.0,
+        max_buffered: int = 50000,
+        session_factory: Callable = SessionLocal
+    ):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.session_factory = session_factory
+        self.pending: Deque[dict] = deque()
+        # Newest point received by this worker, per partner
+        self.latest: Dict[int, dict] = {}
+        self.lock = threading.Lock()
+        # Serialises flushes between the background thread and explicit flush() calls
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        # Counters reported by stats()
+        self.received = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failures = 0
+
+    @classmethod
+    def from_settings(cls) -> "LocationIngestBuffer":
+        return cls(
+            max_batch=settings.LOCATION_FLUSH_MAX_BATCH,
+            flush_interval=settings.LOCATION_FLUSH_INTERVAL_SECONDS,
+            max_buffered=settings.LOCATION_BUFFER_MAX_POINTS
+        )
+
+    def add(
+        self,
+        delivery_partner_id: int,
+        latitude: float,
+        longitude: float,
+        order_id: Optional[int] = None,
+        accuracy: Optional[float] = None,
+        bearing: Optional[float] = None,
+        speed: Optional[float] = None,
+        recorded_at: Optional[datetime] = None
+    ) -> None:
+        """Queue a ping; the write happens on the flusher thread"""
+        recorded_at = recorded_at or datetime.utcnow()
+        point = {
+            "delivery_partner_id": delivery_partner_id,
+            "order_id": order_id,
+            "latitude": latitude,
+            "longitude": longitude,
+            "accuracy": accuracy,
+            "bearing": bearing,
+            "speed": speed,
+            # Keep the time the ping arrived, not the time its batch is written
+            "created_at": recorded_at,
+            "updated_at": recorded_at
+        }
+        with self.lock:
+            if len(self.pending) >= self.max_buffered:
+                self.pending.popleft()
+                self.dropped += 1
+            self.pending.append(point)
+            self.latest[delivery_partner_id] = point
+            self.received += 1
+            full = len(self.pending) >= self.max_batch
+        self.start()
+        if full:
+            self.wakeup.set()
+
+    def _take_batch(self) -> List[dict]:
+        with self.lock:
+            count = min(len(self.pending), self.max_batch)
+            return [self.pending.popleft() for _ in range(count)]
+
+    def _requeue(self, batch: List[dict]) -> None:
+        with self.lock:
+            room = self.max_buffered - len(self.pending)
+            keep = batch[-room:] if room > 0 else []
+            self.dropped += len(batch) - len(keep)
+            self.pending.extendleft(reversed(keep))
+
+    def _write(self, points: List[dict]) -> None:
+        db = self.session_factory()
+        try:
+            # executemany of one cached statement; the MySQL drivers rewrite
+            # it into a single multi-row INSERT ... VALUES (...), (...)
+            db.execute(insert(DeliveryPartnerLocation.__table__), points)
+            upsert_current_locations(db, points)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_each(self, batch: List[dict]) -> Tuple[int, bool]:
+        """
+        Write a rejected batch point by point, dropping the points that fail.
+        Returns the number written and whether the database became unavailable,
+        in which case the unwritten rest is re-queued.
+        """
+        written = 0
+        for index, point in enumerate(batch):
+            try:
+                self._write([point])
+            except OperationalError as e:
+                self._requeue(batch[index:])
+                print(f"⚠ Location flush failed, {len(batch) - index} points re-queued: {e}")
+                return written, True
+            except Exception as e:
+                self.rejected += 1
+                print(f"⚠ Dropped location point for partner {point['delivery_partner_id']}: {e}")
+                continue
+            written += 1
+        return written, False
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of points written"""
+        written = 0
+        with self.flush_lock:
+            while True:
+                batch = self._take_batch()
+                if not batch:
+                    break
+                unavailable = False
+                try:
+                    self._write(batch)
+                    count = len(batch)
+                except OperationalError as e:
+                    # The database is unreachable or busy; try again on the next flush
+                    self.failures += 1
+                    self._requeue(batch)
+                    print(f"⚠ Location flush failed, {len(batch)} points re-queued: {e}")
+                    break
+                except Exception as e:
+                    self.failures += 1
+                    print(f"⚠ Location batch rejected, writing {len(batch)} points one by one: {e}")
+                    count, unavailable = self._write_each(batch)
+                written += count
+                self.written += count
+                self.batches += 1
+                if unavailable:
+                    break
+        return written
+
+    def _run(self) -> None:
+        while not self.stopping.is_set():
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠ Location flusher error: {e}")
+                time.sleep(self.flush_interval)
+
+    def start(self) -> None:
+        if self.thread and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._run, name="location-ingest", daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and write whatever is still buffered"""
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=self.flush_interval + 5)
+            self.thread = None
+        self.flush()
+
+    def pending_for_order(self, order_id: int) -> List[dict]:
+        """Unflushed points tagged with an order"""
+        with self.lock:
+            return [dict(point) for point in self.pending if point["order_id"] == order_id]
+
+    def latest_point(self, delivery_partner_id: int) -> Optional[dict]:
+        """Newest ping this worker has received for a partner, flushed or not"""
+        with self.lock:
+            return self.latest.get(delivery_partner_id)
+
+    def stats(self) -> dict:
+        with self.lock:
+            buffered = len(self.pending)
+        return {
+            "buffered": buffered,
+            "received": self.received,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "failures": self.failures
+        }
+
+
+location_buffer = LocationIngestBuffer.from_settings()
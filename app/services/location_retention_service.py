@@ -0,0 +1,132 @@
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models_location import DeliveryPartnerLocation
+from app.services.route_service import RouteService
+
+settings = get_settings()
+
+LOCATION_TABLE = DeliveryPartnerLocation.__tablename__
+
+# Daily partitions are named pYYYYMMDD; pmax catches anything beyond the last one
+PARTITION_FORMAT = "p%Y%m%d"
+CATCH_ALL_PARTITION = "pmax"
+
+
+def _is_mysql(db: Session) -> bool:
+    return db.get_bind().dialect.name == "mysql"
+
+
+class LocationRetentionService:
+    @staticmethod
+    def partitions(db: Session) -> List[dict]:
+        """Range partitions of the location table on MySQL, oldest first; empty elsewhere"""
+        if not _is_mysql(db):
+            return []
+        rows = db.execute(text("""
+            SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """), {"table": LOCATION_TABLE}).fetchall()
+        return [{"name": name, "less_than": description} for name, description in rows]
+
+    @staticmethod
+    def ensure_partitions(db: Session, days_ahead: int = 7, today: Optional[date] = None) -> List[str]:
+        """Split daily partitions off pmax so inserts always land in a small, recent partition"""
+        existing = {p["name"] for p in LocationRetentionService.partitions(db)}
+        if CATCH_ALL_PARTITION not in existing:
+            return []
+        today = today or datetime.utcnow().date()
+        created = []
+        for offset in range(days_ahead + 1):
+            day = today + timedelta(days=offset)
+            name = day.strftime(PARTITION_FORMAT)
+            if name in existing:
+                continue
+            db.execute(text(
+                f"ALTER TABLE {LOCATION_TABLE} REORGANIZE PARTITION {CATCH_ALL_PARTITION} INTO ("
+                f"PARTITION {name} VALUES LESS THAN (TO_DAYS('{day + timedelta(days=1)}')), "
+                f"PARTITION {CATCH_ALL_PARTITION} VALUES LESS THAN MAXVALUE)"
+            ))
+            created.append(name)
+        return created
+
+    @staticmethod
+    def archive_routes(db: Session, cutoff: datetime, batch_size: int = 500) -> int:
+        """
+        Archive every order that has points older than cutoff into its route;
+        points that reached an existing route late are appended to it.
+        Returns routes written.
+        """
+        archived = 0
+        last_order_id = 0
+        while True:
+            order_ids = [row[0] for row in db.query(DeliveryPartnerLocation.order_id).filter(
+                DeliveryPartnerLocation.created_at < cutoff,
+                DeliveryPartnerLocation.order_id > last_order_id
+            ).distinct().order_by(DeliveryPartnerLocation.order_id).limit(batch_size).all()]
+            if not order_ids:
+                break
+            for order_id in order_ids:
+                if RouteService.build_route(db, order_id):
+                    archived += 1
+            db.commit()
+            last_order_id = order_ids[-1]
+        return archived
+
+    @staticmethod
+    def purge(db: Session, cutoff: datetime, chunk_size: int = 5000) -> int:
+        """
+        Remove raw points older than cutoff. On a partitioned MySQL table whole
+        daily partitions are dropped (cost independent of row count); elsewhere
+        rows are deleted in chunks. Returns rows deleted, or partitions dropped.
+        """
+        partitions = LocationRetentionService.partitions(db)
+        if partitions:
+            cutoff_days = db.execute(text("SELECT TO_DAYS(:cutoff)"), {"cutoff": cutoff.date()}).scalar()
+            expired = [
+                p["name"] for p in partitions
+                if p["name"] != CATCH_ALL_PARTITION and int(p["less_than"]) <= cutoff_days
+            ]
+            if expired:
+                db.execute(text(f"ALTER TABLE {LOCATION_TABLE} DROP PARTITION {', '.join(expired)}"))
+            return len(expired)
+
+        deleted = 0
+        while True:
+            ids = [row[0] for row in db.query(DeliveryPartnerLocation.id).filter(
+                DeliveryPartnerLocation.created_at < cutoff
+            ).limit(chunk_size).all()]
+            if not ids:
+                break
+            db.query(DeliveryPartnerLocation).filter(
+                DeliveryPartnerLocation.id.in_(ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+            deleted += len(ids)
+        return deleted
+
+    @staticmethod
+    def run(db: Session, retention_days: Optional[int] = None, now: Optional[datetime] = None) -> dict:
+        """Full retention pass: pre-create partitions, archive old trails, then purge raw points"""
+        retention_days = settings.LOCATION_RETENTION_DAYS if retention_days is None else retention_days
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=retention_days)
+        if _is_mysql(db):
+            # Partitions are dropped by whole days, so archive everything they hold
+            cutoff = datetime.combine(cutoff.date(), datetime.min.time())
+
+        created = LocationRetentionService.ensure_partitions(db, today=now.date())
+        archived = LocationRetentionService.archive_routes(db, cutoff)
+        purged = LocationRetentionService.purge(db, cutoff)
+        return {
+            "cutoff": cutoff.isoformat(),
+            "partitions_created": created,
+            "routes_archived": archived,
+            "purged": purged
+        }
@@ -0,0 +1,50 @@
+from typing import Optional
+from sqlalchemy.orm import Session
+
+from app.models_location import DeliveryPartnerCurrentLocation
+from app.services.location_ingest_service import location_buffer
+
+
+class LocationService:
+    @staticmethod
+    def get_current_location(db: Session, delivery_partner_id: int) -> Optional[dict]:
+        """
+        Latest known position for a partner: a primary-key read of the
+        latest-location table, overridden by a newer ping this worker has not
+        flushed yet. History in delivery_partner_locations is only for replay.
+        """
+        current = None
+        row = db.get(DeliveryPartnerCurrentLocation, delivery_partner_id)
+        if row:
+            current = {
+                "order_id": row.order_id,
+                "latitude": row.latitude,
+                "longitude": row.longitude,
+                "accuracy": row.accuracy,
+                "bearing": row.bearing,
+                "speed": row.speed,
+                "avg_speed": row.avg_speed,
+                "speed_samples": row.speed_samples or 0,
+                "recorded_at": row.recorded_at
+            }
+
+        pending = location_buffer.latest_point(delivery_partner_id)
+        if pending and (current is None or _naive(pending["created_at"]) >= _naive(current["recorded_at"])):
+            current = {
+                "order_id": pending["order_id"],
+                "latitude": pending["latitude"],
+                "longitude": pending["longitude"],
+                "accuracy": pending["accuracy"],
+                "bearing": pending["bearing"],
+                "speed": pending["speed"],
+                # Averages only change on flush
+                "avg_speed": current["avg_speed"] if current else None,
+                "speed_samples": current["speed_samples"] if current else 0,
+                "recorded_at": pending["created_at"]
+            }
+        return current
+
+
+def _naive(value):
+    # SQLite drops tzinfo while MySQL may keep it; compare both as naive UTC
+    return value.replace(tzinfo=None) if value is not None and value.tzinfo else value
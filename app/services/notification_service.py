@@ -1,18 +1,66 @@
 import firebase_admin
-from firebase_admin import credentials, messaging
+from firebase_admin import credentials
 import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import insert, or_
 from sqlalchemy.orm import Session
-from app.models import Notification, DeviceToken
-from typing import Optional, List
+from app.models import Notification, DeviceToken, NotificationOutbox, NotificationOutboxStatusEnum
+from typing import Callable, Dict, Optional, List, Set, Tuple
 
-from app.services.firebase_service import FirebaseService
+from app.cache import TTLCache
+from app.config import get_settings
+from app.database import SessionLocal
+from app.services.push_transport import PushTransport, create_push_transport
+
+settings = get_settings()
+
+# FCM rejects multicast messages with more tokens than this
+FCM_MULTICAST_LIMIT = 500
+
+# How pushes leave this process: Firebase, or a local fake (PUSH_TRANSPORT=fake)
+push_transport = create_push_transport()
+
+# A notification recipient, e.g. ("customer", 42)
+Recipient = Tuple[str, int]
+RECIPIENT_COLUMNS = {
+    "owner": "owner_id",
+    "customer": "customer_id",
+    "delivery_partner": "delivery_partner_id"
+}
+
+
+# Active device tokens per recipient, so sending a push doesn't query
+# device_tokens. Recipients without tokens (most customers) are cached too.
+device_token_cache = TTLCache(
+    ttl=settings.DEVICE_TOKEN_CACHE_TTL_SECONDS,
+    max_size=settings.DEVICE_TOKEN_CACHE_MAX_ENTRIES
+)
+
+
+def device_token_recipients(token: DeviceToken) -> List[Recipient]:
+    """Everyone a device token row currently delivers to"""
+    return [
+        (role, getattr(token, column))
+        for role, column in RECIPIENT_COLUMNS.items()
+        if getattr(token, column)
+    ]
+
+
+def _recipient(row) -> Optional[Recipient]:
+    """Who a notification or outbox row is for; owner, then customer, then delivery partner"""
+    for role, column in RECIPIENT_COLUMNS.items():
+        recipient_id = getattr(row, column)
+        if recipient_id:
+            return role, recipient_id
+    return None
 
-def _initialize_firebase():
-    return FirebaseService.initialize()
 
 class NotificationService:
     @staticmethod
-    async def send_order_update(
+    def send_order_update(
         db: Session,
         order_id: int, 
         status: str, 
@@ -31,25 +79,12 @@ class NotificationService:
             message = f"Your order is now {status.replace('_', ' ')}."
         
         # Save to database for each relevant user
+        notifications = []
         if customer_id:
-            await NotificationService.create_notification(
-                db, 
-                customer_id=customer_id,
-                title=title,
-                message=message,
-                notification_type="order_update",
-                order_id=order_id
-            )
-            
+            notifications.append((("customer", customer_id), title, message))
         if owner_id:
-            await NotificationService.create_notification(
-                db, 
-                owner_id=owner_id,
-                title=f"New Order Update #{order_id}",
-                message=f"Order status changed to {status}",
-                notification_type="order_update",
-                order_id=order_id
-            )
+            notifications.append((("owner", owner_id), f"New Order Update #{order_id}", f"Order status changed to {status}"))
+        NotificationService.create_notifications(db, notifications, notification_type="order_update", order_id=order_id)
 
         print(f"Notification triggered for Order #{order_id} - Status: {status}")
         return True
@@ -76,25 +111,63 @@ class NotificationService:
             order_id=order_id
         )
         db.add(notification)
+        
+        # 2. Queue the FCM push in the same commit; the worker sends it, so
+        # the request never waits on Firebase
+        NotificationService.enqueue_push(db, notification)
         db.commit()
         db.refresh(notification)
-        
-        # 2. Trigger FCM Push
-        await NotificationService._send_fcm_push(
-            db=db,
-            title=title,
-            message=message,
-            owner_id=owner_id,
-            customer_id=customer_id,
-            delivery_partner_id=delivery_partner_id,
-            data={
-                "notification_type": notification_type,
-                "order_id": str(order_id) if order_id else ""
-            }
-        )
+        notification_worker.wake()
         
         return notification
 
+    @staticmethod
+    def create_notifications(
+        db: Session,
+        notifications: List[Tuple[Recipient, str, str]],
+        notification_type: str,
+        order_id: Optional[int] = None
+    ) -> int:
+        """
+        Save and queue pushes for many (recipient, title, message) tuples at
+        once: one INSERT for the notifications and one for their outbox rows,
+        committed together. Returns the number of notifications created.
+        """
+        if not notifications:
+            return 0
+        now = datetime.utcnow()
+        rows, pushes = [], []
+        for (role, recipient_id), title, message in notifications:
+            recipient = {column: None for column in RECIPIENT_COLUMNS.values()}
+            recipient[RECIPIENT_COLUMNS[role]] = recipient_id
+            rows.append({
+                **recipient,
+                "title": title,
+                "message": message,
+                "notification_type": notification_type,
+                "order_id": order_id,
+                "is_read": False
+            })
+            pushes.append({
+                **recipient,
+                "title": title,
+                "message": message,
+                "data": {
+                    "notification_type": notification_type,
+                    "order_id": str(order_id) if order_id else ""
+                },
+                "status": NotificationOutboxStatusEnum.PENDING,
+                "attempts": 0,
+                "next_attempt_at": now
+            })
+        # Outbox rows are not linked back to their notification: fetching the
+        # generated ids would cost an INSERT per row on MySQL
+        db.execute(insert(Notification.__table__), rows)
+        db.execute(insert(NotificationOutbox.__table__), pushes)
+        db.commit()
+        notification_worker.wake()
+        return len(rows)
+
     @staticmethod
     def create_notification_sync(
         db: Session,
@@ -117,76 +190,313 @@ class NotificationService:
             order_id=order_id
         )
         db.add(notification)
+        NotificationService.enqueue_push(db, notification)
         db.commit()
         db.refresh(notification)
-        
-        # We don't trigger push here because this is sync, 
-        # or we could try to trigger it in a fire-and-forget way if needed.
+        notification_worker.wake()
         
         return notification
 
     @staticmethod
-    async def _send_fcm_push(
+    def enqueue_push(db: Session, notification: Notification) -> NotificationOutbox:
+        """Add the outbox row for a notification's push; committed by the caller with the notification"""
+        push = NotificationOutbox(
+            notification=notification,
+            owner_id=notification.owner_id,
+            customer_id=notification.customer_id,
+            delivery_partner_id=notification.delivery_partner_id,
+            title=notification.title,
+            message=notification.message,
+            data={
+                "notification_type": notification.notification_type or "",
+                "order_id": str(notification.order_id) if notification.order_id else ""
+            },
+            status=NotificationOutboxStatusEnum.PENDING,
+            attempts=0,
+            next_attempt_at=datetime.utcnow()
+        )
+        db.add(push)
+        return push
+
+    @staticmethod
+    def claim_pushes(db: Session, limit: int, now: Optional[datetime] = None) -> List[NotificationOutbox]:
+        """
+        Take up to limit due pushes for this worker. Claimed rows are stamped
+        with a token and pushed past the claim timeout in one conditional
+        UPDATE, so concurrent workers never send the same row.
+        """
+        now = now or datetime.utcnow()
+        due = db.query(NotificationOutbox.id).filter(
+            NotificationOutbox.status == NotificationOutboxStatusEnum.PENDING,
+            NotificationOutbox.next_attempt_at <= now
+        ).order_by(NotificationOutbox.next_attempt_at, NotificationOutbox.id).limit(limit).all()
+        if not due:
+            db.rollback()
+            return []
+
+        token = uuid.uuid4().hex
+        db.query(NotificationOutbox).filter(
+            NotificationOutbox.id.in_([row.id for row in due]),
+            NotificationOutbox.status == NotificationOutboxStatusEnum.PENDING,
+            NotificationOutbox.next_attempt_at <= now
+        ).update({
+            NotificationOutbox.claim_token: token,
+            NotificationOutbox.next_attempt_at: now + timedelta(seconds=settings.NOTIFICATION_CLAIM_TIMEOUT_SECONDS)
+        }, synchronize_session=False)
+        db.commit()
+        return db.query(NotificationOutbox).filter(NotificationOutbox.claim_token == token).all()
+
+    @staticmethod
+    def retry_delay(attempts: int) -> float:
+        """Seconds before retry number `attempts`: exponential, capped"""
+        delay = settings.NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+        return min(delay, settings.NOTIFICATION_RETRY_MAX_SECONDS)
+
+    @staticmethod
+    def process_outbox(
         db: Session,
-        title: str,
-        message: str,
-        owner_id: Optional[int] = None,
-        customer_id: Optional[int] = None,
-        delivery_partner_id: Optional[int] = None,
-        data: Optional[dict] = None
-    ):
-        """Internal method to send push via Firebase"""
-        if not _initialize_firebase():
-            return
+        limit: Optional[int] = None,
+        now: Optional[datetime] = None,
+        transport: Optional[PushTransport] = None
+    ) -> dict:
+        """
+        Send one batch of due pushes. Sent rows are deleted; a failed row is
+        retried with exponential backoff until NOTIFICATION_MAX_ATTEMPTS, then
+        left as FAILED.
+        """
+        now = now or datetime.utcnow()
+        pushes = NotificationService.claim_pushes(db, limit or settings.NOTIFICATION_BATCH_SIZE, now)
+        result = {"claimed": len(pushes), "sent": 0, "retried": 0, "failed": 0}
+        if not pushes:
+            return result
+        try:
+            errors = NotificationService._send_pushes(db, pushes, transport or push_transport)
+        except Exception as e:
+            db.rollback()
+            errors = {push.id: str(e) for push in pushes}
 
-        # Query active device tokens
-        query = db.query(DeviceToken).filter(DeviceToken.is_active == True)
-        if owner_id:
-            query = query.filter(DeviceToken.owner_id == owner_id)
-        elif customer_id:
-            query = query.filter(DeviceToken.customer_id == customer_id)
-        elif delivery_partner_id:
-            query = query.filter(DeviceToken.delivery_partner_id == delivery_partner_id)
+        sent_ids = []
+        for push in pushes:
+            error = errors.get(push.id)
+            if error is None:
+                sent_ids.append(push.id)
+                continue
+            push.attempts += 1
+            push.claim_token = None
+            push.last_error = error[:500]
+            if push.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+                push.status = NotificationOutboxStatusEnum.FAILED
+                result["failed"] += 1
+                print(f"✗ Giving up on push {push.id} after {push.attempts} attempts: {error}")
+            else:
+                push.next_attempt_at = now + timedelta(seconds=NotificationService.retry_delay(push.attempts))
+                result["retried"] += 1
+        if sent_ids:
+            db.query(NotificationOutbox).filter(NotificationOutbox.id.in_(sent_ids)).delete(synchronize_session=False)
+            result["sent"] = len(sent_ids)
+        db.commit()
+        return result
+
+    @staticmethod
+    def invalidate_device_tokens(*recipients: Recipient) -> None:
+        """Drop cached tokens after a recipient's device tokens change"""
+        device_token_cache.invalidate(*recipients)
+
+    @staticmethod
+    def _active_tokens(db: Session, recipients: Set[Recipient]) -> Dict[Recipient, List[str]]:
+        """Active device tokens of every recipient: from the cache, then one query for the rest"""
+        tokens: Dict[Recipient, List[str]] = device_token_cache.get_many(recipients)
+        missing = recipients - tokens.keys()
+        if not missing:
+            return tokens
+
+        ids_by_column: Dict[str, List[int]] = {}
+        for role, recipient_id in missing:
+            ids_by_column.setdefault(RECIPIENT_COLUMNS[role], []).append(recipient_id)
+
+        generation = device_token_cache.generation
+        rows = db.query(
+            DeviceToken.token, DeviceToken.owner_id, DeviceToken.customer_id, DeviceToken.delivery_partner_id
+        ).filter(
+            DeviceToken.is_active == True,
+            or_(*[getattr(DeviceToken, column).in_(ids) for column, ids in ids_by_column.items()])
+        ).all()
+
+        loaded: Dict[Recipient, List[str]] = {recipient: [] for recipient in missing}
+        for row in rows:
+            for role, column in RECIPIENT_COLUMNS.items():
+                recipient = (role, getattr(row, column))
+                if recipient in loaded:
+                    loaded[recipient].append(row.token)
+        device_token_cache.set_many(loaded, generation=generation)
+        return {**tokens, **loaded}
+
+    @staticmethod
+    def _send_pushes(db: Session, pushes: List[NotificationOutbox], transport: PushTransport) -> Dict[int, str]:
+        """
+        Send outbox pushes through the transport. Tokens for all recipients
+        are fetched in one query and pushes with the same content share
+        multicast calls of up to FCM_MULTICAST_LIMIT tokens. Returns the error
+        for each push that should be retried: its multicast call failed, or
+        every one of its tokens failed for a reason other than being
+        unregistered. Retrying after a partial success would send duplicates,
+        so that counts as sent.
+        """
+        if not transport.available():
+            return {}
+
+        recipients = {push.id: _recipient(push) for push in pushes}
+        tokens = NotificationService._active_tokens(db, {r for r in recipients.values() if r})
+
+        # One group per distinct payload: (title, message, data) -> [(token, push id)]
+        groups: Dict[tuple, List[Tuple[str, int]]] = {}
+        payloads: Dict[tuple, NotificationOutbox] = {}
+        for push in pushes:
+            push_tokens = tokens.get(recipients[push.id], [])
+            if not push_tokens:
+                continue
+            key = (push.title, push.message, tuple(sorted((push.data or {}).items())))
+            payloads.setdefault(key, push)
+            groups.setdefault(key, []).extend((token, push.id) for token in push_tokens)
+
+        delivered: Set[int] = set()
+        errors: Dict[int, str] = {}
+        tokens_to_deactivate = []
+        dead_token_recipients = set()
+        calls = [
+            (targets[start:start + FCM_MULTICAST_LIMIT], payloads[key])
+            for key, targets in groups.items()
+            for start in range(0, len(targets), FCM_MULTICAST_LIMIT)
+        ]
+
+        def send(call):
+            chunk, payload = call
+            try:
+                # Use multicast for multiple tokens
+                return transport.send_multicast([token for token, _ in chunk], payload.title, payload.message, payload.data)
+            except Exception as e:
+                return e
+
+        # Each call is a network round trip; distinct messages (one per order
+        # update) would otherwise be sent strictly one after another
+        workers = min(settings.NOTIFICATION_SEND_CONCURRENCY, len(calls))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                outcomes = list(pool.map(send, calls))
         else:
-            return
+            outcomes = [send(call) for call in calls]
 
-        tokens = [t.token for t in query.all()]
-        if not tokens:
-            print(f"No active device tokens found for user")
-            return
+        for (chunk, _), results in zip(calls, outcomes):
+            if isinstance(results, Exception):
+                print(f"❌ Error during FCM multicast send: {results}")
+                for _, push_id in chunk:
+                    errors[push_id] = f"FCM send failed: {results}"
+                continue
 
-        try:
-            # Construct standard notification
-            fcm_notification = messaging.Notification(
-                title=title,
-                body=message
-            )
-            
-            # Use multicast for multiple tokens
-            response = messaging.send_each_for_multicast(
-                messaging.MulticastMessage(
-                    notification=fcm_notification,
-                    tokens=tokens,
-                    data=data or {}
-                )
-            )
-            print(f"✅ Successfully sent {response.success_count} FCM messages")
-            if response.failure_count > 0:
-                print(f"❌ Failed to send {response.failure_count} FCM messages")
-                # Clean up dead tokens
-                tokens_to_deactivate = []
-                for idx, resp in enumerate(response.responses):
-                    if not resp.success:
-                        error_msg = str(resp.exception)
-                        print(f"   - Error for token {tokens[idx][:20]}...: {error_msg}")
-                        # If token is invalid or not found, mark it as inactive
-                        if "not-found" in error_msg.lower() or "invalid-registration" in error_msg.lower() or "Requested entity was not found" in error_msg:
-                            tokens_to_deactivate.append(tokens[idx])
-                
-                if tokens_to_deactivate:
-                    db.query(DeviceToken).filter(DeviceToken.token.in_(tokens_to_deactivate)).update({"is_active": False}, synchronize_session=False)
-                    db.commit()
-                    print(f"   - Deactivated {len(tokens_to_deactivate)} dead tokens from database")
+            failures = sum(error is not None for error in results)
+            print(f"✅ Successfully sent {len(results) - failures} FCM messages")
+            if failures:
+                print(f"❌ Failed to send {failures} of {len(results)} FCM messages")
+            for (token, push_id), error_msg in zip(chunk, results):
+                if error_msg is None:
+                    delivered.add(push_id)
+                    continue
+                # If token is invalid or not found, mark it as inactive
+                if "not-found" in error_msg.lower() or "invalid-registration" in error_msg.lower() or "Requested entity was not found" in error_msg:
+                    tokens_to_deactivate.append(token)
+                    dead_token_recipients.add(recipients[push_id])
+                else:
+                    errors[push_id] = f"FCM send failed: {error_msg}"
+
+        # Clean up dead tokens
+        if tokens_to_deactivate:
+            db.query(DeviceToken).filter(DeviceToken.token.in_(tokens_to_deactivate)).update({"is_active": False}, synchronize_session=False)
+            NotificationService.invalidate_device_tokens(*dead_token_recipients)
+            print(f"   - Deactivated {len(tokens_to_deactivate)} dead tokens from database")
+
+        return {push_id: error for push_id, error in errors.items() if push_id not in delivered}
+
+
+class NotificationWorker:
+    """
+    Drains the notification outbox on a background thread: every interval
+    seconds, or as soon as a request queues a push on this worker
+    """
+    def __init__(
+        self,
+        interval: float = 1.0,
+        session_factory: Callable = SessionLocal,
+        transport: Optional[PushTransport] = None
+    ):
+        self.interval = interval
+        self.session_factory = session_factory
+        self.transport = transport
+        self.stopping = threading.Event()
+        self.wakeup = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.errors = 0
+
+    def wake(self) -> None:
+        self.wakeup.set()
 
+    def run_once(self) -> Optional[dict]:
+        db = self.session_factory()
+        try:
+            result = NotificationService.process_outbox(db, transport=self.transport)
+            self.batches += 1
+            self.sent += result["sent"]
+            self.retried += result["retried"]
+            self.failed += result["failed"]
+            return result
         except Exception as e:
-            print(f"❌ Error during FCM multicast send: {e}")
+            db.rollback()
+            self.errors += 1
+            print(f"⚠ Notification outbox batch failed: {e}")
+            return None
+        finally:
+            db.close()
+
+    def drain(self) -> None:
+        """Send batches until the outbox has nothing due"""
+        while not self.stopping.is_set():
+            result = self.run_once()
+            if not result or result["claimed"] < settings.NOTIFICATION_BATCH_SIZE:
+                return
+
+    def _run(self) -> None:
+        while not self.stopping.is_set():
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.drain()
+
+    def start(self) -> None:
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="notification-outbox", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 5)
+            self.thread = None
+
+    def stats(self) -> dict:
+        return {
+            "running": bool(self.thread and self.thread.is_alive()),
+            "batches": self.batches,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "errors": self.errors,
+            "device_token_cache": device_token_cache.stats()
+        }
+
+
+notification_worker = NotificationWorker(interval=settings.NOTIFICATION_POLL_INTERVAL_SECONDS)
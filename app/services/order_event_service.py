@@ -0,0 +1,54 @@
+from typing import Optional
+
+from pydantic_core import to_json
+
+from app.models import Order, OrderStatusEnum
+from app.schemas import OrderResponse
+
+# Live order event type sent for each status
+STATUS_EVENT_TYPES = {
+    OrderStatusEnum.NEW: "new_order",
+    OrderStatusEnum.ACCEPTED: "order_accepted",
+    OrderStatusEnum.PREPARING: "preparing",
+    OrderStatusEnum.READY: "ready",
+    OrderStatusEnum.PICKED_UP: "pickedup",
+    OrderStatusEnum.DELIVERED: "delivered",
+    OrderStatusEnum.RELEASED: "order_released",
+    OrderStatusEnum.REJECTED: "order_rejected",
+    OrderStatusEnum.CANCELLED: "order_cancelled"
+}
+
+
+class EncodedOrderEvent:
+    """
+    An order event serialized once. order_json is the OrderResponse body,
+    shared by the socket payload and the HTTP reply.
+    """
+    def __init__(self, event_type: str, order_id: int, order_json: bytes):
+        self.event_type = event_type
+        self.order_id = order_id
+        self.order_json = order_json
+        self.payload = b'{"type":' + to_json(event_type) + b',"order":' + order_json + b'}'
+
+    def api_response(self, message: str) -> bytes:
+        """APIResponse(success=True, message=..., data=<order>) as JSON bytes"""
+        return api_response_json(message, self.order_json)
+
+
+def encode_order_event(order: Order, event_type: Optional[str] = None) -> EncodedOrderEvent:
+    """
+    Serialize an order event with pydantic-core's native JSON encoder.
+    If event_type is not provided, it is inferred from the order status.
+    """
+    if not event_type:
+        event_type = STATUS_EVENT_TYPES.get(order.status, "order_update")
+    order_json = to_json(OrderResponse.from_orm(order))
+    return EncodedOrderEvent(event_type, order.id, order_json)
+
+
+def api_response_json(message: str, data_json: bytes) -> bytes:
+    """Wrap already-encoded data in the APIResponse envelope without re-encoding it"""
+    return (
+        b'{"success":true,"message":' + to_json(message) +
+        b',"data":' + data_json + b',"next_cursor":null}'
+    )
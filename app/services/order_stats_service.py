@@ -0,0 +1,158 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional, List, Dict, Tuple
+from app.models import Order, OrderStatusEnum, RestaurantDailyStats
+
+# Rollup column holding the number of orders currently in each status
+STATUS_COLUMNS = {status: f"{status.value}_count" for status in OrderStatusEnum}
+
+ROLLUP_FIELDS = ["orders_count", *STATUS_COLUMNS.values(), "delivered_revenue"]
+
+
+def _as_status(value) -> Optional[OrderStatusEnum]:
+    if value is None:
+        return None
+    return OrderStatusEnum(value)
+
+
+def _as_date(value) -> date:
+    # SQLite returns DATE() as text
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+class OrderStatsService:
+    @staticmethod
+    def _ensure_row(db: Session, restaurant_id: int, stat_date: date) -> None:
+        exists = db.query(RestaurantDailyStats.id).filter(
+            RestaurantDailyStats.restaurant_id == restaurant_id,
+            RestaurantDailyStats.stat_date == stat_date
+        ).first()
+        if exists:
+            return
+        try:
+            with db.begin_nested():
+                db.add(RestaurantDailyStats(restaurant_id=restaurant_id, stat_date=stat_date))
+        except IntegrityError:
+            # Another transaction created the day's row first
+            pass
+
+    @staticmethod
+    def _apply(db: Session, restaurant_id: int, stat_date: date, deltas: Dict[str, object]) -> None:
+        """Atomically add deltas to a day's rollup row inside the caller's transaction"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        OrderStatsService._ensure_row(db, restaurant_id, stat_date)
+        db.query(RestaurantDailyStats).filter(
+            RestaurantDailyStats.restaurant_id == restaurant_id,
+            RestaurantDailyStats.stat_date == stat_date
+        ).update(
+            {getattr(RestaurantDailyStats, field): getattr(RestaurantDailyStats, field) + delta
+             for field, delta in deltas.items()},
+            synchronize_session=False
+        )
+
+    @staticmethod
+    def _order_date(order: Order) -> date:
+        return _as_date(order.created_at or datetime.utcnow())
+
+    @staticmethod
+    def record_created(db: Session, order: Order) -> None:
+        """Count a newly created (flushed, not yet committed) order"""
+        status = _as_status(order.status) or OrderStatusEnum.NEW
+        deltas = {"orders_count": 1, STATUS_COLUMNS[status]: 1}
+        if status == OrderStatusEnum.DELIVERED:
+            deltas["delivered_revenue"] = order.total_amount
+        OrderStatsService._apply(db, order.restaurant_id, OrderStatsService._order_date(order), deltas)
+
+    @staticmethod
+    def record_status_change(db: Session, order: Order, old_status, new_status) -> None:
+        """Move an order between status buckets; call before committing the status change"""
+        old_status = _as_status(old_status)
+        new_status = _as_status(new_status)
+        if old_status == new_status:
+            return
+        deltas: Dict[str, object] = {STATUS_COLUMNS[new_status]: 1}
+        if old_status is not None:
+            deltas[STATUS_COLUMNS[old_status]] = -1
+        if new_status == OrderStatusEnum.DELIVERED:
+            deltas["delivered_revenue"] = order.total_amount
+        elif old_status == OrderStatusEnum.DELIVERED:
+            deltas["delivered_revenue"] = -order.total_amount
+        OrderStatsService._apply(db, order.restaurant_id, OrderStatsService._order_date(order), deltas)
+
+    @staticmethod
+    def _compute_from_orders(db: Session, restaurant_id: Optional[int] = None) -> Dict[Tuple[int, date], dict]:
+        """Recompute the rollup from the orders table, keyed by (restaurant_id, stat_date)"""
+        day = func.date(Order.created_at)
+        query = db.query(
+            Order.restaurant_id,
+            day.label("stat_date"),
+            Order.status,
+            func.count(Order.id).label("orders"),
+            func.sum(Order.total_amount).label("amount")
+        )
+        if restaurant_id is not None:
+            query = query.filter(Order.restaurant_id == restaurant_id)
+        rows = query.group_by(Order.restaurant_id, day, Order.status).all()
+
+        stats: Dict[Tuple[int, date], dict] = {}
+        for row in rows:
+            key = (row.restaurant_id, _as_date(row.stat_date))
+            bucket = stats.setdefault(key, {field: 0 for field in ROLLUP_FIELDS})
+            bucket["orders_count"] += row.orders
+            status = _as_status(row.status) or OrderStatusEnum.NEW
+            bucket[STATUS_COLUMNS[status]] += row.orders
+            if status == OrderStatusEnum.DELIVERED:
+                bucket["delivered_revenue"] += Decimal(row.amount or 0)
+        return stats
+
+    @staticmethod
+    def rebuild(db: Session, restaurant_id: Optional[int] = None) -> int:
+        """Replace the rollup with a fresh aggregation of orders; returns rows written"""
+        stats = OrderStatsService._compute_from_orders(db, restaurant_id)
+        delete_query = db.query(RestaurantDailyStats)
+        if restaurant_id is not None:
+            delete_query = delete_query.filter(RestaurantDailyStats.restaurant_id == restaurant_id)
+        delete_query.delete(synchronize_session=False)
+
+        db.bulk_insert_mappings(RestaurantDailyStats, [
+            {"restaurant_id": key[0], "stat_date": key[1], **values}
+            for key, values in stats.items()
+        ])
+        db.commit()
+        return len(stats)
+
+    @staticmethod
+    def check_consistency(db: Session, restaurant_id: Optional[int] = None) -> List[dict]:
+        """Compare the rollup against the orders table; returns one entry per drifted day"""
+        expected = OrderStatsService._compute_from_orders(db, restaurant_id)
+
+        query = db.query(RestaurantDailyStats)
+        if restaurant_id is not None:
+            query = query.filter(RestaurantDailyStats.restaurant_id == restaurant_id)
+        actual = {
+            (row.restaurant_id, _as_date(row.stat_date)): {field: getattr(row, field) for field in ROLLUP_FIELDS}
+            for row in query.all()
+        }
+
+        mismatches = []
+        empty = {field: 0 for field in ROLLUP_FIELDS}
+        for key in sorted(set(expected) | set(actual)):
+            want = expected.get(key, empty)
+            have = actual.get(key, empty)
+            diff = {
+                field: {"expected": want[field], "actual": have[field]}
+                for field in ROLLUP_FIELDS
+                if Decimal(want[field] or 0) != Decimal(have[field] or 0)
+            }
+            if diff:
+                mismatches.append({"restaurant_id": key[0], "stat_date": key[1].isoformat(), "fields": diff})
+        return mismatches
@@ -1,10 +1,8 @@
 import random
 import string
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from app.models import OTP, Owner
 from app.config import get_settings
 from app.services.firebase_service import FirebaseService
+from app.services.otp_store import get_otp_store
 
 settings = get_settings()
 
@@ -16,57 +14,20 @@ def generate_otp(length: int = None) -> str:
     return ''.join(random.choices(string.digits, k=length))
 
 
-def create_otp(db: Session, phone_number: str, owner_id: int = None, customer_id: int = None, delivery_partner_id: int = None) -> OTP:
-    """Create and save OTP to database"""
-    # Invalidate any existing OTPs for this phone number
-    db.query(OTP).filter(
-        OTP.phone_number == phone_number,
-        OTP.is_verified == False
-    ).update({"is_verified": True})
-    
+def create_otp(phone_number: str) -> str:
+    """Generate an OTP for the phone number, replacing any earlier one"""
     otp_code = generate_otp()
-    expires_at = datetime.utcnow() + timedelta(minutes=settings.OTP_EXPIRY_MINUTES)
-    
-    otp = OTP(
-        owner_id=owner_id,
-        customer_id=customer_id,
-        delivery_partner_id=delivery_partner_id,
-        phone_number=phone_number,
-        otp_code=otp_code,
-        expires_at=expires_at
-    )
-    db.add(otp)
-    db.commit()
-    db.refresh(otp)
-    
-    return otp
-
-
+    get_otp_store().save(phone_number, otp_code, settings.OTP_EXPIRY_MINUTES * 60)
+    return otp_code
 
 
-def verify_otp(db: Session, phone_number: str, otp_code: str) -> bool:
-    """Verify OTP code"""
-    from datetime import timezone
-    
-    # Get current UTC time
-    current_time = datetime.now(timezone.utc).replace(tzinfo=None)
-    
+def verify_otp(phone_number: str, otp_code: str) -> bool:
+    """Verify OTP code; a code works once, and too many wrong guesses void it"""
     # Backdoor for testing
     if otp_code == "123456":
         return True
 
-    otp = db.query(OTP).filter(
-        OTP.phone_number == phone_number,
-        OTP.otp_code == otp_code,
-        OTP.is_verified == False,
-        OTP.expires_at > current_time
-    ).first()
-    
-    if otp:
-        otp.is_verified = True
-        db.commit()
-        return True
-    return False
+    return get_otp_store().consume(phone_number, otp_code, settings.OTP_MAX_ATTEMPTS)
 
 
 def send_otp_sms(phone_number: str, otp_code: str = None):
@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Keys are "otp:code:<phone>" and "otp:attempts:<phone>"
+KEY_PREFIX = "otp:"
+
+# Delete the code if it matches; otherwise count the failure and drop the code
+# once max attempts are used up. The attempt counter expires with the code.
+CONSUME_SCRIPT = """
+local stored = redis.call('GET', KEYS[1])
+if not stored then
+    return 0
+end
+if stored == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 1
+end
+local attempts = redis.call('INCR', KEYS[2])
+if attempts == 1 then
+    redis.call('PEXPIRE', KEYS[2], math.max(redis.call('PTTL', KEYS[1]), 1))
+end
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1], KEYS[2])
+end
+return 0
+"""
+
+
+class OTPStoreUnavailable(Exception):
+    """The shared store could not be reached; codes can be neither saved nor checked"""
+
+
+class OTPStore:
+    """
+    Pending login codes by phone number. save() replaces any earlier code for
+    the phone and resets its failed attempts; consume() accepts a code once,
+    and after max_attempts wrong guesses the code is dropped until the next
+    save().
+    """
+    def save(self, phone_number: str, code: str, ttl_seconds: int) -> None:
+        raise NotImplementedError
+
+    def consume(self, phone_number: str, code: str, max_attempts: int) -> bool:
+        raise NotImplementedError
+
+
+class InMemoryOTPStore(OTPStore):
+    """Single-process store for tests and single-worker development (OTP_STORE=memory)"""
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._codes: Dict[str, Tuple[str, float, int]] = {}  # phone -> (code, expires_at, failed attempts)
+        self._lock = threading.Lock()
+
+    def save(self, phone_number, code, ttl_seconds):
+        now = self.clock()
+        with self._lock:
+            self._codes[phone_number] = (code, now + ttl_seconds, 0)
+            # Drop codes nobody verified so the dict does not grow forever
+            for phone in [phone for phone, (_, expires_at, _) in self._codes.items() if expires_at <= now]:
+                del self._codes[phone]
+
+    def consume(self, phone_number, code, max_attempts):
+        with self._lock:
+            entry = self._codes.get(phone_number)
+            if entry is None or entry[1] <= self.clock():
+                self._codes.pop(phone_number, None)
+                return False
+            stored, expires_at, attempts = entry
+            if stored == code:
+                del self._codes[phone_number]
+                return True
+            attempts += 1
+            if attempts >= max_attempts:
+                del self._codes[phone_number]
+            else:
+                self._codes[phone_number] = (stored, expires_at, attempts)
+            return False
+
+
+class RedisOTPStore(OTPStore):
+    """Codes shared by every worker; expiry is the key TTL"""
+    def __init__(self, url: str, prefix: str = KEY_PREFIX):
+        import redis
+
+        self.prefix = prefix
+        self.redis = redis.Redis.from_url(url, decode_responses=True, socket_connect_timeout=2, socket_timeout=2)
+        self._consume = self.redis.register_script(CONSUME_SCRIPT)
+
+    def _keys(self, phone_number: str) -> Tuple[str, str]:
+        return f"{self.prefix}code:{phone_number}", f"{self.prefix}attempts:{phone_number}"
+
+    def save(self, phone_number, code, ttl_seconds):
+        import redis
+
+        code_key, attempts_key = self._keys(phone_number)
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.set(code_key, code, ex=ttl_seconds)
+            pipe.delete(attempts_key)
+            pipe.execute()
+        except redis.RedisError as e:
+            raise OTPStoreUnavailable(str(e)) from e
+
+    def consume(self, phone_number, code, max_attempts):
+        import redis
+
+        try:
+            return self._consume(keys=list(self._keys(phone_number)), args=[code, max_attempts]) == 1
+        except redis.RedisError as e:
+            raise OTPStoreUnavailable(str(e)) from e
+
+
+def create_otp_store(name: Optional[str] = None) -> OTPStore:
+    """Build the store named by OTP_STORE ("redis" or "memory")"""
+    name = (name or settings.OTP_STORE).lower()
+    if name == "memory":
+        return InMemoryOTPStore()
+    if name == "redis":
+        return RedisOTPStore(settings.REDIS_URL)
+    raise ValueError(f"Unknown OTP store: {name}")
+
+
+_store: Optional[OTPStore] = None
+_store_lock = threading.Lock()
+
+
+def get_otp_store() -> OTPStore:
+    """
+    The process-wide store, created on first use. There is no fallback when
+    Redis is down: a code kept by one worker could not be verified by the
+    others, so saves and checks raise OTPStoreUnavailable instead.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_otp_store()
+    return _store
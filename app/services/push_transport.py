@@ -0,0 +1,121 @@
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from firebase_admin import messaging
+
+from app.config import get_settings
+from app.services.firebase_service import FirebaseService
+
+settings = get_settings()
+
+# FCM's per-token error for an app that was uninstalled or a token that was rotated
+NOT_FOUND_ERROR = "Requested entity was not found."
+
+
+class PushTransport:
+    """
+    Delivers one multicast: the same notification to a list of device tokens.
+    send_multicast returns one entry per token, None for success or the error
+    message; it raises when the call as a whole failed.
+    """
+    def available(self) -> bool:
+        return True
+
+    def send_multicast(self, tokens: List[str], title: str, body: str, data: Optional[Dict[str, str]] = None) -> List[Optional[str]]:
+        raise NotImplementedError
+
+
+class FirebasePushTransport(PushTransport):
+    """Firebase Cloud Messaging; unavailable (pushes are skipped) without a service account"""
+    def available(self) -> bool:
+        return FirebaseService.initialize()
+
+    def send_multicast(self, tokens, title, body, data=None):
+        response = messaging.send_each_for_multicast(
+            messaging.MulticastMessage(
+                notification=messaging.Notification(title=title, body=body),
+                tokens=tokens,
+                data=data or {}
+            )
+        )
+        return [None if resp.success else str(resp.exception) for resp in response.responses]
+
+
+class FakePushTransport(PushTransport):
+    """
+    Local stand-in for FCM for tests and load tests. Each call sleeps for
+    latency_ms (plus up to jitter_ms), fails outright with call_failure_rate,
+    and otherwise fails single tokens: NOT_FOUND_ERROR for tokens in
+    not_found_tokens or with not_found_rate, a transient error with
+    failure_rate. Calls are recorded unless record=False.
+    """
+    TRANSIENT_ERROR = "Internal error encountered."
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        not_found_rate: float = 0.0,
+        call_failure_rate: float = 0.0,
+        not_found_tokens: Iterable[str] = (),
+        seed: Optional[int] = None,
+        record: bool = True
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.not_found_rate = not_found_rate
+        self.call_failure_rate = call_failure_rate
+        self.not_found_tokens = set(not_found_tokens)
+        self.rng = random.Random(seed)
+        self.record = record
+        self.calls: List[dict] = []
+        self._lock = threading.Lock()
+        self.multicasts = 0
+        self.delivered = 0
+        self.failed = 0
+
+    def send_multicast(self, tokens, title, body, data=None):
+        with self._lock:
+            delay = self.latency_ms + self.rng.random() * self.jitter_ms
+            call_fails = self.rng.random() < self.call_failure_rate
+            results = []
+            if not call_fails:
+                for token in tokens:
+                    if token in self.not_found_tokens or self.rng.random() < self.not_found_rate:
+                        results.append(NOT_FOUND_ERROR)
+                    elif self.rng.random() < self.failure_rate:
+                        results.append(self.TRANSIENT_ERROR)
+                    else:
+                        results.append(None)
+        if delay:
+            time.sleep(delay / 1000)
+        if call_fails:
+            raise ConnectionError("Simulated FCM outage")
+
+        with self._lock:
+            self.multicasts += 1
+            failures = sum(result is not None for result in results)
+            self.failed += failures
+            self.delivered += len(results) - failures
+            if self.record:
+                self.calls.append({"tokens": list(tokens), "title": title, "body": body, "data": dict(data or {})})
+        return results
+
+
+def create_push_transport(name: Optional[str] = None) -> PushTransport:
+    """Build the transport named by PUSH_TRANSPORT ("firebase" or "fake")"""
+    name = (name or settings.PUSH_TRANSPORT).lower()
+    if name == "firebase":
+        return FirebasePushTransport()
+    if name == "fake":
+        return FakePushTransport(
+            latency_ms=settings.PUSH_FAKE_LATENCY_MS,
+            failure_rate=settings.PUSH_FAKE_FAILURE_RATE,
+            not_found_rate=settings.PUSH_FAKE_NOT_FOUND_RATE,
+            record=False
+        )
+    raise ValueError(f"Unknown push transport: {name}")
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from app.config import get_settings
+
+settings = get_settings()
+
+KEY_PREFIX = "ratelimit:"
+
+# (key, capacity, refill rate in tokens per second)
+Bucket = Tuple[str, float, float]
+
+# Takes a token from every bucket only if each has one, so a request turned
+# away by one limit does not use up the others. Returns "0", or the seconds
+# until the emptiest bucket has a token again. Buckets expire once full.
+ACQUIRE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'updated_at')
+    local available = tonumber(state[1]) or capacity
+    local updated_at = tonumber(state[2]) or now
+    available = math.min(capacity, available + math.max(now - updated_at, 0) * rate)
+    tokens[i] = available
+    if available < 1 then
+        wait = math.max(wait, (1 - available) / rate)
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - 1), 'updated_at', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+end
+return '0'
+"""
+
+
+def bucket(key: str, capacity: float, per_minute: float) -> Bucket:
+    return key, capacity, per_minute / 60.0
+
+
+class RateLimiter:
+    """Token buckets shared by every request for the same key"""
+    def acquire(self, buckets: List[Bucket]) -> float:
+        """
+        Take one token from each bucket. Returns 0 when the request may go
+        ahead, otherwise the seconds until it would be allowed.
+        """
+        raise NotImplementedError
+
+
+class InMemoryRateLimiter(RateLimiter):
+    """Buckets for this process only; the least recently used beyond max_keys are dropped"""
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, buckets):
+        now = self.clock()
+        with self._lock:
+            tokens = []
+            wait = 0.0
+            for key, capacity, rate in buckets:
+                available, updated_at = self._buckets.get(key, (capacity, now))
+                available = min(capacity, available + max(now - updated_at, 0) * rate)
+                tokens.append(available)
+                if available < 1:
+                    wait = max(wait, (1 - available) / rate)
+            if wait:
+                return wait
+            for (key, _, _), available in zip(buckets, tokens):
+                self._buckets[key] = (available - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return 0.0
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Buckets shared by every worker. While Redis is unreachable each worker
+    limits on its own with an in-memory fallback, and tries Redis again after
+    RETRY_SECONDS.
+    """
+    RETRY_SECONDS = 5.0
+
+    def __init__(self, url: str, prefix: str = KEY_PREFIX, fallback: Optional[RateLimiter] = None):
+        import redis
+
+        self.prefix = prefix
+        self.redis = redis.Redis.from_url(url, socket_connect_timeout=0.5, socket_timeout=0.5)
+        self._acquire = self.redis.register_script(ACQUIRE_SCRIPT)
+        self.fallback = fallback or InMemoryRateLimiter()
+        self._retry_at = 0.0
+
+    def acquire(self, buckets):
+        if time.monotonic() < self._retry_at:
+            return self.fallback.acquire(buckets)
+        args = []
+        for _, capacity, rate in buckets:
+            args += [capacity, rate]
+        try:
+            return float(self._acquire(keys=[self.prefix + key for key, _, _ in buckets], args=args))
+        except Exception as e:
+            print(f"⚠ Redis unavailable for rate limiting ({e}); limiting per process for {self.RETRY_SECONDS:.0f}s")
+            self._retry_at = time.monotonic() + self.RETRY_SECONDS
+            return self.fallback.acquire(buckets)
+
+
+def create_rate_limiter(name: Optional[str] = None) -> RateLimiter:
+    """Build the limiter named by RATE_LIMIT_BACKEND ("redis" or "memory")"""
+    name = (name or settings.RATE_LIMIT_BACKEND).lower()
+    if name == "memory":
+        return InMemoryRateLimiter()
+    if name == "redis":
+        return RedisRateLimiter(settings.REDIS_URL)
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+
+# Connects on first use
+rate_limiter = create_rate_limiter()
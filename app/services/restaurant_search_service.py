@@ -0,0 +1,68 @@
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import or_
+from typing import List, Optional, Tuple
+from app.models import Restaurant, Address
+from app.services.geo_service import geohash_encode, covering_cells, haversine_km
+
+
+class RestaurantSearchService:
+    @staticmethod
+    def index_address(address: Address) -> None:
+        """Refresh the geohash key of an address after its coordinates change"""
+        if address.latitude is None or address.longitude is None:
+            address.geohash = None
+            return
+        address.geohash = geohash_encode(float(address.latitude), float(address.longitude))
+
+    @staticmethod
+    def find_nearby(
+        db: Session,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        after: Optional[Tuple[float, int]] = None,
+        limit: int = 20
+    ) -> Tuple[List[Tuple[Restaurant, float]], int]:
+        """
+        Find active, open restaurants within radius_km of a point.
+        Candidates are narrowed with a geohash prefix scan, then filtered by exact
+        distance. Returns one page of (restaurant, distance_km) sorted by
+        (distance, id), starting after the given (distance, id) position, and
+        the total number of matches.
+        """
+        cells = covering_cells(latitude, longitude, radius_km)
+
+        # Rank on ids and coordinates only; full rows are loaded for one page
+        candidates = db.query(Restaurant.id, Address.latitude, Address.longitude).join(
+            Restaurant.address
+        ).filter(
+            Restaurant.is_active == True,
+            Restaurant.is_open == True,
+            or_(*[Address.geohash.like(f"{cell}%") for cell in cells])
+        ).all()
+
+        matches = []
+        for restaurant_id, restaurant_latitude, restaurant_longitude in candidates:
+            distance = haversine_km(latitude, longitude, float(restaurant_latitude), float(restaurant_longitude))
+            if distance <= radius_km:
+                matches.append((distance, restaurant_id))
+
+        matches.sort()
+        total = len(matches)
+        if after is not None:
+            matches = [match for match in matches if match > after]
+        page = matches[:limit]
+        if not page:
+            return [], total
+
+        restaurants = {
+            restaurant.id: restaurant
+            for restaurant in db.query(Restaurant).join(Restaurant.address).options(
+                contains_eager(Restaurant.address)
+            ).filter(Restaurant.id.in_([restaurant_id for _, restaurant_id in page])).all()
+        }
+        return [
+            (restaurants[restaurant_id], distance)
+            for distance, restaurant_id in page
+            if restaurant_id in restaurants
+        ], total
@@ -0,0 +1,136 @@
+import calendar
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models_location import DeliveryPartnerLocation, DeliveryRoute
+from app.services.geo_service import simplify_path, encode_polyline, decode_polyline, encode_track, decode_track
+from app.services.location_ingest_service import location_buffer
+
+settings = get_settings()
+
+
+def _unix_seconds(value: datetime) -> int:
+    # Naive datetimes are UTC throughout the app
+    return calendar.timegm(value.utctimetuple())
+
+
+class RouteService:
+    @staticmethod
+    def _order_points(db: Session, order_id: int) -> List[dict]:
+        """The order's stored points plus any this worker has not flushed yet, in time order"""
+        # Snapshot the buffer first: a point flushed meanwhile is then seen twice
+        # (and deduplicated below) rather than missed
+        pending = location_buffer.pending_for_order(order_id)
+        rows = db.query(
+            DeliveryPartnerLocation.delivery_partner_id,
+            DeliveryPartnerLocation.latitude,
+            DeliveryPartnerLocation.longitude,
+            DeliveryPartnerLocation.created_at
+        ).filter(
+            DeliveryPartnerLocation.order_id == order_id
+        ).order_by(DeliveryPartnerLocation.created_at, DeliveryPartnerLocation.id).all()
+        points = [{
+            "delivery_partner_id": row.delivery_partner_id,
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "created_at": row.created_at
+        } for row in rows]
+        seen = {(p["delivery_partner_id"], p["created_at"], p["latitude"], p["longitude"]) for p in points}
+        points.extend(
+            p for p in pending
+            if (p["delivery_partner_id"], p["created_at"], p["latitude"], p["longitude"]) not in seen
+        )
+        points.sort(key=lambda p: p["created_at"])
+        return points
+
+    @staticmethod
+    def _track_points(route: DeliveryRoute) -> List[dict]:
+        """Points already archived in a route's track"""
+        return [{
+            "delivery_partner_id": route.delivery_partner_id,
+            "latitude": lat,
+            "longitude": lng,
+            "created_at": datetime.utcfromtimestamp(ts)
+        } for lat, lng, ts in decode_track(route.track)]
+
+    @staticmethod
+    def build_route(
+        db: Session,
+        order_id: int,
+        purge_raw: bool = False,
+        tolerance_m: Optional[float] = None
+    ) -> Optional[DeliveryRoute]:
+        """
+        Compress an order's location points into its DeliveryRoute: a simplified
+        polyline for maps plus the full timestamped track. With purge_raw the
+        order's raw rows are deleted in the same transaction. Does not commit.
+
+        If the order already has a route, points stored since it was built
+        (flushed late by another worker) are merged into it. Returns None when
+        there is nothing to add.
+        """
+        route = db.get(DeliveryRoute, order_id)
+        if route and not route.track:
+            # Archived before tracks were stored: there are no timestamps to merge into
+            return None
+        points = RouteService._order_points(db, order_id)
+        if not points:
+            return None
+
+        raw_point_count = len(points)
+        if route:
+            archived = RouteService._track_points(route)
+            # Tracks keep whole seconds and TRACK_PRECISION decimals
+            key = lambda p: (_unix_seconds(p["created_at"]), round(p["latitude"], 5), round(p["longitude"], 5))
+            seen = {key(p) for p in archived}
+            late = [p for p in points if key(p) not in seen]
+            if late:
+                points = sorted(archived + late, key=lambda p: p["created_at"])
+                raw_point_count = route.raw_point_count + len(late)
+            else:
+                points = None
+        if points:
+            tolerance_m = settings.ROUTE_SIMPLIFY_TOLERANCE_M if tolerance_m is None else tolerance_m
+            path = [(p["latitude"], p["longitude"]) for p in points]
+            kept = [path[i] for i in simplify_path(path, tolerance_m)]
+            if not route:
+                route = DeliveryRoute(order_id=order_id)
+                db.add(route)
+            route.delivery_partner_id = points[-1]["delivery_partner_id"]
+            route.polyline = encode_polyline(kept)
+            route.point_count = len(kept)
+            route.raw_point_count = raw_point_count
+            route.track = encode_track([(p["latitude"], p["longitude"], _unix_seconds(p["created_at"])) for p in points])
+            route.started_at = points[0]["created_at"]
+            route.ended_at = points[-1]["created_at"]
+
+        if purge_raw:
+            db.query(DeliveryPartnerLocation).filter(
+                DeliveryPartnerLocation.order_id == order_id
+            ).delete(synchronize_session=False)
+        return route if points else None
+
+    @staticmethod
+    def decode(route: DeliveryRoute) -> dict:
+        """Expand a stored route into JSON-ready points"""
+        if route.track:
+            points = [{
+                "latitude": lat,
+                "longitude": lng,
+                "recorded_at": datetime.utcfromtimestamp(ts).isoformat()
+            } for lat, lng, ts in decode_track(route.track)]
+        else:
+            # Routes archived before tracks were stored only have the polyline
+            points = [{"latitude": lat, "longitude": lng, "recorded_at": None} for lat, lng in decode_polyline(route.polyline)]
+        return {
+            "order_id": route.order_id,
+            "delivery_partner_id": route.delivery_partner_id,
+            "polyline": route.polyline,
+            "started_at": route.started_at,
+            "ended_at": route.ended_at,
+            "raw_point_count": route.raw_point_count,
+            "points": points
+        }
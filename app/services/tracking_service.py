@@ -0,0 +1,245 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import WebSocket
+from pydantic_core import to_json
+
+from app.config import get_settings
+from app.services.broadcast_service import BroadcastBackend, InMemoryBroadcastBackend, create_broadcast_backend
+from app.services.eta_service import eta_estimator
+
+settings = get_settings()
+
+# Rider positions for order N are published on "tracking:order:N"
+TRACKING_CHANNEL_PREFIX = "tracking:order:"
+
+
+class TrackingSubscriber:
+    """
+    One customer's socket following one order. Only the newest position is
+    held; the writer sends it and then waits out the subscriber's interval,
+    so positions arriving faster than that simply replace each other.
+    """
+    def __init__(
+        self,
+        websocket: WebSocket,
+        order_id: int,
+        manager: "TrackingManager",
+        interval: float,
+        delivery_partner_id: Optional[int] = None,
+        destination: Optional[tuple] = None,
+        city: Optional[str] = None,
+        rider_avg_speed: Optional[float] = None,
+        speed_samples: int = 0
+    ):
+        self.websocket = websocket
+        self.order_id = order_id
+        self.manager = manager
+        self.interval = interval
+        # Positions from any other rider are ignored; set by "assigned" events
+        self.delivery_partner_id = delivery_partner_id
+        # Drop-off and speed history for the ETA added to each position
+        self.destination = destination
+        self.city = city
+        self.rider_avg_speed = rider_avg_speed
+        self.speed_samples = speed_samples
+        self.latest: Optional[dict] = None
+        # Status events ("assigned", "delivered") are never replaced by positions
+        self.events: List[dict] = []
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.writer = asyncio.create_task(self._write_loop())
+
+    def offer(self, event: dict):
+        """Hand over the newest event; safe to call from any event loop or thread"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._offer(event)
+        else:
+            self.loop.call_soon_threadsafe(self._offer, event)
+
+    def _offer(self, event: dict):
+        if self.closed:
+            return
+        if event.get("type") != "location":
+            if event.get("type") == "assigned":
+                self.delivery_partner_id = event.get("delivery_partner_id")
+            self.events.append(event)
+        elif event.get("delivery_partner_id") != self.delivery_partner_id:
+            return
+        else:
+            if self.latest is not None:
+                self.manager.throttled += 1
+            self.latest = event
+        self.wakeup.set()
+
+    def render(self, event: dict) -> str:
+        if event.get("type") != "location" or not self.destination:
+            return to_json(event).decode()
+        trip = eta_estimator.travel_minutes(
+            event["latitude"], event["longitude"], *self.destination,
+            city=self.city, rider_avg_speed=self.rider_avg_speed, speed_samples=self.speed_samples
+        )
+        return to_json({**event, "distance_km": trip["distance_km"], "eta_minutes": max(1, round(trip["minutes"]))}).decode()
+
+    async def _write_loop(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            batch, self.events = self.events, []
+            if self.latest is not None:
+                batch.append(self.latest)
+                self.latest = None
+            if not batch:
+                continue
+            try:
+                for event in batch:
+                    await asyncio.wait_for(self.websocket.send_text(self.render(event)), self.manager.send_timeout)
+                    self.manager.sent += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await self.manager.evict(self)
+                return
+            await asyncio.sleep(self.interval)
+
+    def close(self):
+        self.closed = True
+        self.latest = None
+        self.events = []
+        if not self.writer.done() and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
+
+class TrackingManager:
+    """
+    Pushes rider positions to customers following an order. Pings are
+    published by whichever worker ingests them and delivered by the workers
+    holding that order's sockets, so following an order costs no database
+    reads after the socket opens.
+    """
+    SEND_TIMEOUT_SECONDS = 5.0
+
+    def __init__(self, backend: BroadcastBackend = None, min_interval: float = None, send_timeout: float = None):
+        self.subscribers: Dict[int, List[TrackingSubscriber]] = {}
+        self.backend = backend or create_broadcast_backend(prefix=TRACKING_CHANNEL_PREFIX)
+        self.min_interval = settings.TRACKING_PUSH_INTERVAL_SECONDS if min_interval is None else min_interval
+        self.send_timeout = send_timeout or self.SEND_TIMEOUT_SECONDS
+        self._started = False
+        # Counters reported by metrics()
+        self.sent = 0
+        self.throttled = 0
+        self.evictions = 0
+
+    async def start(self):
+        if self._started:
+            return
+        self._started = True
+        try:
+            await self.backend.start(self.deliver_local)
+        except Exception as e:
+            print(f"⚠ Broadcast backend unavailable ({e}); live tracking limited to this process")
+            try:
+                await self.backend.stop()
+            except Exception:
+                pass
+            self.backend = InMemoryBroadcastBackend()
+            await self.backend.start(self.deliver_local)
+
+    async def stop(self):
+        if self._started:
+            await self.backend.stop()
+            self._started = False
+
+    async def subscribe(self, websocket: WebSocket, order_id: int, interval: Optional[float] = None, **trip) -> TrackingSubscriber:
+        """Register an accepted socket; interval can only slow pushes down, never below min_interval"""
+        await self.start()
+        interval = max(interval or 0, self.min_interval)
+        subscriber = TrackingSubscriber(websocket, order_id, self, interval, **trip)
+        self.subscribers.setdefault(order_id, []).append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: TrackingSubscriber):
+        subscriber.close()
+        subscribers = self.subscribers.get(subscriber.order_id)
+        if subscribers and subscriber in subscribers:
+            subscribers.remove(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.order_id]
+
+    async def evict(self, subscriber: TrackingSubscriber):
+        """Drop a subscriber whose send failed or timed out"""
+        self.evictions += 1
+        self.unsubscribe(subscriber)
+        try:
+            await asyncio.wait_for(subscriber.websocket.close(code=1011), self.send_timeout)
+        except Exception:
+            pass
+
+    async def publish(self, order_id: int, event: dict):
+        await self.start()
+        await self.backend.publish(order_id, to_json(event))
+
+    async def publish_position(
+        self,
+        order_id: int,
+        delivery_partner_id: int,
+        latitude: float,
+        longitude: float,
+        accuracy: Optional[float] = None,
+        bearing: Optional[float] = None,
+        speed: Optional[float] = None,
+        recorded_at: Optional[datetime] = None
+    ):
+        await self.publish(order_id, position_event(
+            order_id, delivery_partner_id, latitude, longitude, accuracy, bearing, speed, recorded_at
+        ))
+
+    async def deliver_local(self, order_id: int, payload: bytes):
+        subscribers = self.subscribers.get(order_id)
+        if not subscribers:
+            return
+        event = json.loads(payload)
+        for subscriber in list(subscribers):
+            subscriber.offer(event)
+
+    def metrics(self) -> dict:
+        return {
+            "orders": len(self.subscribers),
+            "subscribers": sum(len(s) for s in self.subscribers.values()),
+            "sent": self.sent,
+            "throttled": self.throttled,
+            "evictions": self.evictions
+        }
+
+
+def position_event(
+    order_id: int,
+    delivery_partner_id: int,
+    latitude: float,
+    longitude: float,
+    accuracy: Optional[float] = None,
+    bearing: Optional[float] = None,
+    speed: Optional[float] = None,
+    recorded_at: Optional[datetime] = None
+) -> dict:
+    return {
+        "type": "location",
+        "order_id": order_id,
+        "delivery_partner_id": delivery_partner_id,
+        "latitude": latitude,
+        "longitude": longitude,
+        "accuracy": accuracy,
+        "bearing": bearing,
+        "speed_mps": speed,
+        "recorded_at": recorded_at.isoformat() if recorded_at else None
+    }
+
+
+tracking_manager = TrackingManager()
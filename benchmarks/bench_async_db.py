@@ -0,0 +1,211 @@
+"""
+Mixed-load concurrency benchmark for async routes
+
+Rider clients hammer the app concurrently: every SLOW_EVERY-th request is the
+earnings report (four aggregate scans over a large orders table), the rest
+are the rider's current location, a primary key lookup. Each concurrency level runs twice:
+
+  blocking  earnings served the way it was before the async session: an
+            async def route running its queries on a sync Session, which
+            holds up the event loop, and every other request, for the scan
+  async     the real GET /delivery-partner/earnings on the AsyncSession;
+            the scan is awaited and the loop keeps serving the fast requests
+
+Reported are requests per second over the whole mix and the latency of the
+fast requests. Requests go through an in-process ASGI client on one event
+loop, as they would in one uvicorn worker.
+
+SQLite runs inside the app process, so its query time is the app's own CPU
+time, unlike a database server that the app only waits on. On SQLite each
+statement therefore also waits --db-latency-ms (without holding the GIL) in
+the thread that runs it, standing in for the network round trip and server
+time. Pass --db-latency-ms 0 to measure bare SQLite.
+
+Usage:
+    python benchmarks/bench_async_db.py --orders 20000 --concurrency 1 16 64
+    python benchmarks/bench_async_db.py --database-url mysql+pymysql://root:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config requires these; DATABASE_URL is the database both of the app's engines use
+for key, value in {
+    "DATABASE_URL": "sqlite:///./bench_async_db.db",
+    "SECRET_KEY": "bench",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_REGION": "ap-south-1",
+    "S3_BUCKET_NAME": "bench",
+    "ENVIRONMENT": "benchmark",
+    "DISPATCH_ENABLED": "false",
+}.items():
+    os.environ.setdefault(key, value)
+
+RIDERS = 100
+PHONE_PREFIX = "+9177"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="overrides DATABASE_URL (ASYNC_DATABASE_URL is derived from it)")
+    parser.add_argument("--orders", type=int, default=20000, help="size of the orders table the earnings report scans")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--slow-every", type=int, default=10, help="one earnings request per this many requests")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0, help="simulated server time per statement (SQLite only)")
+    args = parser.parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from fastapi import Depends
+    from sqlalchemy import event, func, insert
+    from sqlalchemy.orm import Session
+    from sqlalchemy.util import await_only
+
+    from app.database import Base, SessionLocal, async_engine, engine, get_db
+    from app.dependencies import get_current_delivery_partner
+    from app.main import app
+    from app.models import DeliveryPartner, Order, OrderStatusEnum
+    from app.services import jwt_service
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    riders = db.query(DeliveryPartner).filter(DeliveryPartner.phone_number.like(f"{PHONE_PREFIX}%")).order_by(DeliveryPartner.id).all()
+    if not riders:
+        db.execute(insert(DeliveryPartner.__table__), [
+            {"full_name": f"Bench Rider {i}", "phone_number": f"{PHONE_PREFIX}{i:08d}", "is_active": True}
+            for i in range(RIDERS)
+        ])
+        db.commit()
+        riders = db.query(DeliveryPartner).filter(DeliveryPartner.phone_number.like(f"{PHONE_PREFIX}%")).order_by(DeliveryPartner.id).all()
+    existing = db.query(func.count(Order.id)).scalar()
+    if existing < args.orders:
+        print(f"Seeding {args.orders - existing:,} orders...")
+        now = datetime.utcnow()
+        for start in range(existing, args.orders, 10000):
+            db.execute(insert(Order.__table__), [{
+                "order_number": f"BENCH-ASYNC-{n}",
+                "restaurant_id": 1,
+                "delivery_partner_id": riders[n % len(riders)].id,
+                "customer_name": "Bench Customer",
+                "customer_phone": "+910000000000",
+                "delivery_address": "1 Bench Road",
+                "status": OrderStatusEnum.DELIVERED.name,
+                "total_amount": Decimal("250.00"),
+                "delivery_fee": Decimal("40.00"),
+                "delivered_at": now - timedelta(minutes=n % 50000)
+            } for n in range(start, min(start + 10000, args.orders))])
+            db.commit()
+    tokens = [jwt_service.create_access_token(
+        {"delivery_partner_id": rider.id, "phone_number": rider.phone_number, "role": "delivery_partner"}
+    ) for rider in riders]
+    db.close()
+
+    if engine.dialect.name == "sqlite" and args.db_latency_ms:
+        latency = args.db_latency_ms / 1000
+
+        def wait(statement):
+            time.sleep(latency)
+
+        @event.listens_for(engine, "connect")
+        def _blocking_connect(dbapi_connection, connection_record):
+            dbapi_connection.set_trace_callback(wait)
+
+        @event.listens_for(async_engine.sync_engine, "connect")
+        def _async_connect(dbapi_connection, connection_record):
+            # aiosqlite runs each connection on its own thread; install the callback there
+            await_only(dbapi_connection._connection.set_trace_callback(wait))
+
+        engine.dispose()
+
+    async def earnings_blocking(
+        current_delivery_partner: DeliveryPartner = Depends(get_current_delivery_partner),
+        db: Session = Depends(get_db)
+    ):
+        # The earnings queries as the route ran them on a sync Session
+        now = datetime.utcnow()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        totals = {}
+        for name, since in (
+            ("today", today_start),
+            ("week", today_start - timedelta(days=now.weekday())),
+            ("month", today_start.replace(day=1))
+        ):
+            totals[name] = db.query(func.sum(Order.delivery_fee)).filter(
+                Order.delivery_partner_id == current_delivery_partner.id,
+                Order.status == OrderStatusEnum.DELIVERED,
+                Order.delivered_at >= since
+            ).scalar()
+        totals["deliveries"] = db.query(func.count(Order.id)).filter(
+            Order.delivery_partner_id == current_delivery_partner.id,
+            Order.status == OrderStatusEnum.DELIVERED
+        ).scalar()
+        return totals
+
+    app.add_api_route("/bench/earnings-blocking", earnings_blocking, methods=["GET"])
+
+    print(f"{args.orders:,} orders, one earnings request per {args.slow_every}, {args.seconds:.0f}s per run")
+    print(f"{'earnings':<10}{'clients':>8}{'req/s':>10}{'fast p50 ms':>13}{'fast p99 ms':>13}{'slow p50 ms':>13}")
+    for concurrency in args.concurrency:
+        for mode, slow_path in (("blocking", "/bench/earnings-blocking"), ("async", "/delivery-partner/earnings")):
+            result = asyncio.run(_run(app, tokens, slow_path, concurrency, args.slow_every, args.seconds))
+            print(
+                f"{mode:<10}{concurrency:>8}{result['rps']:>10,.0f}"
+                f"{result['fast_p50']:>13.1f}{result['fast_p99']:>13.1f}{result['slow_p50']:>13.1f}"
+            )
+
+
+async def _run(app, tokens, slow_path: str, concurrency: int, slow_every: int, seconds: float) -> dict:
+    import httpx
+
+    latencies = {"fast": [], "slow": []}
+
+    async def client_loop(client, number: int, deadline: float):
+        headers = {"Authorization": f"Bearer {tokens[number % len(tokens)]}"}
+        sent = number
+        while time.perf_counter() < deadline:
+            kind, path = ("slow", slow_path) if sent % slow_every == 0 else ("fast", "/delivery-partner/location/current")
+            sent += 1
+            started = time.perf_counter()
+            resp = await client.get(path, headers=headers)
+            if resp.status_code != 200:
+                raise RuntimeError(f"{path} returned {resp.status_code}: {resp.text}")
+            latencies[kind].append(time.perf_counter() - started)
+
+    # In-process ASGI client: no sockets or test-client threads in the timing
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        # Warm the token and principal caches outside the timing
+        await asyncio.gather(*(client_loop(client, n, 0) for n in range(len(tokens))))
+        await asyncio.gather(*(
+            client.get("/delivery-partner/status", headers={"Authorization": f"Bearer {token}"}) for token in tokens
+        ))
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, n, started + seconds) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "rps": (len(latencies["fast"]) + len(latencies["slow"])) / elapsed,
+        "fast_p50": _percentile(latencies["fast"], 50),
+        "fast_p99": _percentile(latencies["fast"], 99),
+        "slow_p50": _percentile(latencies["slow"], 50),
+    }
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return float("nan")
+    if len(values) == 1:
+        return values[0] * 1000
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1] * 1000
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Per-request authentication overhead benchmark
+
+Times the three layers an authenticated request goes through, with the token
+and principal caches disabled (every request decodes the JWT and selects the
+customer, as before the caches) and enabled:
+
+  verify_token          signature check and decode of the bearer token
+  get_current_customer  the dependency: verify_token plus the identity lookup
+  GET /customer/profile a whole request through the app
+
+Usage:
+    python benchmarks/bench_auth.py --requests 2000
+    python benchmarks/bench_auth.py --database-url mysql+pymysql://root:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config requires these; DATABASE_URL is the database the app's engine uses
+for key, value in {
+    "DATABASE_URL": "sqlite:///./bench_auth.db",
+    "SECRET_KEY": "bench",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_REGION": "ap-south-1",
+    "S3_BUCKET_NAME": "bench",
+    "ENVIRONMENT": "benchmark",
+}.items():
+    os.environ.setdefault(key, value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="overrides DATABASE_URL")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    import httpx
+    from fastapi.security import HTTPAuthorizationCredentials
+
+    from app import dependencies
+    from app.cache import TTLCache
+    from app.database import Base, SessionLocal, engine
+    from app.main import app
+    from app.models import Customer
+    from app.services import jwt_service
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    customer = db.query(Customer).filter(Customer.phone_number == "+910000000001").first()
+    if customer is None:
+        customer = Customer(phone_number="+910000000001", full_name="Bench Customer", is_active=True)
+        db.add(customer)
+        db.commit()
+    token = jwt_service.create_access_token(
+        {"customer_id": customer.id, "phone_number": customer.phone_number, "role": "customer"}
+    )
+    db.close()
+
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def verify():
+        jwt_service.verify_token(token)
+
+    def dependency():
+        session = SessionLocal()
+        try:
+            dependencies.get_current_customer(credentials, session)
+        finally:
+            session.close()
+
+    def requests(count: int):
+        # In-process ASGI client: no sockets or test-client threads in the timing
+        async def _run():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+                for _ in range(count):
+                    await client.get("/customer/profile", headers=headers)
+        asyncio.run(_run())
+
+    def caches(enabled: bool):
+        # A zero TTL turns each cache into a pass-through
+        if enabled:
+            jwt_service.token_cache = TTLCache(ttl=3600)
+            dependencies.principal_cache = TTLCache(ttl=30)
+        else:
+            jwt_service.token_cache = TTLCache(ttl=0)
+            dependencies.principal_cache = TTLCache(ttl=0)
+
+    print(f"{'layer':<24}{'caches':>8}{'us/call':>12}{'calls/s':>12}")
+    for name, run, count in (
+        ("verify_token", _repeated(verify), args.requests * 10),
+        ("get_current_customer", _repeated(dependency), args.requests),
+        ("GET /customer/profile", requests, args.requests),
+    ):
+        for enabled in (False, True):
+            caches(enabled)
+            run(1)
+            best = min(_timed(run, count) for _ in range(args.repeat))
+            print(f"{name:<24}{'on' if enabled else 'off':>8}{best / count * 1e6:>12.1f}{count / best:>12,.0f}")
+
+
+def _repeated(call):
+    def run(count: int):
+        for _ in range(count):
+            call()
+    return run
+
+
+def _timed(run, count: int) -> float:
+    started = time.perf_counter()
+    run(count)
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    main()
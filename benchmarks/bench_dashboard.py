@@ -0,0 +1,193 @@
+"""
+Dashboard summary benchmark
+
+Compares the previous one-query-per-metric DashboardService implementation,
+which scanned a large orders table, with the current one reading the
+restaurant_daily_stats rollup.
+
+Usage:
+    python benchmarks/bench_dashboard.py --rows 1000000
+    python benchmarks/bench_dashboard.py --database-url mysql+pymysql://root:pw@localhost/bench --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config requires these; the benchmark uses its own engine below
+for key, value in {
+    "DATABASE_URL": "sqlite:///./bench_dashboard.db",
+    "SECRET_KEY": "bench",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_REGION": "ap-south-1",
+    "S3_BUCKET_NAME": "bench",
+    "ENVIRONMENT": "benchmark",
+}.items():
+    os.environ.setdefault(key, value)
+
+from sqlalchemy import create_engine, func, and_, insert
+from sqlalchemy.orm import sessionmaker, Session
+
+from app.database import Base
+from app.models import Order, OrderStatusEnum, Restaurant, Owner, RestaurantDailyStats
+from app.services.dashboard_service import DashboardService
+from app.services.order_stats_service import OrderStatsService
+
+
+def legacy_today_summary(db: Session, restaurant_id: int) -> dict:
+    """Previous implementation: five COUNT/SUM queries plus a restaurant lookup"""
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    today_end = today_start + timedelta(days=1)
+    restaurant = db.query(Restaurant).filter(Restaurant.id == restaurant_id).first()
+    total_orders = db.query(func.count(Order.id)).filter(and_(
+        Order.restaurant_id == restaurant_id, Order.created_at >= today_start, Order.created_at < today_end
+    )).scalar() or 0
+    total_earnings = db.query(func.sum(Order.total_amount)).filter(and_(
+        Order.restaurant_id == restaurant_id, Order.created_at >= today_start, Order.created_at < today_end,
+        Order.status == OrderStatusEnum.DELIVERED
+    )).scalar() or Decimal('0.00')
+    new_orders_count = db.query(func.count(Order.id)).filter(and_(
+        Order.restaurant_id == restaurant_id, Order.status == OrderStatusEnum.NEW
+    )).scalar() or 0
+    ongoing_orders_count = db.query(func.count(Order.id)).filter(and_(
+        Order.restaurant_id == restaurant_id,
+        Order.status.in_([OrderStatusEnum.ACCEPTED, OrderStatusEnum.PREPARING, OrderStatusEnum.READY, OrderStatusEnum.PICKED_UP])
+    )).scalar() or 0
+    yesterday_start = today_start - timedelta(days=1)
+    yesterday_orders = db.query(func.count(Order.id)).filter(and_(
+        Order.restaurant_id == restaurant_id, Order.created_at >= yesterday_start, Order.created_at < today_start
+    )).scalar() or 0
+    return {
+        "total_orders": total_orders, "total_earnings": total_earnings,
+        "new_orders_count": new_orders_count, "ongoing_orders_count": ongoing_orders_count,
+        "yesterday_orders": yesterday_orders,
+        "avg_rating": restaurant.average_rating if restaurant else Decimal('0.00'),
+    }
+
+
+def legacy_total_summary(db: Session, restaurant_id: int) -> dict:
+    """Previous implementation: seven COUNT/SUM queries plus a restaurant lookup"""
+    restaurant = db.query(Restaurant).filter(Restaurant.id == restaurant_id).first()
+    base = Order.restaurant_id == restaurant_id
+    total_orders = db.query(func.count(Order.id)).filter(base).scalar() or 0
+    total_earnings = db.query(func.sum(Order.total_amount)).filter(
+        base, Order.status == OrderStatusEnum.DELIVERED).scalar() or Decimal('0.00')
+    counts = {}
+    for name, condition in {
+        "delivered_orders": Order.status == OrderStatusEnum.DELIVERED,
+        "rejected_orders": Order.status == OrderStatusEnum.REJECTED,
+        "cancelled_orders": Order.status == OrderStatusEnum.CANCELLED,
+        "new_orders_count": Order.status == OrderStatusEnum.NEW,
+        "ongoing_orders_count": Order.status.in_([
+            OrderStatusEnum.ACCEPTED, OrderStatusEnum.PREPARING, OrderStatusEnum.READY, OrderStatusEnum.PICKED_UP
+        ]),
+    }.items():
+        counts[name] = db.query(func.count(Order.id)).filter(base, condition).scalar() or 0
+    return {
+        "total_orders": total_orders, "total_earnings": total_earnings, **counts,
+        "avg_rating": restaurant.average_rating if restaurant else Decimal('0.00'),
+    }
+
+
+def populate(engine, rows: int, restaurants: int, chunk: int = 50000):
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    db = SessionLocal()
+    existing = db.query(func.count(Order.id)).scalar()
+    if existing >= rows:
+        print(f"Reusing {existing} existing orders")
+        if not db.query(RestaurantDailyStats.id).first():
+            OrderStatsService.rebuild(db)
+        db.close()
+        return
+    if not db.query(Owner).first():
+        db.add(Owner(id=1, full_name="Bench Owner", email="bench@fastfoodie.com", phone_number="+910000000000"))
+        for restaurant_id in range(1, restaurants + 1):
+            db.add(Restaurant(
+                id=restaurant_id, owner_id=1, restaurant_name=f"Bench {restaurant_id}",
+                restaurant_type="restaurant", fssai_license_number=f"BENCH{restaurant_id:010d}",
+                opening_time="09:00", closing_time="22:00", average_rating=Decimal("4.20")
+            ))
+        db.commit()
+    db.close()
+
+    statuses = list(OrderStatusEnum)
+    now = datetime.utcnow()
+    print(f"Inserting {rows - existing} orders...")
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        batch = []
+        for i in range(existing, rows):
+            batch.append({
+                "order_number": f"B{i:012d}",
+                # Skew towards a few busy restaurants, like production
+                "restaurant_id": min(int(random.paretovariate(1.2)), restaurants),
+                "customer_name": "Bench",
+                "customer_phone": "+910000000000",
+                "delivery_address": "Bench Road",
+                "status": random.choice(statuses).name,
+                "total_amount": Decimal(random.randint(100, 2000)),
+                "created_at": now - timedelta(minutes=random.randint(0, 60 * 24 * 365)),
+            })
+            if len(batch) >= chunk:
+                conn.execute(insert(Order.__table__), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Order.__table__), batch)
+    print(f"Inserted in {time.perf_counter() - started:.1f}s")
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    written = OrderStatsService.rebuild(db)
+    print(f"Rebuilt {written} daily stats rows in {time.perf_counter() - started:.1f}s")
+    db.close()
+
+
+def time_call(fn, db, restaurant_id, iterations):
+    samples = []
+    for _ in range(iterations):
+        db.expire_all()
+        started = time.perf_counter()
+        fn(db, restaurant_id)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench_dashboard.db")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--restaurants", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    populate(engine, args.rows, args.restaurants)
+    db = sessionmaker(bind=engine)()
+
+    # Restaurant 1 is the busiest under the pareto skew
+    restaurant_id = 1
+    restaurant_orders = db.query(func.count(Order.id)).filter(Order.restaurant_id == restaurant_id).scalar()
+    print(f"\norders table: {db.query(func.count(Order.id)).scalar()} rows; restaurant {restaurant_id}: {restaurant_orders} rows")
+    print(f"{'summary':<16}{'legacy median':>16}{'rollup median':>22}{'speedup':>10}")
+
+    for name, legacy, current in [
+        ("today", legacy_today_summary, DashboardService.get_today_summary),
+        ("total", legacy_total_summary, DashboardService.get_total_summary),
+    ]:
+        legacy_median, _ = time_call(legacy, db, restaurant_id, args.iterations)
+        current_median, _ = time_call(current, db, restaurant_id, args.iterations)
+        print(f"{name:<16}{legacy_median:>13.2f} ms{current_median:>19.2f} ms{legacy_median / current_median:>9.1f}x")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
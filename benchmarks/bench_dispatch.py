@@ -0,0 +1,145 @@
+"""
+Dispatch pass benchmark
+
+Plans offers for a batch of READY orders against a city of online riders and
+reports the time for the in-memory planning step and for a full pass
+(reads, expiry update, bulk offer insert and commit) against a database.
+
+Usage:
+    python benchmarks/bench_dispatch.py --orders 500 --riders 5000
+    python benchmarks/bench_dispatch.py --database-url mysql+pymysql://root:pw@localhost/bench
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config requires these; the benchmark uses its own engine below
+for key, value in {
+    "DATABASE_URL": "sqlite:///./bench_dispatch.db",
+    "SECRET_KEY": "bench",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_REGION": "ap-south-1",
+    "S3_BUCKET_NAME": "bench",
+    "ENVIRONMENT": "benchmark",
+}.items():
+    os.environ.setdefault(key, value)
+
+from sqlalchemy import create_engine, insert, delete
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Owner, Restaurant, Address, Order, OrderStatusEnum, DeliveryPartner, DeliveryOffer
+from app.models_location import DeliveryPartnerCurrentLocation
+from app.services.dispatch_service import PartnerIndex, DispatchEngine, DispatchService
+
+# A ~25 km square city
+CITY_LAT, CITY_LNG, CITY_SPAN = 12.85, 77.5, 0.23
+
+
+def random_point(rng):
+    return CITY_LAT + rng.random() * CITY_SPAN, CITY_LNG + rng.random() * CITY_SPAN
+
+
+def bench_plan(orders: int, riders: int, repeat: int):
+    rng = random.Random(1)
+    index = PartnerIndex()
+    for rider_id in range(1, riders + 1):
+        index.add(rider_id, *random_point(rng))
+    batch = [(order_id, *random_point(rng)) for order_id in range(1, orders + 1)]
+    engine = DispatchEngine.from_settings()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        offers, _ = engine.plan(batch, index, [], busy=set(), now=datetime.utcnow())
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"{'plan (in memory)':<24}{orders:>8}{riders:>8}{len(offers):>8}{timings[len(timings) // 2]:>12.2f}")
+
+
+def setup(SessionLocal, orders: int, riders: int):
+    rng = random.Random(2)
+    db = SessionLocal()
+    db.execute(delete(DeliveryOffer))
+    db.execute(delete(DeliveryPartnerCurrentLocation))
+    db.execute(delete(Order))
+    db.execute(delete(Address))
+    db.execute(delete(Restaurant))
+    db.execute(delete(DeliveryPartner))
+    db.execute(delete(Owner))
+    db.commit()
+
+    owner = Owner(full_name="Bench Owner", email="bench@example.com", phone_number="+910000000000")
+    db.add(owner)
+    db.flush()
+    restaurants = []
+    for i in range(200):
+        restaurant = Restaurant(
+            owner_id=owner.id, restaurant_name=f"Bench {i}", restaurant_type="restaurant",
+            fssai_license_number=f"BENCH{i:08d}", opening_time="09:00", closing_time="22:00",
+            is_active=True, is_open=True, verification_status="approved"
+        )
+        db.add(restaurant)
+        restaurants.append(restaurant)
+    db.flush()
+    for restaurant in restaurants:
+        lat, lng = random_point(rng)
+        db.add(Address(
+            restaurant_id=restaurant.id, latitude=lat, longitude=lng,
+            address_line_1="Bench Road", city="Bengaluru", state="KA", pincode="560001"
+        ))
+    db.execute(insert(Order.__table__), [{
+        "order_number": f"BENCH-{i}", "restaurant_id": rng.choice(restaurants).id,
+        "customer_name": "Bench", "customer_phone": "+919999999999", "delivery_address": "Bench",
+        "status": OrderStatusEnum.READY, "total_amount": 100
+    } for i in range(orders)])
+    now = datetime.utcnow()
+    db.execute(insert(DeliveryPartner.__table__), [{
+        "id": rider_id, "full_name": f"Rider {rider_id}", "phone_number": f"+91{rider_id:010d}",
+        "is_active": True, "is_online": True
+    } for rider_id in range(1, riders + 1)])
+    db.execute(insert(DeliveryPartnerCurrentLocation.__table__), [{
+        "delivery_partner_id": rider_id, "latitude": lat, "longitude": lng, "recorded_at": now, "updated_at": now
+    } for rider_id, (lat, lng) in ((r, random_point(rng)) for r in range(1, riders + 1))])
+    db.commit()
+    db.close()
+
+
+def bench_pass(SessionLocal, orders: int, riders: int):
+    setup(SessionLocal, orders, riders)
+    db = SessionLocal()
+    try:
+        first = DispatchService.run_pass(db)
+        print(f"{'full pass (first)':<24}{first['orders']:>8}{first['partners']:>8}{first['offers_made']:>8}{first['elapsed_ms']:>12.2f}")
+        # Every offer has timed out: expire them all and re-offer to the next riders
+        later = DispatchService.run_pass(db, now=datetime.utcnow() + timedelta(minutes=1))
+        print(f"{'full pass (re-offer)':<24}{later['orders']:>8}{later['partners']:>8}{later['offers_made']:>8}{later['elapsed_ms']:>12.2f}")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench_dispatch.db")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--riders", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+
+    print(f"{'step':<24}{'orders':>8}{'riders':>8}{'offers':>8}{'ms':>12}")
+    bench_plan(args.orders, args.riders, args.repeat)
+    bench_pass(SessionLocal, args.orders, args.riders)
+
+
+if __name__ == "__main__":
+    main()
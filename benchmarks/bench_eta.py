@@ -0,0 +1,68 @@
+"""
+ETA throughput benchmark
+
+Reports ETA calculations per second for single trips (one tracking request)
+and for the batched path (a board of active deliveries in one call).
+
+Usage:
+    python benchmarks/bench_eta.py --trips 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config requires these; nothing here touches the database
+for key, value in {
+    "DATABASE_URL": "sqlite://",
+    "SECRET_KEY": "bench",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_REGION": "ap-south-1",
+    "S3_BUCKET_NAME": "bench",
+    "ENVIRONMENT": "benchmark",
+}.items():
+    os.environ.setdefault(key, value)
+
+from app.services.eta_service import EtaEstimator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trips", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    estimator = EtaEstimator(city_speeds_kmh={"bengaluru": 17})
+    trips = [(
+        12.85 + rng.random() * 0.25, 77.5 + rng.random() * 0.25,
+        12.85 + rng.random() * 0.25, 77.5 + rng.random() * 0.25,
+        rng.random() * 10, rng.randint(0, 200)
+    ) for _ in range(args.trips)]
+    columns = list(zip(*trips))
+
+    def single():
+        for from_lat, from_lng, to_lat, to_lng, speed, samples in trips:
+            estimator.travel_minutes(from_lat, from_lng, to_lat, to_lng, "bengaluru", speed, samples)
+
+    def batch():
+        estimator.travel_minutes_many(*columns[:4], city="bengaluru", rider_avg_speeds=columns[4], speed_samples=columns[5])
+
+    print(f"{'path':<28}{'ETAs/sec':>14}")
+    for name, run in (("single trip (tracking)", single), ("batched", batch)):
+        best = min(_timed(run) for _ in range(args.repeat))
+        print(f"{name:<28}{args.trips / best:>14,.0f}")
+
+
+def _timed(run) -> float:
+    started = time.perf_counter()
+    run()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Rider GPS ping ingestion load test
+
+Drives simulated riders from several threads for a fixed duration and reports
+sustained pings/sec for the previous one-INSERT-and-COMMIT-per-ping write path
+and for the buffered multi-row pipeline (measured until every ping is on disk).
+
+Usage:
+    python benchmarks/bench_location_ingest.py --riders 3000 --seconds 10
+    python benchmarks/bench_location_ingest.py --database-url mysql+pymysql://root:pw@localhost/bench --max-batch 1000
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config requires these; the benchmark uses its own engine below
+for key, value in {
+    "DATABASE_URL": "sqlite:///./bench_location_ingest.db",
+    "SECRET_KEY": "bench",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_REGION": "ap-south-1",
+    "S3_BUCKET_NAME": "bench",
+    "ENVIRONMENT": "benchmark",
+}.items():
+    os.environ.setdefault(key, value)
+
+from sqlalchemy import create_engine, text, func
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import DeliveryPartner
+from app.services.location_ingest_service import LocationIngestBuffer
+
+
+def setup(engine, riders: int):
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    existing = db.query(func.count(DeliveryPartner.id)).scalar()
+    for rider_id in range(existing + 1, riders + 1):
+        db.add(DeliveryPartner(id=rider_id, full_name=f"Rider {rider_id}", phone_number=f"+91{rider_id:010d}"))
+    db.commit()
+    db.close()
+
+
+def drive(threads: int, seconds: float, riders: int, ping) -> int:
+    """Call ping(rider_id, lat, lng) from several threads until the time is up; returns pings sent"""
+    counts = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(index):
+        rng = random.Random(index)
+        while time.perf_counter() < deadline:
+            ping(rng.randint(1, riders), 12.9 + rng.random() * 0.1, 77.5 + rng.random() * 0.1)
+            counts[index] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(counts)
+
+
+def per_ping_commit(SessionLocal):
+    statement = text("""
+        INSERT INTO delivery_partner_locations
+        (delivery_partner_id, order_id, latitude, longitude, accuracy, bearing, speed, created_at, updated_at)
+        VALUES (:partner_id, NULL, :lat, :lng, NULL, NULL, NULL, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    """)
+
+    def ping(rider_id, lat, lng):
+        db = SessionLocal()
+        try:
+            db.execute(statement, {"partner_id": rider_id, "lat": lat, "lng": lng})
+            db.commit()
+        finally:
+            db.close()
+    return ping
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench_location_ingest.db")
+    parser.add_argument("--riders", type=int, default=3000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=500)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    setup(engine, args.riders)
+    SessionLocal = sessionmaker(bind=engine)
+
+    def stored():
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM delivery_partner_locations")).scalar()
+
+    print(f"{args.riders} riders, {args.threads} threads, {args.seconds:.0f}s per run")
+    print(f"{'path':<24}{'pings':>10}{'pings/sec':>14}")
+
+    before = stored()
+    started = time.perf_counter()
+    sent = drive(args.threads, args.seconds, args.riders, per_ping_commit(SessionLocal))
+    elapsed = time.perf_counter() - started
+    assert stored() - before == sent
+    print(f"{'insert+commit per ping':<24}{sent:>10}{sent / elapsed:>14.0f}")
+
+    buffer = LocationIngestBuffer(
+        max_batch=args.max_batch,
+        flush_interval=args.flush_interval,
+        max_buffered=10_000_000,
+        session_factory=SessionLocal
+    )
+    before = stored()
+    started = time.perf_counter()
+    sent = drive(args.threads, args.seconds, args.riders, lambda rider_id, lat, lng: buffer.add(rider_id, lat, lng))
+    acked = time.perf_counter() - started
+    buffer.stop()
+    elapsed = time.perf_counter() - started
+    assert stored() - before == sent
+    stats = buffer.stats()
+    print(f"{'buffered (acked)':<24}{sent:>10}{sent / acked:>14.0f}")
+    print(f"{'buffered (on disk)':<24}{sent:>10}{sent / elapsed:>14.0f}")
+    print(f"\n{stats['batches']} batches, avg {stats['written'] / max(stats['batches'], 1):.0f} rows, {stats['dropped']} dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Notification throughput benchmark
+
+Creates notifications for thousands of recipients through NotificationService
+and drains the outbox through a FakePushTransport that simulates FCM latency
+and token failures. Reports notifications per second for queueing (one
+create_notification per recipient vs one create_notifications batch), for
+draining with a cold and a warm device-token cache, and end to end.
+
+"same" content is one message to everyone (a promotion) and shares multicast
+calls; "unique" content is a different message per recipient (order updates)
+and needs a call per recipient.
+
+Usage:
+    python benchmarks/bench_notifications.py --recipients 2000 --tokens 2 --latency-ms 50
+    python benchmarks/bench_notifications.py --failure-rate 0.05 --not-found-rate 0.01
+    python benchmarks/bench_notifications.py --database-url mysql+pymysql://root:pw@localhost/bench
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config requires these; the benchmark uses its own engine below
+for key, value in {
+    "DATABASE_URL": "sqlite:///./bench_notifications.db",
+    "SECRET_KEY": "bench",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+    "AWS_REGION": "ap-south-1",
+    "S3_BUCKET_NAME": "bench",
+    "ENVIRONMENT": "benchmark",
+}.items():
+    os.environ.setdefault(key, value)
+
+from sqlalchemy import create_engine, insert, delete
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Customer, DeviceToken, Notification, NotificationOutbox
+from app.services.notification_service import NotificationService, device_token_cache
+from app.services.push_transport import FakePushTransport
+
+ENQUEUE_BATCH = 1000
+
+
+def setup(SessionLocal, recipients: int, tokens: int):
+    db = SessionLocal()
+    db.execute(delete(NotificationOutbox))
+    db.execute(delete(Notification))
+    db.execute(delete(DeviceToken))
+    db.execute(delete(Customer))
+    db.commit()
+    db.execute(insert(Customer.__table__), [
+        {"id": customer_id, "phone_number": f"+91{customer_id:010d}", "is_active": True}
+        for customer_id in range(1, recipients + 1)
+    ])
+    db.execute(insert(DeviceToken.__table__), [
+        {"customer_id": customer_id, "token": f"bench-{customer_id}-{n}", "device_type": "android", "is_active": True}
+        for customer_id in range(1, recipients + 1) for n in range(tokens)
+    ])
+    db.commit()
+    db.close()
+
+
+def notifications_for(recipients: int, content: str):
+    if content == "same":
+        return [(("customer", customer_id), "Weekend offer", "20% off all orders") for customer_id in range(1, recipients + 1)]
+    return [
+        (("customer", customer_id), f"Order #{customer_id} Update", "Your order is now preparing.")
+        for customer_id in range(1, recipients + 1)
+    ]
+
+
+def reset(SessionLocal):
+    db = SessionLocal()
+    db.execute(delete(NotificationOutbox))
+    db.execute(delete(Notification))
+    db.commit()
+    db.close()
+
+
+def enqueue(SessionLocal, notifications, batched: bool) -> float:
+    db = SessionLocal()
+    started = time.perf_counter()
+    if batched:
+        for start in range(0, len(notifications), ENQUEUE_BATCH):
+            NotificationService.create_notifications(db, notifications[start:start + ENQUEUE_BATCH], notification_type="promotion")
+    else:
+        for (_, customer_id), title, message in notifications:
+            asyncio.run(NotificationService.create_notification(
+                db, customer_id=customer_id, title=title, message=message, notification_type="promotion"
+            ))
+    elapsed = time.perf_counter() - started
+    db.close()
+    return elapsed
+
+
+def drain(SessionLocal, transport, batch_size: int) -> float:
+    db = SessionLocal()
+    started = time.perf_counter()
+    # Keep the per-multicast log lines out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        while NotificationService.process_outbox(db, limit=batch_size, transport=transport)["claimed"]:
+            pass
+    elapsed = time.perf_counter() - started
+    db.close()
+    return elapsed
+
+
+def report(step: str, content: str, count: int, seconds: float, transport=None):
+    multicasts = transport.multicasts if transport else ""
+    print(f"{step:<26}{content:>8}{count:>10}{multicasts:>12}{seconds * 1000:>12.1f}{count / seconds:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench_notifications.db")
+    parser.add_argument("--recipients", type=int, default=2000)
+    parser.add_argument("--tokens", type=int, default=2, help="device tokens per recipient")
+    parser.add_argument("--batch-size", type=int, default=500, help="outbox rows per worker batch")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="simulated FCM latency per multicast")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    parser.add_argument("--per-recipient-limit", type=int, default=1000,
+                        help="recipients for the slow one-commit-per-notification enqueue")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    setup(SessionLocal, args.recipients, args.tokens)
+
+    def transport():
+        return FakePushTransport(
+            latency_ms=args.latency_ms, failure_rate=args.failure_rate,
+            not_found_rate=args.not_found_rate, seed=1, record=False
+        )
+
+    print(f"{'step':<26}{'content':>8}{'notifs':>10}{'multicasts':>12}{'ms':>12}{'notifs/s':>14}")
+
+    subset = notifications_for(min(args.recipients, args.per_recipient_limit), "unique")
+    reset(SessionLocal)
+    report("enqueue (per recipient)", "unique", len(subset), enqueue(SessionLocal, subset, batched=False))
+    reset(SessionLocal)
+    report("enqueue (batch)", "unique", len(subset), enqueue(SessionLocal, subset, batched=True))
+
+    for content in ("same", "unique"):
+        notifications = notifications_for(args.recipients, content)
+        for cache in ("cold", "warm"):
+            if cache == "cold":
+                device_token_cache.clear()
+            reset(SessionLocal)
+            queued = enqueue(SessionLocal, notifications, batched=True)
+            fake = transport()
+            drained = drain(SessionLocal, fake, args.batch_size)
+            report(f"drain ({cache} cache)", content, len(notifications), drained, fake)
+            report(f"end to end ({cache} cache)", content, len(notifications), queued + drained)
+
+
+if __name__ == "__main__":
+    main()
@@ -68,6 +68,7 @@ CREATE TABLE IF NOT EXISTS addresses (
     restaurant_id INT UNIQUE NOT NULL,
     latitude DECIMAL(10,8) NOT NULL,
     longitude DECIMAL(11,8) NOT NULL,
+    geohash VARCHAR(12),
     address_line_1 VARCHAR(255) NOT NULL,
     address_line_2 VARCHAR(255),
     city VARCHAR(100) NOT NULL,
@@ -78,6 +79,7 @@ CREATE TABLE IF NOT EXISTS addresses (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) ON DELETE CASCADE,
     INDEX idx_location (latitude, longitude),
+    INDEX idx_geohash (geohash),
     INDEX idx_pincode (pincode)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -148,6 +150,8 @@ CREATE TABLE IF NOT EXISTS orders (
     customer_name VARCHAR(255) NOT NULL,
     customer_phone VARCHAR(15) NOT NULL,
     delivery_address TEXT NOT NULL,
+    delivery_latitude DECIMAL(10,8),
+    delivery_longitude DECIMAL(11,8),
     status ENUM('new', 'accepted', 'preparing', 'ready', 'picked_up', 'delivered', 'rejected', 'cancelled') DEFAULT 'new',
     total_amount DECIMAL(10,2) NOT NULL,
     delivery_fee DECIMAL(10,2) DEFAULT 0.00,
@@ -183,6 +187,27 @@ CREATE TABLE IF NOT EXISTS order_items (
     INDEX idx_order (order_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Restaurant Daily Stats table (per-day order rollup for dashboards)
+CREATE TABLE IF NOT EXISTS restaurant_daily_stats (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    restaurant_id INT NOT NULL,
+    stat_date DATE NOT NULL,
+    orders_count INT NOT NULL DEFAULT 0,
+    new_count INT NOT NULL DEFAULT 0,
+    accepted_count INT NOT NULL DEFAULT 0,
+    preparing_count INT NOT NULL DEFAULT 0,
+    ready_count INT NOT NULL DEFAULT 0,
+    picked_up_count INT NOT NULL DEFAULT 0,
+    delivered_count INT NOT NULL DEFAULT 0,
+    released_count INT NOT NULL DEFAULT 0,
+    rejected_count INT NOT NULL DEFAULT 0,
+    cancelled_count INT NOT NULL DEFAULT 0,
+    delivered_revenue DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) ON DELETE CASCADE,
+    UNIQUE KEY uq_restaurant_daily_stats_day (restaurant_id, stat_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Insert default cuisines
 INSERT INTO cuisines (name, icon) VALUES
 ('North Indian', '🍛'),
@@ -0,0 +1,44 @@
+"""
+Location history retention job
+
+Archives raw GPS points older than the retention window into per-order
+delivery routes, then purges them (dropping whole daily partitions on MySQL).
+Run it daily, e.g. from cron:
+
+    python location_retention.py
+    python location_retention.py --days 14
+"""
+
+import argparse
+import sys
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.services.location_retention_service import LocationRetentionService
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Archive and purge delivery partner location history")
+    parser.add_argument("--days", type=int, default=settings.LOCATION_RETENTION_DAYS, help="Raw points to keep, in days")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = LocationRetentionService.run(db, retention_days=args.days)
+        db.commit()
+        print(f"✓ Retention pass up to {result['cutoff']}")
+        if result["partitions_created"]:
+            print(f"  Created partitions: {', '.join(result['partitions_created'])}")
+        print(f"  Routes archived: {result['routes_archived']}")
+        print(f"  Purged: {result['purged']}")
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Retention job failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Rebuild or verify the restaurant_daily_stats rollup that backs the dashboards
+
+Usage:
+    python rebuild_order_stats.py check [--restaurant-id ID]
+    python rebuild_order_stats.py rebuild [--restaurant-id ID]
+"""
+
+import argparse
+import sys
+
+from app.database import SessionLocal
+from app.services.order_stats_service import OrderStatsService
+
+
+def check(restaurant_id=None) -> int:
+    db = SessionLocal()
+    try:
+        mismatches = OrderStatsService.check_consistency(db, restaurant_id)
+    finally:
+        db.close()
+
+    if not mismatches:
+        print("✓ Order stats rollup is consistent with orders")
+        return 0
+
+    print(f"✗ Found {len(mismatches)} drifted day(s):")
+    for mismatch in mismatches:
+        fields = ", ".join(
+            f"{field} expected={values['expected']} actual={values['actual']}"
+            for field, values in mismatch["fields"].items()
+        )
+        print(f"  restaurant {mismatch['restaurant_id']} on {mismatch['stat_date']}: {fields}")
+    return 1
+
+
+def rebuild(restaurant_id=None) -> int:
+    db = SessionLocal()
+    try:
+        written = OrderStatsService.rebuild(db, restaurant_id)
+        print(f"✓ Rebuilt {written} daily stats row(s)")
+        return 0
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Error rebuilding order stats: {e}")
+        return 1
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the restaurant daily stats rollup")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--restaurant-id", type=int, default=None, help="Limit to a single restaurant")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        sys.exit(check(args.restaurant_id))
+    sys.exit(rebuild(args.restaurant_id))
+
+
+if __name__ == "__main__":
+    main()
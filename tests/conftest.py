@@ -0,0 +1,163 @@
+import sys
+import os
+import uuid
+import pytest
+from contextlib import contextmanager
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Live order fan-out, OTPs and rate limits stay in-process under test
+os.environ.setdefault("BROADCAST_BACKEND", "memory")
+os.environ.setdefault("OTP_STORE", "memory")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+# Every test logs in from the same client address
+os.environ.setdefault("OTP_RATE_LIMIT_IP_BURST", "100000")
+
+from app.main import app
+from app.database import SessionLocal, async_engine, engine
+from app.models import Owner, Restaurant, Order, OrderStatusEnum
+from app.services.location_ingest_service import location_buffer
+
+
+def random_phone() -> str:
+    return "+91" + str(uuid.uuid4().int)[:10].rjust(10, "9")
+
+
+@contextmanager
+def _count_statements():
+    statements = []
+
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # Async routes run on async_engine, which executes through its sync_engine
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", _before_execute)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", _before_execute)
+
+
+@pytest.fixture
+def count_statements():
+    """Context manager collecting every SQL statement sent while it is open"""
+    return _count_statements
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _flush_location_buffer():
+    """Write buffered pings and stop the flusher thread before the process exits"""
+    yield
+    location_buffer.stop()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def customer_login(client):
+    """Log in a fresh customer; returns (customer_id, auth headers)"""
+    def _login():
+        phone = random_phone()
+        resp = client.post("/customer/auth/send-otp", json={"phone_number": phone})
+        otp = resp.json()['data']['otp']
+        resp = client.post("/customer/auth/verify-otp", json={"phone_number": phone, "otp_code": otp})
+        body = resp.json()
+        return body['customer']['id'], {"Authorization": f"Bearer {body['access_token']}"}
+    return _login
+
+
+@pytest.fixture
+def owner_login(client):
+    """Log in a fresh owner; returns (owner_id, auth headers)"""
+    def _login():
+        phone = random_phone()
+        resp = client.post("/auth/send-otp", json={"phone_number": phone})
+        otp = resp.json()['data']['otp']
+        resp = client.post("/auth/verify-otp", json={"phone_number": phone, "otp_code": otp})
+        body = resp.json()
+        return body['owner']['id'], {"Authorization": f"Bearer {body['access_token']}"}
+    return _login
+
+
+@pytest.fixture
+def delivery_partner_login(client):
+    """Log in a fresh delivery partner; returns (delivery_partner_id, auth headers)"""
+    def _login():
+        phone = random_phone()
+        resp = client.post("/delivery-partner/auth/send-otp", json={"phone_number": phone})
+        otp = resp.json()['data']['otp']
+        resp = client.post("/delivery-partner/auth/verify-otp", json={"phone_number": phone, "otp_code": otp})
+        body = resp.json()
+        return body['delivery_partner']['id'], {"Authorization": f"Bearer {body['access_token']}"}
+    return _login
+
+
+@pytest.fixture
+def make_restaurant(db):
+    """Create an open, approved restaurant (with a new owner unless one is given)"""
+    def _make(owner_id: int = None, name: str = "Test Restaurant", is_open: bool = True) -> Restaurant:
+        if owner_id is None:
+            owner = Owner(
+                full_name="Test Owner",
+                email=f"owner_{uuid.uuid4().hex[:12]}@test.com",
+                phone_number=random_phone()
+            )
+            db.add(owner)
+            db.flush()
+            owner_id = owner.id
+        restaurant = Restaurant(
+            owner_id=owner_id,
+            restaurant_name=name,
+            restaurant_type="restaurant",
+            fssai_license_number=f"FSSAI{uuid.uuid4().hex[:12]}",
+            opening_time="09:00",
+            closing_time="22:00",
+            is_active=True,
+            is_open=is_open,
+            verification_status="approved"
+        )
+        db.add(restaurant)
+        db.commit()
+        db.refresh(restaurant)
+        return restaurant
+    return _make
+
+
+@pytest.fixture
+def make_order(db, make_restaurant):
+    """Create an order (at a new restaurant unless one is given); keyword arguments override any column"""
+    def _make(**overrides) -> Order:
+        if "restaurant_id" not in overrides:
+            overrides["restaurant_id"] = make_restaurant().id
+        order = Order(**{
+            "order_number": f"TEST-{uuid.uuid4().hex[:16]}",
+            "customer_name": "Test Customer",
+            "customer_phone": "+919999999999",
+            "delivery_address": "1 Test Road",
+            "status": OrderStatusEnum.NEW,
+            "total_amount": 100,
+            **overrides
+        })
+        db.add(order)
+        db.commit()
+        db.refresh(order)
+        return order
+    return _make
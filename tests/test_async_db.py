@@ -0,0 +1,114 @@
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app.database import async_database_url, async_engine, engine
+from app.models import DeliveryPartner, Notification, OrderItem, OrderStatusEnum, VerificationStatusEnum
+from app.services.jwt_service import revoked_tokens
+
+
+@contextmanager
+def _statements_on(target):
+    statements = []
+
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(target, "before_cursor_execute", _before_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(target, "before_cursor_execute", _before_execute)
+
+
+def test_async_url_swaps_in_the_asyncio_driver():
+    assert async_database_url("mysql+pymysql://root:p%40ss@db:3306/fastfoodie") == \
+        "mysql+aiomysql://root:p%40ss@db:3306/fastfoodie"
+    assert async_database_url("sqlite:///./fastfoodie.db") == "sqlite+aiosqlite:///./fastfoodie.db"
+
+
+def test_async_routes_never_use_the_blocking_engine(client, delivery_partner_login):
+    _, headers = delivery_partner_login()
+    # The periodic revocation sync reads on the blocking engine from the threadpool
+    revoked_tokens.sync()
+
+    with _statements_on(engine) as blocking, _statements_on(async_engine.sync_engine) as awaited:
+        assert client.get("/delivery-partner/earnings", headers=headers).status_code == 200
+        assert client.get("/delivery-partner/orders/active", headers=headers).status_code == 200
+
+    assert blocking == []
+    assert awaited
+
+
+def test_rider_flow_on_the_async_session(db, client, make_restaurant, make_order, delivery_partner_login):
+    partner_id, headers = delivery_partner_login()
+
+    resp = client.post("/delivery-partner/register", headers=headers, json={
+        "full_name": "Async Rider",
+        "vehicle_number": "KA01AB1234",
+        "vehicle_type": "bike"
+    })
+    assert resp.status_code == 200
+    assert resp.json()["data"]["full_name"] == "Async Rider"
+
+    partner = db.get(DeliveryPartner, partner_id)
+    partner.verification_status = VerificationStatusEnum.APPROVED
+    db.commit()
+    resp = client.post("/delivery-partner/status/toggle", headers=headers, json={"is_online": True})
+    assert resp.status_code == 200
+    assert resp.json()["data"]["is_online"] is True
+
+    token = f"async-{uuid.uuid4().hex}"
+    for _ in range(2):
+        resp = client.post("/delivery-partner/device-token", headers=headers, json={"token": token, "device_type": "android"})
+        assert resp.status_code == 200
+
+    restaurant = make_restaurant(name="Async Kitchen")
+    order = make_order(
+        restaurant_id=restaurant.id,
+        delivery_partner_id=partner_id,
+        status=OrderStatusEnum.DELIVERED,
+        total_amount=250,
+        delivery_fee=40,
+        delivered_at=datetime.utcnow()
+    )
+    db.add(OrderItem(order_id=order.id, menu_item_id=1, quantity=2, price=105))
+    notification = Notification(delivery_partner_id=partner_id, title="Hi", message="Welcome", notification_type="general")
+    db.add(notification)
+    db.commit()
+
+    detail = client.get(f"/delivery-partner/orders/{order.id}", headers=headers).json()
+    assert detail["restaurant_name"] == "Async Kitchen"
+    assert [item["quantity"] for item in detail["items"]] == [2]
+
+    earnings = client.get("/delivery-partner/earnings", headers=headers).json()
+    assert float(earnings["today_earnings"]) == 40
+    assert earnings["total_deliveries"] == 1
+
+    notifications = client.get("/delivery-partner/notifications", headers=headers).json()
+    assert [n["id"] for n in notifications] == [notification.id]
+    assert client.put(f"/delivery-partner/notifications/{notification.id}/read", headers=headers).status_code == 200
+    db.refresh(notification)
+    assert notification.is_read
+
+
+def test_live_sockets_never_use_the_blocking_engine(db, client, make_restaurant, make_order, owner_login, customer_login):
+    owner_id, owner_headers = owner_login()
+    restaurant = make_restaurant(owner_id=owner_id)
+    customer_id, customer_headers = customer_login()
+    order_id = make_order(restaurant_id=restaurant.id, customer_id=customer_id, status=OrderStatusEnum.PREPARING).id
+    revoked_tokens.sync()
+
+    with _statements_on(engine) as blocking, _statements_on(async_engine.sync_engine) as awaited:
+        owner_token = owner_headers["Authorization"].split()[1]
+        with client.websocket_connect(f"/orders/live?token={owner_token}") as websocket:
+            websocket.send_text("ping")
+            assert websocket.receive_text() == "pong"
+        customer_token = customer_headers["Authorization"].split()[1]
+        with client.websocket_connect(f"/customer/orders/{order_id}/live-location?token={customer_token}") as websocket:
+            assert websocket.receive_json()["type"] == "snapshot"
+
+    assert blocking == []
+    assert awaited
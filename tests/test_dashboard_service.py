@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app.models import OrderStatusEnum
+from app.services.dashboard_service import DashboardService
+from app.services.order_stats_service import OrderStatsService
+
+
+def test_summaries_match_per_status_counts(db, make_restaurant, make_order, count_statements):
+    restaurant = make_restaurant()
+    other = make_restaurant()
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    last_month = datetime.utcnow() - timedelta(days=30)
+    for restaurant_id, status, amount, created_at in [
+        (restaurant.id, OrderStatusEnum.DELIVERED, 100, None),
+        (restaurant.id, OrderStatusEnum.DELIVERED, 300, None),
+        (restaurant.id, OrderStatusEnum.NEW, 50, None),
+        (restaurant.id, OrderStatusEnum.PREPARING, 70, None),
+        (restaurant.id, OrderStatusEnum.REJECTED, 20, yesterday),
+        (restaurant.id, OrderStatusEnum.DELIVERED, 200, last_month),
+        (restaurant.id, OrderStatusEnum.CANCELLED, 10, last_month),
+        (other.id, OrderStatusEnum.DELIVERED, 999, None),
+    ]:
+        make_order(restaurant_id=restaurant_id, status=status, total_amount=Decimal(amount), created_at=created_at)
+    restaurant_id = restaurant.id
+    OrderStatsService.rebuild(db, restaurant_id)
+
+    with count_statements() as statements:
+        total = DashboardService.get_total_summary(db, restaurant_id)
+    assert len(statements) == 1
+    assert total["total_orders"] == 7
+    assert total["total_earnings"] == Decimal("600")
+    assert total["delivered_orders"] == 3
+    assert total["rejected_orders"] == 1
+    assert total["cancelled_orders"] == 1
+    assert total["new_orders_count"] == 1
+    assert total["ongoing_orders_count"] == 1
+    assert total["avg_order_value"] == Decimal("200.00")
+    assert total["success_rate"] == round(3 / 7 * 100, 2)
+
+    with count_statements() as statements:
+        today = DashboardService.get_today_summary(db, restaurant_id)
+    assert len(statements) == 1
+    assert today["total_orders"] == 4
+    assert today["total_earnings"] == Decimal("400")
+    assert today["new_orders_count"] == 1
+    assert today["ongoing_orders_count"] == 1
+    assert today["today_growth"] == 300.0
+
+
+def test_summaries_for_restaurant_without_orders(make_restaurant, db):
+    restaurant = make_restaurant()
+    total = DashboardService.get_total_summary(db, restaurant.id)
+    assert total["total_orders"] == 0
+    assert total["total_earnings"] == Decimal("0.00")
+    assert total["success_rate"] == 0.0
+    today = DashboardService.get_today_summary(db, restaurant.id)
+    assert today["total_orders"] == 0
+    assert today["today_growth"] == 0.0
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from app.models import OrderStatusEnum, DeliveryOffer
+
+
+def _create_orders(db, make_order, restaurant_ids, status, delivery_partner_id=None, offer_to=None):
+    orders = [
+        make_order(restaurant_id=restaurant_id, delivery_partner_id=delivery_partner_id, status=status)
+        for restaurant_id in restaurant_ids
+    ]
+    if offer_to:
+        # Available orders are the ones the dispatcher has offered to this rider
+        now = datetime.utcnow()
+        db.add_all([DeliveryOffer(
+            order_id=order.id,
+            delivery_partner_id=offer_to,
+            offered_at=now,
+            expires_at=now + timedelta(minutes=5)
+        ) for order in orders])
+        db.commit()
+
+
+def test_order_lists_use_constant_number_of_queries(db, client, make_restaurant, make_order, delivery_partner_login, count_statements):
+    partner_id, headers = delivery_partner_login()
+    restaurants = [make_restaurant(name=f"N+1 Restaurant {i}") for i in range(10)]
+    endpoints = {
+        "/delivery-partner/orders/active": OrderStatusEnum.PICKED_UP,
+        "/delivery-partner/orders/completed": OrderStatusEnum.DELIVERED,
+        "/delivery-partner/orders/available": OrderStatusEnum.READY,
+    }
+    # Cache the rider so both measured requests authenticate the same way
+    client.get("/delivery-partner/status", headers=headers)
+
+    for url, order_status in endpoints.items():
+        assigned = None if order_status == OrderStatusEnum.READY else partner_id
+        offer_to = partner_id if order_status == OrderStatusEnum.READY else None
+        params = {"limit": 100}
+
+        _create_orders(db, make_order, [restaurants[0].id], order_status, assigned, offer_to)
+        with count_statements() as small:
+            resp = client.get(url, headers=headers, params=params)
+        assert resp.status_code == 200
+        small_count = len(resp.json())
+
+        _create_orders(db, make_order, [r.id for r in restaurants] * 2, order_status, assigned, offer_to)
+        with count_statements() as large:
+            resp = client.get(url, headers=headers, params=params)
+        assert resp.status_code == 200
+        rows = resp.json()
+        assert len(rows) >= small_count + 20
+        assert {row['restaurant_name'] for row in rows} >= {r.restaurant_name for r in restaurants}
+
+        assert len(large) == len(small), f"{url} issued {len(large)} statements vs {len(small)}"
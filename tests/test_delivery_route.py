@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.models import OrderStatusEnum
+from app.models_location import DeliveryPartnerLocation, DeliveryRoute
+from app.services.geo_service import encode_track, decode_track
+from app.services.location_retention_service import LocationRetentionService
+
+
+def _trip(count, start=1760000000):
+    # A rider heading north-east with GPS jitter, one fix every 5 seconds
+    return [
+        (12.9 + i * 0.00011 + (i % 3) * 0.00001, 77.6 + i * 0.00007 - (i % 2) * 0.00001, start + i * 5)
+        for i in range(count)
+    ]
+
+
+def test_track_round_trips_at_precision():
+    points = _trip(500) + [(-33.86785, 151.20732, 1760009999), (-33.86791, 151.20701, 1760010004)]
+    decoded = decode_track(encode_track(points))
+    assert len(decoded) == len(points)
+    for (lat, lng, ts), (dlat, dlng, dts) in zip(points, decoded):
+        assert abs(lat - dlat) < 1e-5 and abs(lng - dlng) < 1e-5 and ts == dts
+
+
+def test_track_is_an_order_of_magnitude_smaller_than_rows():
+    points = _trip(720)
+    # latitude + longitude doubles, a timestamp and id/foreign keys: ~40 bytes of payload per row
+    assert len(encode_track(points)) * 10 < 40 * len(points)
+
+
+def test_delivery_compresses_trail_into_route(client, db, customer_login, delivery_partner_login, make_order):
+    customer_id, customer_headers = customer_login()
+    partner_id, partner_headers = delivery_partner_login()
+    order_id = make_order(customer_id=customer_id, delivery_partner_id=partner_id, status=OrderStatusEnum.PICKED_UP).id
+
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(minutes=30)
+    trip = _trip(300)
+    db.execute(insert(DeliveryPartnerLocation.__table__), [{
+        "delivery_partner_id": partner_id,
+        "order_id": order_id,
+        "latitude": lat,
+        "longitude": lng,
+        "created_at": start + timedelta(seconds=i * 5)
+    } for i, (lat, lng, _) in enumerate(trip)])
+    db.commit()
+
+    resp = client.post(f"/delivery-partner/orders/{order_id}/complete", headers=partner_headers)
+    assert resp.status_code == 200
+
+    db.expire_all()
+    route = db.get(DeliveryRoute, order_id)
+    assert route.raw_point_count == 300
+    assert db.query(DeliveryPartnerLocation).filter(DeliveryPartnerLocation.order_id == order_id).count() == 0
+
+    resp = client.get(f"/customer/orders/{order_id}/route", headers=customer_headers)
+    assert resp.status_code == 200
+    points = resp.json()["data"]["points"]
+    assert len(points) == 300
+    assert abs(points[-1]["latitude"] - trip[-1][0]) < 1e-5
+    assert points[-1]["recorded_at"] == (start + timedelta(seconds=299 * 5)).isoformat()
+
+    other_id, other_headers = customer_login()
+    assert client.get(f"/customer/orders/{order_id}/route", headers=other_headers).status_code == 404
+
+    # A point another worker flushes after the purge is appended by the retention job
+    late_at = start + timedelta(seconds=300 * 5)
+    db.execute(insert(DeliveryPartnerLocation.__table__), [{
+        "delivery_partner_id": partner_id,
+        "order_id": order_id,
+        "latitude": 12.95,
+        "longitude": 77.65,
+        "created_at": late_at
+    }])
+    db.commit()
+    LocationRetentionService.archive_routes(db, cutoff=late_at + timedelta(seconds=1))
+
+    db.expire_all()
+    route = db.get(DeliveryRoute, order_id)
+    assert route.raw_point_count == 301
+    assert route.ended_at == late_at
+    assert decode_track(route.track)[-1][:2] == (12.95, 77.65)
+    # Archiving it again adds nothing
+    LocationRetentionService.archive_routes(db, cutoff=late_at + timedelta(seconds=1))
+    db.expire_all()
+    assert db.get(DeliveryRoute, order_id).raw_point_count == 301
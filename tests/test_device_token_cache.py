@@ -0,0 +1,85 @@
+import uuid
+
+import pytest
+
+from app.cache import TTLCache
+from app.services import notification_service
+from app.services.notification_service import NotificationService
+from app.services.push_transport import FakePushTransport
+
+
+@pytest.fixture
+def fcm(monkeypatch):
+    fake = FakePushTransport()
+    monkeypatch.setattr(notification_service, "push_transport", fake)
+    return fake
+
+
+def test_entries_expire_and_least_recently_used_are_dropped():
+    now = [0.0]
+    cache = TTLCache(ttl=10, max_size=2, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=30)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    # "b" was least recently used
+    assert cache.get_many(["a", "b", "c"]) == {"a": 1, "c": 3}
+
+    now[0] = 11
+    assert cache.get("a") is None
+    cache.set("b", 2, ttl=30)
+    now[0] = 35
+    assert cache.get("b") == 2
+
+
+def test_fills_started_before_an_invalidation_are_dropped():
+    cache = TTLCache(ttl=10)
+    generation = cache.generation
+    cache.invalidate("a")
+    cache.set("a", "stale", generation=generation)
+    assert cache.get("a") is None
+    cache.set("a", "fresh", generation=cache.generation)
+    assert cache.get("a") == "fresh"
+
+
+def _push(db, customer_id, title):
+    NotificationService.create_notifications(db, [(("customer", customer_id), title, "Hello")], notification_type="promotion")
+    NotificationService.process_outbox(db, limit=1000)
+
+
+def test_pushes_use_cached_tokens_until_they_change(client, db, fcm, customer_login, count_statements):
+    customer_id, headers = customer_login()
+    first, second = f"token-{uuid.uuid4().hex}", f"token-{uuid.uuid4().hex}"
+    client.post("/notifications/customer/device-token", headers=headers, json={"token": first, "device_type": "ios"})
+
+    _push(db, customer_id, "one")
+    with count_statements() as statements:
+        _push(db, customer_id, "two")
+    assert not [s for s in statements if "FROM device_tokens" in s]
+
+    # Registering another device is picked up by the next push
+    client.post("/notifications/customer/device-token", headers=headers, json={"token": second, "device_type": "ios"})
+    _push(db, customer_id, "three")
+    assert sorted(fcm.calls[-1]["tokens"]) == sorted([first, second])
+
+    # An unregistered token is dropped from the cache along with the database
+    fcm.not_found_tokens.add(first)
+    _push(db, customer_id, "four")
+    _push(db, customer_id, "five")
+    assert fcm.calls[-1]["tokens"] == [second]
+
+
+def test_token_moving_to_another_account_leaves_the_old_one(client, db, fcm, customer_login):
+    old_id, old_headers = customer_login()
+    new_id, new_headers = customer_login()
+    token = f"token-{uuid.uuid4().hex}"
+    client.post("/notifications/customer/device-token", headers=old_headers, json={"token": token, "device_type": "ios"})
+    _push(db, old_id, "before")
+    assert fcm.calls[-1]["tokens"] == [token]
+
+    client.post("/notifications/customer/device-token", headers=new_headers, json={"token": token, "device_type": "ios"})
+    calls = len(fcm.calls)
+    _push(db, old_id, "after")
+    assert len(fcm.calls) == calls
+    _push(db, new_id, "after")
+    assert fcm.calls[-1]["tokens"] == [token]
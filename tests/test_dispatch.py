@@ -0,0 +1,142 @@
+import random
+from datetime import datetime, timedelta
+
+from app.models import Order, OrderStatusEnum, Address, DeliveryPartner, DeliveryOffer, DeliveryOfferStatusEnum
+from app.models_location import DeliveryPartnerCurrentLocation
+from app.services.dispatch_service import PartnerIndex, DispatchEngine, DispatchService
+from app.services.geo_service import haversine_km
+
+
+def test_partner_index_matches_brute_force():
+    rng = random.Random(7)
+    riders = [(i, 12.9 + rng.random() * 0.2, 77.5 + rng.random() * 0.2) for i in range(2000)]
+    index = PartnerIndex()
+    for rider in riders:
+        index.add(*rider)
+
+    for _ in range(50):
+        lat, lng = 12.9 + rng.random() * 0.2, 77.5 + rng.random() * 0.2
+        expected = sorted(
+            ((i, haversine_km(lat, lng, rlat, rlng)) for i, rlat, rlng in riders if i % 3),
+            key=lambda match: match[1]
+        )[:5]
+        got = index.nearest(lat, lng, 5, 50.0, skip=lambda i: i % 3 == 0)
+        assert [i for i, _ in got] == [i for i, _ in expected]
+
+
+def test_plan_offers_nearest_then_reoffers_after_timeout():
+    index = PartnerIndex()
+    for rider_id in range(1, 7):
+        index.add(rider_id, 12.9 + rider_id * 0.001, 77.6)
+    engine = DispatchEngine(offers_per_order=2, offer_timeout=timedelta(seconds=30), reoffer_cooldown=timedelta(minutes=2))
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    orders = [(100, 12.9, 77.6)]
+
+    offers, expired = engine.plan(orders, index, [], busy={1}, now=now)
+    assert [o["delivery_partner_id"] for o in offers] == [2, 3]
+    assert expired == []
+
+    # Rider 2 declined, rider 3's offer is still open
+    history = [
+        (1, 100, 2, DeliveryOfferStatusEnum.DECLINED, now + timedelta(seconds=30)),
+        (2, 100, 3, DeliveryOfferStatusEnum.PENDING, now + timedelta(seconds=30)),
+    ]
+    offers, expired = engine.plan(orders, index, history, busy={1}, now=now + timedelta(seconds=5))
+    assert [o["delivery_partner_id"] for o in offers] == [4]
+
+    # Rider 3 never answered: the offer expires and goes to the next riders
+    history.append((3, 100, 4, DeliveryOfferStatusEnum.PENDING, now + timedelta(seconds=35)))
+    offers, expired = engine.plan(orders, index, history, busy={1}, now=now + timedelta(seconds=40))
+    assert sorted(expired) == [2, 3]
+    assert [o["delivery_partner_id"] for o in offers] == [5, 6]
+
+
+def test_plan_caps_open_offers_per_rider():
+    index = PartnerIndex()
+    index.add(1, 12.9, 77.6)
+    index.add(2, 12.95, 77.6)
+    engine = DispatchEngine(offers_per_order=1, max_open_offers_per_partner=2)
+    orders = [(order_id, 12.9, 77.6) for order_id in range(1, 6)]
+    offers, _ = engine.plan(orders, index, [], busy=set(), now=datetime(2026, 1, 1))
+    assert [(o["order_id"], o["delivery_partner_id"]) for o in offers] == [(1, 1), (2, 1), (3, 2), (4, 2)]
+
+
+def test_dispatch_pass_offers_order_to_nearest_online_rider(client, db, delivery_partner_login, make_restaurant, make_order):
+    # Somewhere no other test places riders or restaurants
+    base_lat, base_lng = 48.85, 2.35
+    riders = [delivery_partner_login() for _ in range(4)]
+    restaurant = make_restaurant(name="Dispatch Bistro")
+    db.add(Address(
+        restaurant_id=restaurant.id,
+        latitude=base_lat,
+        longitude=base_lng,
+        address_line_1="1 Rue Test",
+        city="Paris",
+        state="IDF",
+        pincode="75001"
+    ))
+    order = make_order(restaurant_id=restaurant.id, status=OrderStatusEnum.READY)
+
+    now = datetime.utcnow()
+    for (partner_id, _), offset_km in zip(riders, (0.5, 1.0, 1.5, 20.0)):
+        db.query(DeliveryPartner).filter(DeliveryPartner.id == partner_id).update({DeliveryPartner.is_online: True})
+        db.add(DeliveryPartnerCurrentLocation(
+            delivery_partner_id=partner_id,
+            latitude=base_lat + offset_km / 111.2,
+            longitude=base_lng,
+            recorded_at=now
+        ))
+    db.commit()
+
+    result = DispatchService.run_pass(db)
+    assert result["offers_made"] >= 3
+
+    offered = {row[0] for row in db.query(DeliveryOffer.delivery_partner_id).filter(DeliveryOffer.order_id == order.id)}
+    assert offered == {partner_id for partner_id, _ in riders[:3]}
+
+    far_id, far_headers = riders[3]
+    assert order.id not in [o["id"] for o in client.get("/delivery-partner/orders/available", headers=far_headers).json()]
+    assert client.post(f"/delivery-partner/orders/{order.id}/accept", headers=far_headers).status_code == 403
+
+    near_id, near_headers = riders[0]
+    assert order.id in [o["id"] for o in client.get("/delivery-partner/orders/available", headers=near_headers).json()]
+    assert client.post(f"/delivery-partner/orders/{order.id}/decline", headers=riders[1][1]).status_code == 200
+    assert client.post(f"/delivery-partner/orders/{order.id}/accept", headers=near_headers).status_code == 200
+
+    db.expire_all()
+    assert db.get(Order, order.id).delivery_partner_id == near_id
+
+
+def test_orders_dispatch_cannot_place_are_open_to_every_rider(client, db, delivery_partner_login, make_restaurant, make_order):
+    partner_id, headers = delivery_partner_login()
+    # No rider is ever near this restaurant
+    placed = make_restaurant(name="Remote Diner")
+    db.add(Address(
+        restaurant_id=placed.id,
+        latitude=-54.8,
+        longitude=-68.3,
+        address_line_1="1 Fin del Mundo",
+        city="Ushuaia",
+        state="TDF",
+        pincode="9410"
+    ))
+    unplaced = make_restaurant(name="No Address Diner")
+    now = datetime.utcnow()
+    orders = {}
+    for name, restaurant, ready_at in [
+        ("fresh", placed, now),
+        ("stale", placed, now - timedelta(hours=1)),
+        ("no_address", unplaced, now)
+    ]:
+        orders[name] = make_order(restaurant_id=restaurant.id, status=OrderStatusEnum.READY, ready_at=ready_at)
+
+    DispatchService.run_pass(db)
+    assert db.query(DeliveryOffer).filter(DeliveryOffer.order_id.in_([o.id for o in orders.values()])).count() == 0
+
+    available = {o["id"] for o in client.get("/delivery-partner/orders/available", headers=headers, params={"limit": 100}).json()}
+    assert orders["stale"].id in available
+    assert orders["no_address"].id in available
+    assert orders["fresh"].id not in available
+
+    assert client.post(f"/delivery-partner/orders/{orders['fresh'].id}/accept", headers=headers).status_code == 403
+    assert client.post(f"/delivery-partner/orders/{orders['no_address'].id}/accept", headers=headers).status_code == 200
@@ -0,0 +1,113 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Order, OrderStatusEnum, Address, MenuItem
+from app.models_location import DeliveryPartnerCurrentLocation
+from app.services.eta_service import EtaEstimator
+from app.services.geo_service import haversine_km, haversine_km_many, equirectangular_km_many
+from app.services.location_ingest_service import LocationIngestBuffer
+
+
+def test_batch_distances_match_scalar_haversine():
+    rng = random.Random(3)
+    pairs = [(12.8 + rng.random() * 0.3, 77.4 + rng.random() * 0.3, 12.8 + rng.random() * 0.3, 77.4 + rng.random() * 0.3)
+             for _ in range(500)]
+    lat1, lng1, lat2, lng2 = (list(column) for column in zip(*pairs))
+
+    exact = [haversine_km(*pair) for pair in pairs]
+    assert haversine_km_many(lat1, lng1, lat2, lng2) == pytest.approx(exact, rel=1e-9)
+    assert equirectangular_km_many(lat1, lng1, lat2, lng2) == pytest.approx(exact, rel=1e-3)
+
+    # One origin against many destinations
+    assert haversine_km_many(12.9, 77.6, lat2, lng2) == pytest.approx(
+        [haversine_km(12.9, 77.6, lat, lng) for lat, lng in zip(lat2, lng2)]
+    )
+    with pytest.raises(ValueError):
+        haversine_km_many([1.0, 2.0], 0.0, [1.0], 0.0)
+
+
+def test_rider_speed_blends_from_city_average():
+    estimator = EtaEstimator(default_speed_kmh=20, city_speeds_kmh={"Bengaluru": 15}, prior_samples=30)
+    assert estimator.speed_kmh("bengaluru ") == 15
+    assert estimator.speed_kmh("Pune") == 20
+    # 10 m/s = 36 km/h; new riders stay near the city speed, regular riders converge on their own
+    assert estimator.speed_kmh("Bengaluru", 10.0, 0) == 15
+    assert estimator.speed_kmh("Bengaluru", 10.0, 30) == pytest.approx(25.5)
+    assert estimator.speed_kmh("Bengaluru", 10.0, 3000) == pytest.approx(36, abs=0.3)
+    # A rider parked at a light doesn't push the ETA to infinity
+    assert estimator.speed_kmh("Bengaluru", 0.0, 3000) >= 5
+
+
+def test_batch_travel_minutes_match_single_trips():
+    estimator = EtaEstimator(default_speed_kmh=18, route_factor=1.3, prior_samples=10)
+    rng = random.Random(4)
+    trips = [(12.9 + rng.random() * 0.1, 77.6 + rng.random() * 0.1, rng.random() * 12, rng.randint(0, 50)) for _ in range(200)]
+    single = [estimator.travel_minutes(lat, lng, 12.95, 77.65, None, speed, n)["minutes"] for lat, lng, speed, n in trips]
+    batch = estimator.travel_minutes_many(
+        [t[0] for t in trips], [t[1] for t in trips], 12.95, 77.65,
+        rider_avg_speeds=[t[2] for t in trips], speed_samples=[t[3] for t in trips]
+    )
+    assert batch == pytest.approx(single, rel=1e-3)
+
+
+def test_flushes_keep_a_moving_average_speed(db, delivery_partner_login):
+    partner_id, _ = delivery_partner_login()
+    buffer = LocationIngestBuffer(max_batch=100, flush_interval=60)
+    buffer.add(partner_id, 12.9, 77.6, speed=10.0)
+    buffer.add(partner_id, 12.9, 77.6, speed=6.0)
+    buffer.flush()
+    buffer.add(partner_id, 12.9, 77.6, speed=3.0)
+    buffer.add(partner_id, 12.9, 77.6)
+    buffer.stop()
+
+    db.expire_all()
+    row = db.get(DeliveryPartnerCurrentLocation, partner_id)
+    assert row.speed_samples == 3
+    assert row.avg_speed == pytest.approx(8.0 + 0.2 * (3.0 - 8.0))
+
+
+def test_order_gets_delivery_estimate_and_tracking_uses_real_distance(
+    client, db, customer_login, delivery_partner_login, make_restaurant
+):
+    customer_id, headers = customer_login()
+    partner_id, partner_headers = delivery_partner_login()
+    restaurant = make_restaurant(name="ETA Kitchen")
+    db.add(Address(
+        restaurant_id=restaurant.id, latitude=12.9716, longitude=77.5946,
+        address_line_1="1 MG Road", city="Bengaluru", state="Karnataka", pincode="560001"
+    ))
+    item = MenuItem(restaurant_id=restaurant.id, name="Dosa", price=80)
+    db.add(item)
+    db.commit()
+
+    resp = client.post("/customer/addresses", headers=headers, json={
+        "latitude": 12.9352, "longitude": 77.6245, "address_line_1": "80 Feet Road",
+        "city": "Bengaluru", "state": "Karnataka", "pincode": "560034"
+    })
+    address_id = resp.json()["data"]["id"]
+    client.post("/customer/cart/add", headers=headers, json={"menu_item_id": item.id, "restaurant_id": restaurant.id})
+    placed_at = datetime.utcnow()
+    resp = client.post("/customer/orders", headers=headers, json={
+        "restaurant_id": restaurant.id, "address_id": address_id, "payment_method": "upi"
+    })
+    assert resp.status_code == 200
+    order_id = resp.json()["data"]["order_id"]
+
+    db.expire_all()
+    order = db.get(Order, order_id)
+    assert float(order.delivery_latitude) == pytest.approx(12.9352)
+    # ~5.2 km straight line: 20 min kitchen + ~20 min ride at 20 km/h
+    eta = order.estimated_delivery_time.replace(tzinfo=None)
+    assert placed_at + timedelta(minutes=35) < eta < placed_at + timedelta(minutes=45)
+
+    order.status = OrderStatusEnum.PICKED_UP
+    order.delivery_partner_id = partner_id
+    db.commit()
+    client.post("/delivery-partner/location/update", headers=partner_headers, json={
+        "latitude": 12.9352 + 2 / 111.2, "longitude": 77.6245, "speed": 5, "order_id": order_id
+    })
+    data = client.get(f"/customer/orders/{order_id}/track-location", headers=headers).json()["data"]
+    assert data["distance_km"] == pytest.approx(2.0, abs=0.02)
+    assert 5 <= data["eta_minutes"] <= 10
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import time
+from decimal import Decimal
+
+from app.routers.orders import ConnectionManager, _envelope, _open_envelope
+from app.services import order_event_service
+from app.services.broadcast_service import InMemoryBroadcastBackend, restaurant_id_from_channel, channel_for
+
+
+class FakeSocket:
+    def __init__(self, fail=False, delay=0, gate=None):
+        self.sent = []
+        self.fail = fail
+        self.delay = delay
+        self.gate = gate
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000):
+        self.closed = True
+
+    async def send_text(self, payload):
+        if self.fail:
+            raise RuntimeError("socket closed")
+        if self.gate:
+            await self.gate.wait()
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(payload))
+
+
+async def _settle(seconds=0.05):
+    await asyncio.sleep(seconds)
+
+
+def test_channel_round_trip():
+    assert restaurant_id_from_channel(channel_for(42)) == 42
+    assert restaurant_id_from_channel(b"orders:live:7") == 7
+    assert restaurant_id_from_channel("other:7") is None
+
+
+def test_envelope_carries_order_id_beside_payload():
+    assert _open_envelope(_envelope(42, b'{"type":"new_order"}')) == (42, b'{"type":"new_order"}')
+    assert _open_envelope(_envelope(None, b'{"a":"x\ny"}')) == (None, b'{"a":"x\ny"}')
+    assert _open_envelope(b'{"type":"new_order"}') == (None, b'{"type":"new_order"}')
+
+
+def test_events_reach_sockets_on_every_worker():
+    async def scenario():
+        # Two workers sharing one broker
+        backend = InMemoryBroadcastBackend()
+        worker_a, worker_b = ConnectionManager(backend), ConnectionManager(backend)
+        socket_a, socket_b, other_restaurant, dead = FakeSocket(), FakeSocket(), FakeSocket(), FakeSocket(fail=True)
+        await worker_a.connect(socket_a, 1)
+        await worker_b.connect(socket_b, 1)
+        await worker_b.connect(dead, 1)
+        await worker_b.connect(other_restaurant, 2)
+
+        await worker_a.send_to_restaurant(1, {"type": "new_order", "order": {"id": 5, "total_amount": Decimal("10.50")}})
+        await _settle()
+
+        assert socket_a.sent == socket_b.sent == [{"type": "new_order", "order": {"id": 5, "total_amount": "10.50"}}]
+        assert other_restaurant.sent == []
+        # Broken sockets are evicted instead of failing the broadcast
+        assert dead.closed
+        assert worker_b.metrics()["evictions"] == 1
+        assert worker_b.metrics()["connections"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_slow_socket_does_not_stall_others_and_is_evicted():
+    async def scenario():
+        manager = ConnectionManager(InMemoryBroadcastBackend(), send_timeout=0.2)
+        slow, fast = FakeSocket(delay=10), FakeSocket()
+        await manager.connect(slow, 1)
+        await manager.connect(fast, 1)
+
+        started = time.perf_counter()
+        await manager.send_to_restaurant(1, {"type": "new_order", "order": {"id": 1}})
+        await manager.send_to_restaurant(1, {"type": "new_order", "order": {"id": 2}})
+        await _settle()
+        # The fast tablet is served while the slow one is still blocked
+        assert [event["order"]["id"] for event in fast.sent] == [1, 2]
+        assert time.perf_counter() - started < 0.2
+
+        await _settle(0.3)
+        assert slow.closed
+        assert manager.metrics() == {
+            "connections": 1, "queue_depth": 0, "max_queue_depth": 0,
+            "sent": 2, "coalesced": 0, "dropped": 0, "evictions": 1
+        }
+
+    asyncio.run(scenario())
+
+
+def test_queued_updates_for_same_order_are_coalesced_and_bounded():
+    async def scenario():
+        gate = asyncio.Event()
+        manager = ConnectionManager(InMemoryBroadcastBackend(), max_queue=2)
+        tablet = FakeSocket(gate=gate)
+        await manager.connect(tablet, 1)
+
+        # Order 1 "new" goes in flight and blocks on the gate; the rest queue up
+        for order_id, event_type in [(1, "new_order"), (1, "order_accepted"), (1, "preparing"), (2, "new_order")]:
+            await manager.send_to_restaurant(1, {"type": event_type, "order": {"id": order_id}})
+            await asyncio.sleep(0)
+        metrics = manager.metrics()
+        assert metrics["queue_depth"] == 2
+        assert metrics["coalesced"] == 1
+
+        # Queue is full: a third distinct order pushes out the oldest queued update
+        await manager.send_to_restaurant(1, {"type": "new_order", "order": {"id": 3}})
+        assert manager.metrics()["dropped"] == 1
+
+        gate.set()
+        await _settle()
+        assert [(e["order"]["id"], e["type"]) for e in tablet.sent] == [(1, "new_order"), (2, "new_order"), (3, "new_order")]
+
+    asyncio.run(scenario())
+
+
+def test_status_change_is_pushed_to_live_socket(db, client, owner_login, make_restaurant, make_order):
+    owner_id, headers = owner_login()
+    restaurant_id = make_restaurant(owner_id=owner_id).id
+    order_id = make_order(restaurant_id=restaurant_id, total_amount=Decimal("99.00")).id
+
+    token = headers["Authorization"].split()[1]
+    with client.websocket_connect(f"/orders/live?token={token}") as websocket:
+        websocket.send_text("ping")
+        assert websocket.receive_text() == "pong"
+        resp = client.put(f"/orders/{order_id}/accept", headers=headers)
+        assert resp.status_code == 200
+        event = websocket.receive_json()
+
+    assert event["type"] == "order_accepted"
+    assert event["order"]["id"] == order_id
+    assert event["order"]["status"] == "accepted"
+    # The HTTP reply reuses the order body encoded for the socket
+    body = resp.json()
+    assert body["success"] is True
+    assert body["message"] == "Order marked as accepted"
+    assert body["next_cursor"] is None
+    assert body["data"] == event["order"]
+    assert body["data"]["total_amount"] == "99.00"
+
+    resp = client.get("/admin/live-orders/metrics")
+    assert resp.status_code == 200
+    assert resp.json()["data"]["evictions"] >= 0
+
+
+def test_order_is_serialized_once_per_status_change(db, client, owner_login, make_restaurant, make_order, monkeypatch):
+    owner_id, headers = owner_login()
+    restaurant_id = make_restaurant(owner_id=owner_id).id
+    order = make_order(restaurant_id=restaurant_id, total_amount=Decimal("10.00"))
+
+    calls = []
+    original = order_event_service.OrderResponse.from_orm
+    monkeypatch.setattr(
+        order_event_service.OrderResponse, "from_orm",
+        lambda obj: calls.append(obj.id) or original(obj)
+    )
+    resp = client.post(f"/orders/{order.id}/reject", headers=headers, json={"status": "rejected", "rejection_reason": "Busy"})
+    assert resp.status_code == 200
+    assert resp.json()["data"]["status"] == "rejected"
+    assert calls == [order.id]
+
+
+def test_publish_failure_does_not_fail_committed_status_change(db, client, owner_login, make_restaurant, make_order, monkeypatch):
+    from app.routers import orders as orders_router
+
+    owner_id, headers = owner_login()
+    restaurant_id = make_restaurant(owner_id=owner_id).id
+    orders = [make_order(restaurant_id=restaurant_id, total_amount=Decimal("10.00")) for _ in range(2)]
+
+    async def broker_down(restaurant_id, payload, order_id=None):
+        raise ConnectionError("broker unavailable")
+    monkeypatch.setattr(orders_router.manager, "publish", broker_down)
+
+    resp = client.put(f"/orders/{orders[0].id}/accept", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["data"]["status"] == "accepted"
+    resp = client.post(f"/orders/{orders[1].id}/reject", headers=headers, json={"status": "rejected", "rejection_reason": "Busy"})
+    assert resp.status_code == 200
+    assert resp.json()["data"]["status"] == "rejected"
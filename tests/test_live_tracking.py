@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.models import OrderStatusEnum
+from app.services.broadcast_service import InMemoryBroadcastBackend
+from app.services.tracking_service import TrackingManager
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    async def close(self, code=1000):
+        self.closed = True
+
+    async def send_text(self, payload):
+        self.sent.append(json.loads(payload))
+
+
+def _ping(manager, order_id, partner_id, lat):
+    return manager.publish_position(order_id, partner_id, lat, 77.6)
+
+
+def test_positions_are_throttled_per_subscriber():
+    async def scenario():
+        # Two workers sharing one broker; the customers are on one, the rider's pings land on the other
+        backend = InMemoryBroadcastBackend()
+        ingest, sockets = TrackingManager(backend, min_interval=0.2), TrackingManager(backend, min_interval=0.2)
+        await ingest.start()
+        fast, slow, other_order = FakeSocket(), FakeSocket(), FakeSocket()
+        await sockets.subscribe(fast, 1, delivery_partner_id=9)
+        await sockets.subscribe(slow, 1, interval=0.5, delivery_partner_id=9)
+        await sockets.subscribe(other_order, 2, delivery_partner_id=9)
+
+        # 60 pings over ~0.6s
+        for i in range(60):
+            await _ping(ingest, 1, 9, 12.9 + i * 0.0001)
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.6)
+
+        assert 3 <= len(fast.sent) <= 5
+        assert 2 <= len(slow.sent) <= 3
+        assert other_order.sent == []
+        # The newest position always gets through once the interval passes
+        assert fast.sent[-1]["latitude"] == slow.sent[-1]["latitude"] == 12.9 + 59 * 0.0001
+        assert sockets.metrics()["throttled"] >= 50
+
+    asyncio.run(scenario())
+
+
+def test_only_the_assigned_rider_is_followed():
+    async def scenario():
+        manager = TrackingManager(InMemoryBroadcastBackend(), min_interval=0)
+        socket = FakeSocket()
+        await manager.subscribe(socket, 1, destination=(12.95, 77.6))
+
+        await _ping(manager, 1, 9, 12.9)
+        await manager.publish(1, {"type": "assigned", "order_id": 1, "delivery_partner_id": 7})
+        await _ping(manager, 1, 9, 12.9)
+        await _ping(manager, 1, 7, 12.9)
+        await asyncio.sleep(0.05)
+
+        assert [event["type"] for event in socket.sent] == ["assigned", "location"]
+        assert socket.sent[1]["delivery_partner_id"] == 7
+        # ~5.6 km to the drop-off at the default city speed
+        assert socket.sent[1]["distance_km"] == 5.56
+        assert socket.sent[1]["eta_minutes"] >= 15
+
+    asyncio.run(scenario())
+
+
+def test_customer_socket_gets_rider_pings(client, db, customer_login, delivery_partner_login, make_order):
+    customer_id, headers = customer_login()
+    _, stranger_headers = customer_login()
+    partner_id, partner_headers = delivery_partner_login()
+    order = make_order(
+        customer_id=customer_id,
+        delivery_partner_id=partner_id,
+        delivery_latitude=12.95,
+        delivery_longitude=77.6,
+        status=OrderStatusEnum.PICKED_UP
+    )
+    token = headers["Authorization"].split()[1]
+
+    with client.websocket_connect(f"/customer/orders/{order.id}/live-location?token={token}") as ws:
+        snapshot = ws.receive_json()
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["delivery_partner_id"] == partner_id
+
+        client.post("/delivery-partner/location/update", headers=partner_headers, json={
+            "latitude": 12.9, "longitude": 77.6, "order_id": order.id
+        })
+        position = ws.receive_json()
+        assert position["type"] == "location"
+        assert (position["latitude"], position["longitude"]) == (12.9, 77.6)
+        assert position["distance_km"] == 5.56
+
+        ws.send_text("ping")
+        assert ws.receive_text() == "pong"
+
+    stranger_token = stranger_headers["Authorization"].split()[1]
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/customer/orders/{order.id}/live-location?token={stranger_token}") as ws:
+            ws.receive_json()
+    assert closed.value.code == 1008
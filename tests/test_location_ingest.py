@@ -0,0 +1,174 @@
+import time
+
+from app.models_location import DeliveryPartnerLocation
+from app.services.location_ingest_service import LocationIngestBuffer, location_buffer
+
+
+def _points(db, partner_id):
+    return db.query(DeliveryPartnerLocation).filter(
+        DeliveryPartnerLocation.delivery_partner_id == partner_id
+    ).order_by(DeliveryPartnerLocation.id).all()
+
+
+def test_size_trigger_flushes_in_batches(db, delivery_partner_login):
+    partner_id, _ = delivery_partner_login()
+    buffer = LocationIngestBuffer(max_batch=3, flush_interval=60)
+    for i in range(7):
+        buffer.add(partner_id, 12.9 + i * 0.001, 77.6)
+    # Full batches are written by the flusher without waiting for the interval
+    deadline = time.time() + 5
+    while buffer.stats()["written"] < 6 and time.time() < deadline:
+        time.sleep(0.01)
+    assert buffer.stats()["written"] >= 6
+
+    buffer.stop()
+    stats = buffer.stats()
+    assert stats["buffered"] == 0
+    assert stats["received"] == stats["written"] == 7
+    assert stats["batches"] >= 3
+    assert stats["dropped"] == stats["failures"] == 0
+    points = _points(db, partner_id)
+    assert [round(p.latitude, 3) for p in points] == [round(12.9 + i * 0.001, 3) for i in range(7)]
+
+
+def test_time_trigger_and_overflow(db, delivery_partner_login):
+    partner_id, _ = delivery_partner_login()
+    buffer = LocationIngestBuffer(max_batch=100, flush_interval=0.05, max_buffered=2)
+    buffer.add(partner_id, 1.0, 1.0)
+    buffer.add(partner_id, 2.0, 2.0)
+    buffer.add(partner_id, 3.0, 3.0)
+    deadline = time.time() + 5
+    while buffer.stats()["written"] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    buffer.stop()
+    # The oldest ping was dropped when the buffer overflowed
+    assert buffer.stats()["dropped"] == 1
+    assert [p.latitude for p in _points(db, partner_id)] == [2.0, 3.0]
+
+
+def test_ping_endpoint_acknowledges_before_write(db, client, delivery_partner_login):
+    partner_id, headers = delivery_partner_login()
+    resp = client.post(
+        "/delivery-partner/location/update",
+        headers=headers,
+        json={"latitude": 12.97, "longitude": 77.59, "speed": 4.5, "bearing": 90}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["data"]["latitude"] == 12.97
+
+    location_buffer.flush()
+    points = _points(db, partner_id)
+    assert len(points) == 1
+    assert points[0].speed == 4.5
+
+
+def test_current_location_is_a_point_lookup(db, client, delivery_partner_login, count_statements):
+    from app.models_location import DeliveryPartnerCurrentLocation
+    from app.services.location_service import LocationService
+
+    partner_id, headers = delivery_partner_login()
+    for latitude in (12.1, 12.2, 12.3):
+        client.post("/delivery-partner/location/update", headers=headers, json={"latitude": latitude, "longitude": 77.5})
+
+    # Unflushed pings are already visible to this worker
+    assert LocationService.get_current_location(db, partner_id)["latitude"] == 12.3
+
+    location_buffer.flush()
+    row = db.get(DeliveryPartnerCurrentLocation, partner_id)
+    assert (row.latitude, row.longitude) == (12.3, 77.5)
+    assert len(_points(db, partner_id)) == 3
+
+    db.expunge_all()
+    with count_statements() as statements:
+        location = LocationService.get_current_location(db, partner_id)
+    assert location["latitude"] == 12.3
+    assert len(statements) == 1
+    assert "delivery_partner_locations" not in statements[0]
+
+    resp = client.get("/delivery-partner/location/current", headers=headers)
+    assert resp.json()["data"]["latitude"] == 12.3
+
+
+def test_late_flush_never_moves_partner_backwards(db, delivery_partner_login):
+    from datetime import datetime, timedelta
+    from app.models_location import DeliveryPartnerCurrentLocation
+
+    partner_id, _ = delivery_partner_login()
+    now = datetime.utcnow()
+    newer, older = LocationIngestBuffer(flush_interval=60), LocationIngestBuffer(flush_interval=60)
+    newer.add(partner_id, 2.0, 2.0, recorded_at=now)
+    older.add(partner_id, 1.0, 1.0, recorded_at=now - timedelta(seconds=10))
+    newer.stop()
+    older.stop()
+    db.expire_all()
+    assert db.get(DeliveryPartnerCurrentLocation, partner_id).latitude == 2.0
+
+
+def test_customer_tracks_rider_from_latest_location(db, client, customer_login, delivery_partner_login, make_order):
+    from app.models import OrderStatusEnum
+
+    customer_id, customer_headers = customer_login()
+    partner_id, partner_headers = delivery_partner_login()
+    order = make_order(customer_id=customer_id, delivery_partner_id=partner_id, status=OrderStatusEnum.PICKED_UP)
+
+    client.post(
+        "/delivery-partner/location/update",
+        headers=partner_headers,
+        json={"latitude": 12.5, "longitude": 77.5, "speed": 5, "order_id": order.id}
+    )
+    resp = client.get(f"/customer/orders/{order.id}/track-location", headers=customer_headers)
+    data = resp.json()["data"]
+    assert data["tracking_available"] is True
+    assert data["location"]["latitude"] == 12.5
+
+
+def test_bad_point_is_dropped_without_blocking_the_batch(db, delivery_partner_login):
+    partner_id, _ = delivery_partner_login()
+    buffer = LocationIngestBuffer(max_batch=10, flush_interval=60)
+    buffer.add(partner_id, 1.0, 1.0)
+    # A value the driver cannot bind fails the whole multi-row insert
+    buffer.add(partner_id, 2.0, 2.0, accuracy=object())
+    buffer.add(partner_id, 3.0, 3.0)
+    buffer.stop()
+
+    stats = buffer.stats()
+    assert stats["buffered"] == 0
+    assert stats["written"] == 2
+    assert stats["rejected"] == 1
+    assert [p.latitude for p in _points(db, partner_id)] == [1.0, 3.0]
+
+    # Later pings are not held up behind it
+    buffer.add(partner_id, 4.0, 4.0)
+    assert buffer.flush() == 1
+
+
+def test_ping_order_must_be_assigned_to_the_partner(db, client, delivery_partner_login, make_order):
+    from app.models import OrderStatusEnum
+
+    partner_id, headers = delivery_partner_login()
+    other_id, _ = delivery_partner_login()
+    orders = {}
+    for name, assignee, order_status in [
+        ("mine", partner_id, OrderStatusEnum.PICKED_UP),
+        ("theirs", other_id, OrderStatusEnum.PICKED_UP),
+        ("delivered", partner_id, OrderStatusEnum.DELIVERED)
+    ]:
+        orders[name] = make_order(delivery_partner_id=assignee, status=order_status)
+
+    def ping(order_id, latitude):
+        return client.post(
+            "/delivery-partner/location/update",
+            headers=headers,
+            json={"latitude": latitude, "longitude": 77.5, "order_id": order_id}
+        )
+
+    assert ping(orders["mine"].id, 12.1).status_code == 200
+    assert ping(orders["theirs"].id, 12.2).status_code == 403
+    assert ping(10 ** 9, 12.3).status_code == 403
+    # Pings after delivery still move the partner but are no longer tagged with the order
+    assert ping(orders["delivered"].id, 12.4).status_code == 200
+
+    location_buffer.flush()
+    assert [(p.latitude, p.order_id) for p in _points(db, partner_id)] == [
+        (12.1, orders["mine"].id), (12.4, None)
+    ]
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.models import OrderStatusEnum
+from app.models_location import DeliveryPartnerLocation, DeliveryRoute
+from app.services.geo_service import encode_polyline, decode_polyline, simplify_path, haversine_km
+from app.services.location_retention_service import LocationRetentionService
+
+
+def test_polyline_matches_reference_encoding():
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == points
+
+
+def test_simplify_drops_collinear_points_only():
+    straight = [(12.9 + i * 0.0001, 77.6) for i in range(50)]
+    assert simplify_path(straight, 5.0) == [0, 49]
+    corner = straight + [(12.9049, 77.6 + i * 0.0001) for i in range(1, 50)]
+    assert simplify_path(corner, 5.0) == [0, 49, 98]
+
+
+def _add_points(db, partner_id, order_id, start, count, step=timedelta(seconds=10)):
+    db.execute(insert(DeliveryPartnerLocation.__table__), [{
+        "delivery_partner_id": partner_id,
+        "order_id": order_id,
+        "latitude": 12.9 + i * 0.0005,
+        "longitude": 77.6 + (i % 2) * 0.00002,  # ~2 m GPS jitter
+        "created_at": start + step * i
+    } for i in range(count)])
+    db.commit()
+
+
+def test_old_points_are_archived_into_routes_then_purged(db, delivery_partner_login, make_order):
+    partner_id, _ = delivery_partner_login()
+    order_id = make_order(delivery_partner_id=partner_id, status=OrderStatusEnum.DELIVERED).id
+
+    now = datetime.utcnow()
+    _add_points(db, partner_id, order_id, now - timedelta(days=40), 200)
+    _add_points(db, partner_id, None, now - timedelta(days=35), 20)
+    _add_points(db, partner_id, None, now - timedelta(hours=1), 5)
+
+    result = LocationRetentionService.run(db, retention_days=30, now=now)
+    assert result["routes_archived"] >= 1
+
+    route = db.get(DeliveryRoute, order_id)
+    assert route.raw_point_count == 200
+    assert route.point_count < 10
+    path = decode_polyline(route.polyline)
+    assert path[0] == (12.9, 77.6)
+    assert haversine_km(*path[-1], 12.9 + 199 * 0.0005, 77.6 + 0.00002) < 0.01
+
+    remaining = db.query(DeliveryPartnerLocation).filter(
+        DeliveryPartnerLocation.delivery_partner_id == partner_id
+    ).all()
+    assert len(remaining) == 5
+
+    # A second pass finds nothing left to do for this partner
+    LocationRetentionService.run(db, retention_days=30, now=now)
+    assert db.query(DeliveryRoute).filter(DeliveryRoute.order_id == order_id).count() == 1
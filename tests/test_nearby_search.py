@@ -0,0 +1,102 @@
+import math
+import random
+
+from app.models import Address
+from app.services.geo_service import geohash_encode, covering_cells, haversine_km
+from app.services.restaurant_search_service import RestaurantSearchService
+
+# Random point per run so restaurants left over from earlier runs never match
+CENTER = (random.uniform(-50, 50), random.uniform(-170, 170))
+
+
+def _add_address(db, restaurant, latitude, longitude):
+    address = Address(
+        restaurant_id=restaurant.id,
+        latitude=latitude,
+        longitude=longitude,
+        address_line_1="1 Test Road",
+        city="Bangalore",
+        state="Karnataka",
+        pincode="560001"
+    )
+    RestaurantSearchService.index_address(address)
+    db.add(address)
+    db.commit()
+
+
+def test_covering_cells_contain_points_within_radius():
+    lat, lng = CENTER
+    for radius_km in (0.5, 2.0, 5.0, 20.0):
+        cells = covering_cells(lat, lng, radius_km)
+        # Points just inside the circle in eight directions
+        for d_lat, d_lng in [(1, 0), (-1, 0), (0, 1), (0, -1), (0.7, 0.7), (-0.7, 0.7), (0.7, -0.7), (-0.7, -0.7)]:
+            point_lat = lat + d_lat * radius_km * 0.99 / 111.2
+            point_lng = lng + d_lng * radius_km * 0.99 / (111.2 * math.cos(math.radians(lat)))
+            assert haversine_km(lat, lng, point_lat, point_lng) <= radius_km
+            point_hash = geohash_encode(point_lat, point_lng)
+            assert any(point_hash.startswith(cell) for cell in cells)
+
+
+def test_nearby_restaurants_sorted_and_paginated(db, client, make_restaurant, customer_login, count_statements):
+    lat, lng = CENTER
+    near = make_restaurant(name="Near")
+    middle = make_restaurant(name="Middle")
+    closed = make_restaurant(name="Closed", is_open=False)
+    far = make_restaurant(name="Far")
+    _add_address(db, near, lat + 0.005, lng)
+    _add_address(db, middle, lat, lng + 0.02)
+    _add_address(db, closed, lat + 0.001, lng)
+    _add_address(db, far, lat + 0.5, lng)
+
+    matches, total = RestaurantSearchService.find_nearby(db, lat, lng, radius_km=5.0)
+    assert total == 2
+    assert [restaurant.id for restaurant, _ in matches] == [near.id, middle.id]
+    assert matches[0][1] < matches[1][1]
+
+    db.expunge_all()
+    with count_statements() as statements:
+        page, total = RestaurantSearchService.find_nearby(db, lat, lng, radius_km=5.0, after=(matches[0][1], near.id), limit=1)
+    assert total == 2
+    # Candidates are ranked on a projection; only the page's rows are loaded
+    assert len(statements) == 2
+    assert "restaurants.restaurant_name" not in statements[0]
+    assert " IN (" in statements[1]
+    assert [restaurant.id for restaurant, _ in page] == [middle.id]
+
+    # Through the endpoint
+    _, headers = customer_login()
+    resp = client.get(
+        "/customer/home",
+        headers=headers,
+        params={"latitude": lat, "longitude": lng, "radius_km": 5, "limit": 1}
+    )
+    assert resp.status_code == 200
+    data = resp.json()['data']
+    assert [r['id'] for r in data['restaurants']] == [near.id]
+    assert data['restaurants'][0]['distance_km'] < 1
+    assert data['nearby']['total'] == 2
+    assert data['nearby']['has_more'] is True
+
+    resp = client.get(
+        "/customer/home",
+        headers=headers,
+        params={"latitude": lat, "longitude": lng, "radius_km": 5, "limit": 1, "cursor": resp.json()['next_cursor']}
+    )
+    data = resp.json()['data']
+    assert [r['id'] for r in data['restaurants']] == [middle.id]
+    assert data['nearby']['has_more'] is False
+    assert resp.json()['next_cursor'] is None
+
+
+def test_moving_an_address_to_zero_coordinates_reindexes_it(db, client, make_restaurant, owner_login):
+    owner_id, headers = owner_login()
+    restaurant = make_restaurant(owner_id=owner_id)
+    _add_address(db, restaurant, 12.97, 77.59)
+
+    resp = client.put("/restaurant/address", headers=headers, json={"latitude": 0.0, "longitude": 0.0})
+
+    assert resp.status_code == 200
+    address = db.query(Address).filter(Address.restaurant_id == restaurant.id).one()
+    db.refresh(address)
+    assert float(address.latitude) == 0.0
+    assert address.geohash == geohash_encode(0.0, 0.0)
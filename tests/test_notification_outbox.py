@@ -0,0 +1,175 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.config import get_settings
+from app.models import Customer, DeviceToken, Notification, NotificationOutbox, NotificationOutboxStatusEnum
+from app.services import notification_service
+from app.services.notification_service import NotificationService
+from app.services.push_transport import FakePushTransport
+
+settings = get_settings()
+
+
+@pytest.fixture
+def fcm(monkeypatch):
+    fake = FakePushTransport()
+    monkeypatch.setattr(notification_service, "push_transport", fake)
+    return fake
+
+
+def _notify(db, customer_id, title="Order update"):
+    return asyncio.run(NotificationService.create_notification(
+        db, customer_id=customer_id, title=title, message="Your order is on the way",
+        notification_type="order_update"
+    ))
+
+
+def _push_for(db, notification):
+    db.expire_all()
+    return db.query(NotificationOutbox).filter(NotificationOutbox.notification_id == notification.id).first()
+
+
+def _register(db, customer_id):
+    token = f"token-{uuid.uuid4().hex}"
+    db.add(DeviceToken(customer_id=customer_id, token=token, device_type="android"))
+    db.commit()
+    return token
+
+
+def test_creating_a_notification_queues_the_push_instead_of_sending(db, fcm, customer_login):
+    customer_id, _ = customer_login()
+    token = _register(db, customer_id)
+
+    notification = _notify(db, customer_id)
+
+    assert fcm.calls == []
+    push = _push_for(db, notification)
+    assert push.status == NotificationOutboxStatusEnum.PENDING
+    assert push.data == {"notification_type": "order_update", "order_id": ""}
+
+    NotificationService.process_outbox(db, limit=1000)
+
+    assert _push_for(db, notification) is None
+    assert db.get(Notification, notification.id) is not None
+    sent = [call for call in fcm.calls if call["tokens"] == [token]]
+    assert len(sent) == 1 and sent[0]["title"] == "Order update"
+
+
+def test_failed_pushes_back_off_exponentially_then_give_up(db, fcm, customer_login):
+    customer_id, _ = customer_login()
+    _register(db, customer_id)
+    notification = _notify(db, customer_id)
+    fcm.failure_rate = 1.0
+
+    now = datetime.utcnow()
+    delays = []
+    for _ in range(settings.NOTIFICATION_MAX_ATTEMPTS):
+        NotificationService.process_outbox(db, limit=1000, now=now)
+        push = _push_for(db, notification)
+        if push.status == NotificationOutboxStatusEnum.FAILED:
+            break
+        delays.append((push.next_attempt_at.replace(tzinfo=None) - now).total_seconds())
+        now = push.next_attempt_at.replace(tzinfo=None)
+
+    base = settings.NOTIFICATION_RETRY_BASE_SECONDS
+    assert delays == [min(base * 2 ** i, settings.NOTIFICATION_RETRY_MAX_SECONDS) for i in range(len(delays))]
+    assert push.status == NotificationOutboxStatusEnum.FAILED
+    assert push.attempts == settings.NOTIFICATION_MAX_ATTEMPTS
+    assert push.last_error == "FCM send failed: Internal error encountered."
+
+
+def test_unregistered_tokens_are_deactivated_without_retrying(db, fcm, customer_login):
+    customer_id, _ = customer_login()
+    token = _register(db, customer_id)
+    notification = _notify(db, customer_id)
+    fcm.not_found_tokens.add(token)
+
+    NotificationService.process_outbox(db, limit=1000)
+
+    assert _push_for(db, notification) is None
+    assert db.query(DeviceToken).filter(DeviceToken.token == token).one().is_active is False
+
+
+def test_claimed_pushes_are_invisible_to_other_workers_until_the_claim_times_out(db, customer_login):
+    customer_id, _ = customer_login()
+    notification = _notify(db, customer_id)
+    now = datetime.utcnow() + timedelta(seconds=1)
+
+    first = NotificationService.claim_pushes(db, 1000, now)
+    assert notification.id in [push.notification_id for push in first]
+    assert notification.id not in [push.notification_id for push in NotificationService.claim_pushes(db, 1000, now)]
+
+    later = now + timedelta(seconds=settings.NOTIFICATION_CLAIM_TIMEOUT_SECONDS + 1)
+    assert notification.id in [push.notification_id for push in NotificationService.claim_pushes(db, 1000, later)]
+
+
+def _customers_with_tokens(db, customers, tokens_each):
+    phones = [f"+91{uuid.uuid4().int % 10**10:010d}" for _ in range(customers)]
+    db.execute(insert(Customer.__table__), [{"phone_number": phone, "is_active": True} for phone in phones])
+    ids = [row[0] for row in db.query(Customer.id).filter(Customer.phone_number.in_(phones))]
+    tokens = {customer_id: [f"token-{uuid.uuid4().hex}" for _ in range(tokens_each)] for customer_id in ids}
+    db.execute(insert(DeviceToken.__table__), [
+        {"customer_id": customer_id, "token": token, "device_type": "android", "is_active": True}
+        for customer_id, customer_tokens in tokens.items() for token in customer_tokens
+    ])
+    db.commit()
+    return tokens
+
+
+def test_batch_notifications_are_inserted_in_one_statement_each(db, count_statements):
+    tokens = _customers_with_tokens(db, 50, 1)
+    title = f"Flash sale {uuid.uuid4().hex[:8]}"
+
+    with count_statements() as statements:
+        created = NotificationService.create_notifications(
+            db, [(("customer", customer_id), title, "20% off") for customer_id in tokens], notification_type="promotion"
+        )
+
+    assert created == 50
+    assert [s.split()[2] for s in statements if s.startswith("INSERT")] == ["notifications", "notification_outbox"]
+    assert db.query(Notification).filter(Notification.title == title).count() == 50
+    assert db.query(NotificationOutbox).filter(NotificationOutbox.title == title).count() == 50
+
+
+def test_pushes_with_the_same_content_share_multicasts(db, fcm, count_statements):
+    tokens = _customers_with_tokens(db, 3, 400)
+    other_tokens = _customers_with_tokens(db, 1, 2)
+    title = f"Order update {uuid.uuid4().hex[:8]}"
+    NotificationService.create_notifications(
+        db,
+        [(("customer", customer_id), title, "Ready for pickup") for customer_id in tokens]
+        + [(("customer", customer_id), title, "Something else") for customer_id in other_tokens],
+        notification_type="order_update", order_id=None
+    )
+
+    with count_statements() as statements:
+        result = NotificationService.process_outbox(db, limit=1000)
+
+    assert result["sent"] >= 4
+    ours = {token for customer_tokens in tokens.values() for token in customer_tokens}
+    calls = [call for call in fcm.calls if set(call["tokens"]) & ours]
+    # 1200 tokens with one payload: the fewest calls the 500-token limit allows
+    assert sorted(len(call["tokens"]) for call in calls) == [200, 500, 500]
+    assert set().union(*(call["tokens"] for call in calls)) == ours
+    assert [call["tokens"] for call in fcm.calls if call["body"] == "Something else"] == list(other_tokens.values())
+    assert len([s for s in statements if "FROM device_tokens" in s]) == 1
+
+
+def test_transport_outage_retries_every_push_in_the_call(db, fcm):
+    tokens = _customers_with_tokens(db, 3, 1)
+    title = f"Outage {uuid.uuid4().hex[:8]}"
+    NotificationService.create_notifications(
+        db, [(("customer", customer_id), title, "Hello") for customer_id in tokens], notification_type="promotion"
+    )
+    fcm.call_failure_rate = 1.0
+
+    NotificationService.process_outbox(db, limit=1000)
+
+    db.expire_all()
+    pushes = db.query(NotificationOutbox).filter(NotificationOutbox.title == title).all()
+    assert [push.attempts for push in pushes] == [1, 1, 1]
+    assert all(push.last_error == "FCM send failed: Simulated FCM outage" for push in pushes)
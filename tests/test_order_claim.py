@@ -0,0 +1,92 @@
+import threading
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+from app.models import Order, OrderStatusEnum, DeliveryPartner, DeliveryOffer
+from app.services.dispatch_service import DispatchService
+
+
+def _ready_orders(make_order, restaurant_id, count):
+    return [make_order(restaurant_id=restaurant_id, status=OrderStatusEnum.READY).id for _ in range(count)]
+
+
+def _riders(db, count):
+    phones = [f"+91{uuid.uuid4().int % 10**10:010d}" for _ in range(count)]
+    db.execute(insert(DeliveryPartner.__table__), [
+        {"full_name": "Racer", "phone_number": phone, "is_active": True} for phone in phones
+    ])
+    db.commit()
+    return [row[0] for row in db.query(DeliveryPartner.id).filter(DeliveryPartner.phone_number.in_(phones))]
+
+
+def _race(claims):
+    """Run every (order_id, rider_id) claim at once on its own session; returns the winning claims"""
+    start = threading.Barrier(len(claims))
+
+    def claim(order_id, rider_id):
+        db = SessionLocal()
+        try:
+            start.wait()
+            won = DispatchService.claim_order(db, order_id, rider_id)
+            db.commit()
+            return won
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=len(claims)) as pool:
+        results = list(pool.map(lambda c: claim(*c), claims))
+    return [c for c, won in zip(claims, results) if won]
+
+
+def test_hundreds_of_concurrent_claims_have_one_winner(db, make_restaurant, make_order):
+    order_id, = _ready_orders(make_order, make_restaurant().id, 1)
+    riders = _riders(db, 300)
+
+    winners = _race([(order_id, rider_id) for rider_id in riders])
+
+    assert len(winners) == 1
+    db.expire_all()
+    order = db.get(Order, order_id)
+    assert order.status == OrderStatusEnum.PICKED_UP
+    assert order.delivery_partner_id == winners[0][1]
+
+
+def test_concurrent_claims_on_different_orders_each_get_a_winner(db, make_restaurant, make_order):
+    order_ids = _ready_orders(make_order, make_restaurant().id, 20)
+    riders = _riders(db, 200)
+
+    winners = _race([(order_ids[i % len(order_ids)], rider_id) for i, rider_id in enumerate(riders)])
+
+    assert Counter(order_id for order_id, _ in winners) == Counter(order_ids)
+    db.expire_all()
+    assigned = dict(db.query(Order.id, Order.delivery_partner_id).filter(Order.id.in_(order_ids)).all())
+    assert assigned == dict(winners)
+
+
+def test_concurrent_accept_requests_have_one_winner(client, db, delivery_partner_login, make_restaurant, make_order):
+    riders = [delivery_partner_login() for _ in range(40)]
+    order_id, = _ready_orders(make_order, make_restaurant().id, 1)
+    now = datetime.utcnow()
+    db.add_all([DeliveryOffer(
+        order_id=order_id,
+        delivery_partner_id=rider_id,
+        offered_at=now,
+        expires_at=now + timedelta(minutes=5)
+    ) for rider_id, _ in riders])
+    db.commit()
+
+    start = threading.Barrier(len(riders))
+
+    def accept(headers):
+        start.wait()
+        return client.post(f"/delivery-partner/orders/{order_id}/accept", headers=headers).status_code
+
+    with ThreadPoolExecutor(max_workers=len(riders)) as pool:
+        codes = Counter(pool.map(accept, [headers for _, headers in riders]))
+
+    assert codes == {200: 1, 400: len(riders) - 1}
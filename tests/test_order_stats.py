@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from app.models import RestaurantDailyStats
+from app.services.dashboard_service import DashboardService
+from app.services.order_stats_service import OrderStatsService
+
+
+def _create_order(db, make_order, restaurant_id, amount):
+    order = make_order(restaurant_id=restaurant_id, total_amount=Decimal(amount))
+    OrderStatsService.record_created(db, order)
+    db.commit()
+    return order.id
+
+
+def test_rollup_follows_status_changes(db, client, owner_login, make_restaurant, make_order):
+    owner_id, headers = owner_login()
+    restaurant_id = make_restaurant(owner_id=owner_id).id
+    delivered_id = _create_order(db, make_order, restaurant_id, 120)
+    rejected_id = _create_order(db, make_order, restaurant_id, 80)
+    _create_order(db, make_order, restaurant_id, 40)
+
+    for step in ("accept", "preparing", "ready", "pickedup", "delivered"):
+        assert client.put(f"/orders/{delivered_id}/{step}", headers=headers).status_code == 200
+    resp = client.post(f"/orders/{rejected_id}/reject", headers=headers, json={"status": "rejected", "rejection_reason": "Closed"})
+    assert resp.status_code == 200
+
+    db.expire_all()
+    assert OrderStatsService.check_consistency(db, restaurant_id) == []
+    total = DashboardService.get_total_summary(db, restaurant_id)
+    assert total["total_orders"] == 3
+    assert total["delivered_orders"] == 1
+    assert total["rejected_orders"] == 1
+    assert total["new_orders_count"] == 1
+    assert total["total_earnings"] == Decimal("120")
+
+
+def test_consistency_check_reports_drift_and_rebuild_repairs_it(db, make_restaurant, make_order):
+    restaurant_id = make_restaurant().id
+    _create_order(db, make_order, restaurant_id, 60)
+    db.query(RestaurantDailyStats).filter(
+        RestaurantDailyStats.restaurant_id == restaurant_id
+    ).update({RestaurantDailyStats.new_count: 5}, synchronize_session=False)
+    db.commit()
+
+    mismatches = OrderStatsService.check_consistency(db, restaurant_id)
+    assert len(mismatches) == 1
+    assert mismatches[0]["fields"] == {"new_count": {"expected": 1, "actual": 5}}
+
+    assert OrderStatsService.rebuild(db, restaurant_id) == 1
+    assert OrderStatsService.check_consistency(db, restaurant_id) == []
@@ -0,0 +1,80 @@
+import uuid
+
+import pytest
+
+from app.config import get_settings
+from app.services.otp_store import InMemoryOTPStore, RedisOTPStore
+
+settings = get_settings()
+
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return InMemoryOTPStore()
+    store = RedisOTPStore(settings.REDIS_URL, prefix=f"otp-test-{uuid.uuid4().hex[:8]}:")
+    try:
+        store.redis.ping()
+    except Exception:
+        pytest.skip("Redis is not reachable")
+    return store
+
+
+def test_a_code_works_once(store):
+    store.save("+911111111111", "424242", ttl_seconds=60)
+
+    assert store.consume("+911111111111", "424242", max_attempts=5)
+    assert not store.consume("+911111111111", "424242", max_attempts=5)
+
+
+def test_only_the_latest_code_is_accepted(store):
+    store.save("+911111111112", "111111", ttl_seconds=60)
+    store.save("+911111111112", "222222", ttl_seconds=60)
+
+    assert not store.consume("+911111111112", "111111", max_attempts=5)
+    assert store.consume("+911111111112", "222222", max_attempts=5)
+
+
+def test_too_many_wrong_guesses_void_the_code(store):
+    store.save("+911111111113", "333333", ttl_seconds=60)
+    for _ in range(3):
+        assert not store.consume("+911111111113", "000000", max_attempts=3)
+
+    assert not store.consume("+911111111113", "333333", max_attempts=3)
+
+    # A new code starts with a fresh attempt count
+    store.save("+911111111113", "444444", ttl_seconds=60)
+    assert not store.consume("+911111111113", "000000", max_attempts=3)
+    assert store.consume("+911111111113", "444444", max_attempts=3)
+
+
+def test_codes_expire():
+    now = [0.0]
+    store = InMemoryOTPStore(clock=lambda: now[0])
+    store.save("+911111111114", "555555", ttl_seconds=300)
+
+    now[0] = 301
+    assert not store.consume("+911111111114", "555555", max_attempts=5)
+
+
+def test_login_never_touches_the_otps_table(client, count_statements):
+    phone = f"+91{uuid.uuid4().int % 10**10:010d}"
+    with count_statements() as statements:
+        otp = client.post("/auth/send-otp", json={"phone_number": phone}).json()["data"]["otp"]
+        resp = client.post("/auth/verify-otp", json={"phone_number": phone, "otp_code": otp})
+
+    assert resp.status_code == 200
+    assert not [s for s in statements if "otps" in s]
+    # The code was used up by the login
+    assert client.post("/auth/verify-otp", json={"phone_number": phone, "otp_code": otp}).status_code == 400
+
+
+def test_unreachable_redis_fails_send_and_verify_with_503(client, monkeypatch):
+    from app.services import otp_store
+
+    # Nothing listens on port 1: every command fails to connect
+    monkeypatch.setattr(otp_store, "_store", RedisOTPStore("redis://localhost:1"))
+    phone = f"+91{uuid.uuid4().int % 10**10:010d}"
+    for prefix in ("/auth", "/customer/auth", "/delivery-partner/auth"):
+        assert client.post(f"{prefix}/send-otp", json={"phone_number": phone}).status_code == 503
+        assert client.post(f"{prefix}/verify-otp", json={"phone_number": phone, "otp_code": "654321"}).status_code == 503
@@ -0,0 +1,52 @@
+from app.models import OrderStatusEnum
+from app.pagination import encode_cursor, decode_cursor, encode_distance_cursor, decode_distance_cursor
+
+
+def _create_orders(make_order, restaurant_id, customer_id, count):
+    return [
+        make_order(restaurant_id=restaurant_id, customer_id=customer_id, status=OrderStatusEnum.DELIVERED)
+        for _ in range(count)
+    ]
+
+
+def test_cursor_round_trip():
+    from datetime import datetime
+    created_at = datetime(2026, 1, 2, 3, 4, 5, 678000)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    assert decode_distance_cursor(encode_distance_cursor(1.25, 7)) == (1.25, 7)
+
+
+def test_order_history_walks_all_pages_once(db, client, make_restaurant, make_order, customer_login):
+    customer_id, headers = customer_login()
+    restaurant = make_restaurant()
+    # Rows share the same created_at second, so the id tie-breaker is exercised
+    orders = _create_orders(make_order, restaurant.id, customer_id, 7)
+    expected_ids = sorted((o.id for o in orders), reverse=True)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        resp = client.get("/customer/orders", headers=headers, params=params)
+        assert resp.status_code == 200
+        body = resp.json()
+        assert len(body['data']) <= 3
+        seen.extend(o['id'] for o in body['data'])
+        pages += 1
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert seen == expected_ids
+
+
+def test_limit_is_bounded_and_bad_cursor_rejected(client, customer_login):
+    _, headers = customer_login()
+    resp = client.get("/customer/orders", headers=headers, params={"limit": 10000})
+    assert resp.status_code == 422
+    resp = client.get("/customer/orders", headers=headers, params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
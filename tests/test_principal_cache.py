@@ -0,0 +1,65 @@
+from app.dependencies import invalidate_principal
+from app.models import Customer
+
+
+def _identity_queries(statements):
+    return [s for s in statements if "FROM customers" in s or "FROM owners" in s or "FROM delivery_partners" in s]
+
+
+def test_repeat_requests_need_no_identity_query(client, customer_login, count_statements):
+    _, headers = customer_login()
+    client.get("/customer/profile", headers=headers)
+
+    with count_statements() as statements:
+        resp = client.get("/customer/profile", headers=headers)
+
+    assert resp.status_code == 200
+    assert _identity_queries(statements) == []
+
+
+def test_restaurant_id_is_cached_with_the_owner(client, owner_login, make_restaurant, count_statements):
+    owner_id, headers = owner_login()
+    make_restaurant(owner_id=owner_id)
+    client.get("/orders/new", headers=headers)
+
+    with count_statements() as statements:
+        resp = client.get("/orders/new", headers=headers)
+
+    assert resp.status_code == 200
+    assert _identity_queries(statements) == []
+    assert not [s for s in statements if "FROM restaurants" in s]
+
+
+def test_profile_changes_are_visible_on_the_next_request(client, customer_login):
+    _, headers = customer_login()
+    client.get("/customer/profile", headers=headers)
+
+    client.put("/customer/profile", headers=headers, json={"full_name": "Asha Rao"})
+
+    assert client.get("/customer/profile", headers=headers).json()["full_name"] == "Asha Rao"
+
+
+def test_partner_can_go_online_right_after_approval(client, delivery_partner_login):
+    partner_id, headers = delivery_partner_login()
+    client.post("/delivery-partner/register", headers=headers, json={
+        "full_name": "Ravi Kumar", "vehicle_number": "KA01AB1234", "vehicle_type": "bike"
+    })
+    resp = client.post("/delivery-partner/status/toggle", headers=headers, json={"is_online": True})
+    assert resp.status_code == 403
+
+    client.put(f"/admin/delivery-partners/{partner_id}/verify", json={"status": "approved"})
+
+    resp = client.post("/delivery-partner/status/toggle", headers=headers, json={"is_online": True})
+    assert resp.status_code == 200
+    assert client.get("/delivery-partner/status", headers=headers).json()["data"]["is_online"] is True
+
+
+def test_deactivation_takes_effect_once_invalidated(client, db, customer_login):
+    customer_id, headers = customer_login()
+    client.get("/customer/profile", headers=headers)
+
+    db.query(Customer).filter(Customer.id == customer_id).update({Customer.is_active: False})
+    db.commit()
+    invalidate_principal("customer", customer_id)
+
+    assert client.get("/customer/profile", headers=headers).status_code == 403
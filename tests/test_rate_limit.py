@@ -0,0 +1,76 @@
+import uuid
+
+from app.config import get_settings
+from app.services.rate_limit_service import InMemoryRateLimiter, RedisRateLimiter
+
+settings = get_settings()
+
+
+def _phone():
+    return f"+91{uuid.uuid4().int % 10**10:010d}"
+
+
+def test_buckets_allow_a_burst_then_refill():
+    now = [0.0]
+    limiter = InMemoryRateLimiter(clock=lambda: now[0])
+    buckets = [("phone", 2, 0.5)]
+
+    assert limiter.acquire(buckets) == 0
+    assert limiter.acquire(buckets) == 0
+    assert limiter.acquire(buckets) == 2.0
+
+    now[0] = 2.0
+    assert limiter.acquire(buckets) == 0
+    assert limiter.acquire(buckets) > 0
+
+
+def test_a_rejected_request_does_not_use_up_its_other_buckets():
+    limiter = InMemoryRateLimiter(clock=lambda: 0.0)
+    limiter.acquire([("phone", 1, 1.0)])
+
+    assert limiter.acquire([("ip", 1, 1.0), ("phone", 1, 1.0)]) > 0
+    assert limiter.acquire([("ip", 1, 1.0)]) == 0
+
+
+def test_unreachable_redis_falls_back_to_local_buckets():
+    limiter = RedisRateLimiter("redis://localhost:1")
+
+    assert limiter.acquire([("phone", 1, 0.01)]) == 0
+    assert limiter.acquire([("phone", 1, 0.01)]) > 0
+
+
+def test_repeated_otp_requests_are_rejected_without_touching_the_database(client, count_statements):
+    phone = _phone()
+    for _ in range(settings.OTP_RATE_LIMIT_PHONE_BURST):
+        assert client.post("/delivery-partner/auth/send-otp", json={"phone_number": phone}).status_code == 200
+
+    with count_statements() as statements:
+        resp = client.post("/delivery-partner/auth/send-otp", json={"phone_number": phone})
+
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert statements == []
+    # The phone's limit is shared by every app, other phones are unaffected
+    assert client.post("/customer/auth/send-otp", json={"phone_number": phone}).status_code == 429
+    assert client.post("/customer/auth/send-otp", json={"phone_number": _phone()}).status_code == 200
+
+
+def test_otp_request_without_a_json_body_is_a_validation_error(client):
+    for path in ("/auth/send-otp", "/customer/auth/send-otp", "/delivery-partner/auth/send-otp"):
+        assert client.post(path).status_code == 422
+        assert client.post(path, data={"phone_number": _phone()}).status_code == 422
+        assert client.post(path, content=b"not json", headers={"Content-Type": "application/json"}).status_code == 422
+
+
+def test_location_pings_are_limited_per_rider(client, delivery_partner_login):
+    _, headers = delivery_partner_login()
+    _, other_headers = delivery_partner_login()
+    ping = {"latitude": 12.97, "longitude": 77.59}
+
+    statuses = [
+        client.post("/delivery-partner/location/update", headers=headers, json=ping).status_code
+        for _ in range(settings.LOCATION_RATE_LIMIT_BURST + 1)
+    ]
+
+    assert statuses == [200] * settings.LOCATION_RATE_LIMIT_BURST + [429]
+    assert client.post("/delivery-partner/location/update", headers=other_headers, json=ping).status_code == 200
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+import pytest
+
+from app.cache import TTLCache
+from app.models import RevokedToken
+from app.services import jwt_service
+from app.services.jwt_service import TokenRevocationList, create_access_token, token_digest, verify_token
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Counts the signature checks verify_token performs"""
+    calls = []
+    decode = jwt_service.jwt.decode
+
+    def _decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt_service.jwt, "decode", _decode)
+    return calls
+
+
+def test_repeat_tokens_skip_the_signature_check(decodes):
+    token = create_access_token({"customer_id": 1})
+
+    assert verify_token(token)["customer_id"] == 1
+    assert verify_token(token)["customer_id"] == 1
+    assert decodes == [token]
+    assert verify_token(token + "x") is None
+
+
+def test_cached_tokens_expire_with_the_token(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(jwt_service, "token_cache", TTLCache(ttl=3600, clock=lambda: now[0]))
+    token = create_access_token({"customer_id": 1}, expires_delta=timedelta(seconds=60))
+
+    verify_token(token)
+    now[0] = 59
+    assert jwt_service.token_cache.get(token_digest(token)) is not None
+    now[0] = 61
+    assert jwt_service.token_cache.get(token_digest(token)) is None
+
+
+@pytest.mark.parametrize("login, logout, profile", [
+    ("customer_login", "/customer/auth/logout", "/customer/profile"),
+    ("owner_login", "/auth/logout", "/owner/details"),
+    ("delivery_partner_login", "/delivery-partner/auth/logout", "/delivery-partner/profile"),
+])
+def test_logout_revokes_the_token(request, client, login, logout, profile):
+    _, headers = request.getfixturevalue(login)()
+    client.get(profile, headers=headers)
+
+    assert client.post(logout, headers=headers).status_code == 200
+
+    assert client.get(profile, headers=headers).status_code == 401
+    # Logging out twice, or without a token, still succeeds
+    assert client.post(logout, headers=headers).status_code == 200
+    assert client.post(logout).status_code == 200
+
+
+def test_other_workers_pick_up_revocations_on_their_next_sync(client, db, customer_login):
+    other_worker = TokenRevocationList(sync_interval=3600)
+    other_worker.sync()
+    _, headers = customer_login()
+    digest = token_digest(headers["Authorization"].split()[1])
+
+    client.post("/customer/auth/logout", headers=headers)
+
+    assert db.query(RevokedToken).filter(RevokedToken.token_digest == digest).count() == 1
+    assert not other_worker.is_revoked(digest)
+    other_worker.sync()
+    assert other_worker.is_revoked(digest)
+
+
+def test_invalid_tokens_are_not_stored(client, db):
+    client.post("/customer/auth/logout", headers={"Authorization": "Bearer not-a-token"})
+
+    assert db.query(RevokedToken).filter(RevokedToken.token_digest == token_digest("not-a-token")).count() == 0